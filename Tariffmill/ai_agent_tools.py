@@ -14,6 +14,13 @@ import importlib.util
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
 
+try:
+    from Tariffmill.ocrmill_page_store import get_page_store
+    from Tariffmill.templates.base_template import ExtractionContext
+except ImportError:
+    from ocrmill_page_store import get_page_store
+    from templates.base_template import ExtractionContext
+
 
 def get_templates_dir() -> Path:
     """Get the templates directory path."""
@@ -497,6 +504,15 @@ class ToolRegistry:
         code = template_code or self.get_context("current_template_code", "")
         invoice_text = self.get_context("invoice_text", "")
         invoice_tables = self.get_context("invoice_tables", [])
+        invoice_path = self.get_context("invoice_path", "")
+
+        if not invoice_tables and invoice_path and invoice_path.lower().endswith('.pdf'):
+            # Tables come from the page store, so repeated test runs don't re-parse the PDF
+            try:
+                invoice_tables = [table for page_tables in get_page_store().get_page_tables(invoice_path)
+                                  for table in page_tables]
+            except Exception:
+                invoice_tables = []
 
         if not code:
             return {"success": False, "error": "No template code to test"}
@@ -551,21 +567,29 @@ class ToolRegistry:
                 # Test can_process
                 can_process = template.can_process(invoice_text)
 
+                # Hooks that accept a context share one for this test, as in extract_all
+                context = ExtractionContext(invoice_text, invoice_tables)
+
+                def call_hook(method_name, *args):
+                    if hasattr(template, '_call_hook'):
+                        return template._call_hook(method_name, *args, context=context)
+                    return getattr(template, method_name)(*args)
+
                 # Extract data
-                invoice_number = template.extract_invoice_number(invoice_text)
-                project_number = template.extract_project_number(invoice_text)
+                invoice_number = call_hook('extract_invoice_number', invoice_text)
+                project_number = call_hook('extract_project_number', invoice_text)
 
                 # Try table-based extraction if available
                 if invoice_tables and hasattr(template, 'extract_from_tables'):
-                    items = template.extract_from_tables(invoice_tables, invoice_text)
+                    items = call_hook('extract_from_tables', invoice_tables, invoice_text)
                     if not items:
-                        items = template.extract_line_items(invoice_text)
+                        items = call_hook('extract_line_items', invoice_text)
                 else:
-                    items = template.extract_line_items(invoice_text)
+                    items = call_hook('extract_line_items', invoice_text)
 
                 # Post-process items if method exists
                 if hasattr(template, 'post_process_items'):
-                    items = template.post_process_items(items)
+                    items = call_hook('post_process_items', items)
 
                 return {
                     "success": True,
@@ -749,13 +773,8 @@ class ToolRegistry:
         # Handle PDF files specially
         if file_path.suffix.lower() == '.pdf':
             try:
-                import pdfplumber
-                text_parts = []
-                with pdfplumber.open(file_path) as pdf:
-                    for i, page in enumerate(pdf.pages[:20]):  # Limit to 20 pages
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(f"[Page {i+1}]\n{page_text}")
+                page_texts = get_page_store().get_page_texts(file_path, max_pages=20)  # Limit to 20 pages
+                text_parts = [f"[Page {i+1}]\n{page_text}" for i, page_text in enumerate(page_texts) if page_text]
                 content = "\n\n".join(text_parts)
                 return {
                     "success": True,
@@ -144,6 +144,11 @@ try:
 except ImportError:
     HAS_PDFPLUMBER = False
 
+try:
+    from Tariffmill.ocrmill_page_store import get_page_store
+except ImportError:
+    from ocrmill_page_store import get_page_store
+
 
 class AIGeneratorThread(QThread):
     """Background thread for AI template generation."""
@@ -901,13 +906,8 @@ class AITemplateGeneratorDialog(QDialog):
         try:
             self.pdf_path_edit.setText(path)
 
-            # Extract text from PDF
-            text_parts = []
-            with pdfplumber.open(path) as pdf:
-                for page in pdf.pages[:5]:  # First 5 pages
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
+            # Extract text from PDF (first 5 pages, reused from the page store if seen before)
+            text_parts = [page_text for page_text in get_page_store().get_page_texts(path, max_pages=5) if page_text]
 
             full_text = '\n\n'.join(text_parts)
             self.invoice_text_edit.setPlainText(full_text)
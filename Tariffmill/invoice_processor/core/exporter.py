@@ -5,7 +5,9 @@ This module handles exporting processed invoice data to Excel format
 with color-coded rows based on material type and Section 301 indicators.
 """
 
+import numpy as np
 import pandas as pd
+from datetime import date, datetime
 from pathlib import Path
 from typing import Optional, Dict, List, Union
 from dataclasses import dataclass, field
@@ -37,6 +39,17 @@ class ExportStyle:
     auto_size_columns: bool = True
 
 
+# Material flag substring -> font, checked in order (first match wins)
+MATERIAL_FONT_FLAGS = [
+    ('Steel', 'steel'),
+    ('Aluminum', 'aluminum'),
+    ('Copper', 'copper'),
+    ('Wood', 'wood'),
+    ('Auto', 'auto'),
+    ('Non_232', 'non232'),
+]
+
+
 @dataclass
 class ExportResult:
     """Result of an export operation."""
@@ -70,6 +83,9 @@ def export_to_excel(
     - Landscape orientation and fit-to-width page setup
     - Auto-sized columns
 
+    Rows are streamed through an openpyxl write-only workbook; each cell shares
+    one of a handful of precomputed styles picked per row.
+
     Args:
         df: DataFrame to export
         output_path: Path for the output Excel file
@@ -89,7 +105,10 @@ def export_to_excel(
         ...     print(f"Exported {result.row_count} rows to {result.file_path}")
     """
     try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font as ExcelFont, PatternFill, Alignment
+        from openpyxl.utils import get_column_letter
     except ImportError:
         return ExportResult(
             success=False,
@@ -112,52 +131,34 @@ def export_to_excel(
     if not columns:
         return ExportResult(success=False, error="No valid columns to export")
 
-    # Create material type masks
-    def get_material_mask(flag_value: str) -> List[int]:
-        if material_column not in df.columns:
-            return []
-        mask = df[material_column].astype(str).str.contains(flag_value, case=False, na=False)
-        return [i for i, val in enumerate(mask.tolist()) if val]
-
-    steel_indices = get_material_mask('Steel')
-    aluminum_indices = get_material_mask('Aluminum')
-    copper_indices = get_material_mask('Copper')
-    wood_indices = get_material_mask('Wood')
-    auto_indices = get_material_mask('Auto')
-    non232_indices = get_material_mask('Non_232')
-
-    # Section 301 mask
-    sec301_indices = []
+    # Style class per row: first matching material flag wins, then Section 301 fill
+    row_materials = np.full(len(df), 'default', dtype=object)
+    if material_column in df.columns:
+        flags = df[material_column].astype(str)
+        conditions = [flags.str.contains(flag_value, case=False, na=False).to_numpy(dtype=bool)
+                      for flag_value, _ in MATERIAL_FONT_FLAGS]
+        row_materials = np.select(conditions, [name for _, name in MATERIAL_FONT_FLAGS], default='default')
+
+    row_sec301 = np.zeros(len(df), dtype=bool)
     if sec301_column in df.columns:
-        sec301_mask = df[sec301_column].apply(
-            lambda x: pd.notna(x) and str(x).strip() != ''
-        )
-        sec301_indices = [i for i, val in enumerate(sec301_mask.tolist()) if val]
+        sec301_values = df[sec301_column]
+        row_sec301 = (sec301_values.notna() &
+                      (sec301_values.map(str).astype(object).map(str.strip) != '')).to_numpy(dtype=bool)
 
     # Create fonts for each material type
     def hex_to_argb(hex_color: str) -> str:
         """Convert hex color to ARGB format for openpyxl."""
         return '00' + hex_color.lstrip('#').upper()
 
-    fonts = {
-        'steel': ExcelFont(name=style.font_name, size=style.font_size,
-                          color=hex_to_argb(style.steel_color)),
-        'aluminum': ExcelFont(name=style.font_name, size=style.font_size,
-                             color=hex_to_argb(style.aluminum_color)),
-        'copper': ExcelFont(name=style.font_name, size=style.font_size,
-                           color=hex_to_argb(style.copper_color)),
-        'wood': ExcelFont(name=style.font_name, size=style.font_size,
-                         color=hex_to_argb(style.wood_color)),
-        'auto': ExcelFont(name=style.font_name, size=style.font_size,
-                         color=hex_to_argb(style.auto_color)),
-        'non232': ExcelFont(name=style.font_name, size=style.font_size,
-                           color=hex_to_argb(style.non232_color)),
-        'default': ExcelFont(name=style.font_name, size=style.font_size,
-                            color=hex_to_argb(style.default_font_color)),
-        'header': ExcelFont(name=style.font_name, size=style.font_size, bold=True,
-                           color=hex_to_argb(style.default_font_color)),
+    material_colors = {
+        'steel': style.steel_color,
+        'aluminum': style.aluminum_color,
+        'copper': style.copper_color,
+        'wood': style.wood_color,
+        'auto': style.auto_color,
+        'non232': style.non232_color,
+        'default': style.default_font_color,
     }
-
     sec301_fill = PatternFill(
         start_color=style.sec301_fill_color.lstrip('#'),
         end_color=style.sec301_fill_color.lstrip('#'),
@@ -166,66 +167,74 @@ def export_to_excel(
     center_alignment = Alignment(horizontal="center", vertical="center")
 
     try:
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df[columns].to_excel(writer, index=False)
-            ws = next(iter(writer.sheets.values()))
-
-            # Apply header formatting
-            for col_idx in range(1, len(columns) + 1):
-                cell = ws.cell(row=1, column=col_idx)
-                cell.font = fonts['header']
-                cell.alignment = center_alignment
-
-            # Apply row formatting
-            for row_idx in range(len(df)):
-                row_num = row_idx + 2  # Excel rows are 1-indexed, plus header
-                is_sec301 = row_idx in sec301_indices
-
-                # Determine font based on material type
-                if row_idx in steel_indices:
-                    row_font = fonts['steel']
-                elif row_idx in aluminum_indices:
-                    row_font = fonts['aluminum']
-                elif row_idx in copper_indices:
-                    row_font = fonts['copper']
-                elif row_idx in wood_indices:
-                    row_font = fonts['wood']
-                elif row_idx in auto_indices:
-                    row_font = fonts['auto']
-                elif row_idx in non232_indices:
-                    row_font = fonts['non232']
+        # Write-only workbook: rows are streamed to disk as they are appended
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Sheet1')
+
+        # Shared cell styles, one per (material, Section 301) class; cells only
+        # reference them, so styling a cell is an assignment, not a style lookup
+        def make_style(font, fill=None, number_format=None):
+            template = WriteOnlyCell(ws)
+            template.font = font
+            template.alignment = center_alignment
+            if fill is not None:
+                template.fill = fill
+            if number_format is not None:
+                template.number_format = number_format
+            return template._style
+
+        cell_styles = {}
+        for name, color in material_colors.items():
+            font = ExcelFont(name=style.font_name, size=style.font_size, color=hex_to_argb(color))
+            for is_sec301 in (False, True):
+                fill = sec301_fill if is_sec301 else None
+                cell_styles[(name, is_sec301)] = make_style(font, fill)
+                # Date cells use the same formats as DataFrame.to_excel
+                cell_styles[(name, is_sec301, 'datetime')] = make_style(font, fill, 'YYYY-MM-DD HH:MM:SS')
+                cell_styles[(name, is_sec301, 'date')] = make_style(font, fill, 'YYYY-MM-DD')
+        header_style = make_style(ExcelFont(name=style.font_name, size=style.font_size, bold=True,
+                                            color=hex_to_argb(style.default_font_color)))
+
+        # Cell values as written by DataFrame.to_excel (missing -> empty, inf -> 'inf')
+        export_df = df[columns]
+        column_values = [_excel_values(export_df.iloc[:, position]) for position in range(len(columns))]
+
+        # Column widths must be set before any row is written
+        if style.auto_size_columns:
+            for col_idx, column in enumerate(columns, 1):
+                max_length = max(len(str(column)) if column else 0,
+                                 _max_text_length(export_df.iloc[:, col_idx - 1]))
+                ws.column_dimensions[get_column_letter(col_idx)].width = max(max_length + 2, 8)  # Minimum width of 8
+
+        # Page setup
+        if style.landscape:
+            ws.page_setup.orientation = 'landscape'
+        if style.fit_to_width:
+            ws.sheet_properties.pageSetUpPr.fitToPage = True
+            ws.page_setup.fitToWidth = 1
+            ws.page_setup.fitToHeight = 0  # Unlimited pages vertically
+
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(ws, column)
+            cell._style = header_style
+            header.append(cell)
+        ws.append(header)
+
+        for row_idx, values in enumerate(zip(*column_values)):
+            row_key = (row_materials[row_idx], bool(row_sec301[row_idx]))
+            row_style = cell_styles[row_key]
+            row = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value)
+                if isinstance(value, (datetime, date)):
+                    cell._style = cell_styles[row_key + ('datetime' if isinstance(value, datetime) else 'date',)]
                 else:
-                    row_font = fonts['default']
-
-                # Apply formatting to each cell in the row
-                for col_idx in range(1, len(columns) + 1):
-                    cell = ws.cell(row=row_num, column=col_idx)
-                    cell.font = row_font
-                    cell.alignment = center_alignment
-                    if is_sec301:
-                        cell.fill = sec301_fill
-
-            # Auto-size columns
-            if style.auto_size_columns:
-                for col_idx, column in enumerate(ws.columns, 1):
-                    max_length = 0
-                    column_letter = ws.cell(row=1, column=col_idx).column_letter
-                    for cell in column:
-                        try:
-                            if cell.value:
-                                max_length = max(max_length, len(str(cell.value)))
-                        except:
-                            pass
-                    adjusted_width = max(max_length + 2, 8)  # Minimum width of 8
-                    ws.column_dimensions[column_letter].width = adjusted_width
-
-            # Page setup
-            if style.landscape:
-                ws.page_setup.orientation = 'landscape'
-            if style.fit_to_width:
-                ws.page_setup.fitToPage = True
-                ws.page_setup.fitToWidth = 1
-                ws.page_setup.fitToHeight = 0  # Unlimited pages vertically
+                    cell._style = row_style
+                row.append(cell)
+            ws.append(row)
+
+        wb.save(output_path)
 
         return ExportResult(
             success=True,
@@ -238,6 +247,21 @@ def export_to_excel(
         return ExportResult(success=False, error=str(e))
 
 
+def _excel_values(series: pd.Series) -> list:
+    """Column values converted the way DataFrame.to_excel writes them."""
+    values = series.astype(object).where(series.notna(), None)
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = values.where(~np.isposinf(series), 'inf').where(~np.isneginf(series), '-inf')
+    return values.tolist()
+
+
+def _max_text_length(series: pd.Series) -> int:
+    """Longest str() of the non-empty values in a column, computed per distinct value."""
+    _, uniques = pd.factorize(series)
+    lengths = [len(str(value)) for value in uniques if value]
+    return max(lengths, default=0)
+
+
 def export_split_by_invoice(
     df: pd.DataFrame,
     output_dir: Union[str, Path],
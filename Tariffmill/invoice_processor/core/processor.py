@@ -8,9 +8,38 @@ This module handles the core transformation of invoice data:
 - Section 232 flag assignment
 """
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, Any, Callable, Tuple
 from .tariff import TariffLookup, get_232_info
+from .quantities import calculate_invoice_quantities
+
+
+# Derivative rows are created in this order: (content type, ratio column)
+MATERIAL_RATIO_COLUMNS = [
+    ('steel', 'SteelRatio'),
+    ('aluminum', 'AluminumRatio'),
+    ('copper', 'CopperRatio'),
+    ('wood', 'WoodRatio'),
+    ('auto', 'AutoRatio'),
+    ('non_232', 'NonSteelRatio'),
+]
+
+# Tariff material -> ratio column set to 100% for rows without any ratios (default: steel)
+MATERIAL_DEFAULT_COLUMN = {'Steel': 0, 'Aluminum': 1, 'Copper': 2, 'Wood': 3, 'Auto': 4}
+
+
+# Section 232 flag and default declaration code per content type
+# (non_232 keeps the HTS declaration code as-is, even if empty)
+CONTENT_TYPE_FLAGS = {
+    'steel': '232_Steel',
+    'aluminum': '232_Aluminum',
+    'copper': '232_Copper',
+    'wood': '232_Wood',
+    'auto': '232_Auto',
+    'non_232': 'Non_232',
+}
+CONTENT_TYPE_DEFAULT_DEC_TYPES = {'steel': '08', 'aluminum': '07', 'copper': '11', 'wood': '10', 'auto': ''}
 
 
 class InvoiceProcessingResult:
@@ -103,14 +132,14 @@ def process_invoice_data(
     """
     df = df.copy()
 
-    # Define the tariff lookup function to use
-    def lookup_tariff(hts_code: str) -> Tuple[Optional[str], str, str]:
+    # Tariff lookups for a column of HTS codes -> material, dec_code, smelt_flag columns
+    def lookup_tariff_many(hts_codes: pd.Series) -> pd.DataFrame:
         if tariff_lookup_func:
-            return tariff_lookup_func(hts_code)
+            return _lookup_each(hts_codes, tariff_lookup_func)
         elif tariff_lookup:
-            return tariff_lookup.get_info(hts_code)
+            return tariff_lookup.get_info_many(hts_codes)
         else:
-            return None, "", ""
+            return _lookup_each(hts_codes, lambda hts_code: (None, "", ""))
 
     # Helper function to safely get column or default
     def safe_get_column(col_name: str, default: float = 0.0) -> pd.Series:
@@ -128,62 +157,7 @@ def process_invoice_data(
 
     # Expand rows by material content
     original_row_count = len(df)
-    expanded_rows = []
-
-    for _, row in df.iterrows():
-        steel_pct = row['SteelRatio']
-        aluminum_pct = row['AluminumRatio']
-        copper_pct = row['CopperRatio']
-        wood_pct = row['WoodRatio']
-        auto_pct = row['AutoRatio']
-        non_steel_pct = row['NonSteelRatio']
-        original_value = row['value_usd']
-
-        # If no percentages are set, use HTS lookup to determine material type
-        if steel_pct == 0 and aluminum_pct == 0 and copper_pct == 0 and wood_pct == 0 and auto_pct == 0 and non_steel_pct == 0:
-            hts = row.get('hts_code', '')
-            material, _, _ = lookup_tariff(hts)
-            if material == 'Aluminum':
-                aluminum_pct = 100.0
-            elif material == 'Copper':
-                copper_pct = 100.0
-            elif material == 'Wood':
-                wood_pct = 100.0
-            elif material == 'Auto':
-                auto_pct = 100.0
-            elif material == 'Steel':
-                steel_pct = 100.0
-            else:
-                # Default to 100% steel for backward compatibility
-                steel_pct = 100.0
-
-        # Create derivative rows in order: Steel, Aluminum, Copper, Wood, Auto, Non-232
-        material_configs = [
-            ('steel', steel_pct, 'SteelRatio'),
-            ('aluminum', aluminum_pct, 'AluminumRatio'),
-            ('copper', copper_pct, 'CopperRatio'),
-            ('wood', wood_pct, 'WoodRatio'),
-            ('auto', auto_pct, 'AutoRatio'),
-            ('non_232', non_steel_pct, 'NonSteelRatio'),
-        ]
-
-        for content_type, pct, ratio_col in material_configs:
-            if pct > 0:
-                new_row = row.copy()
-                new_row['value_usd'] = original_value * pct / 100.0
-                # Zero out all ratios except the current one
-                new_row['SteelRatio'] = 0.0
-                new_row['AluminumRatio'] = 0.0
-                new_row['CopperRatio'] = 0.0
-                new_row['WoodRatio'] = 0.0
-                new_row['AutoRatio'] = 0.0
-                new_row['NonSteelRatio'] = 0.0
-                new_row[ratio_col] = pct
-                new_row['_content_type'] = content_type
-                expanded_rows.append(new_row)
-
-    # Rebuild dataframe from expanded rows
-    df = pd.DataFrame(expanded_rows).reset_index(drop=True)
+    df = _expand_material_rows(df, lookup_tariff_many)
 
     # Calculate CalcWtNet based on value proportion
     total_value = df['value_usd'].sum()
@@ -193,8 +167,7 @@ def process_invoice_data(
         df['CalcWtNet'] = (df['value_usd'] / total_value) * net_weight
 
     # Calculate Qty1 and Qty2 based on qty_unit type
-    df['Qty1'] = df.apply(_get_qty1, axis=1)
-    df['Qty2'] = df.apply(_get_qty2, axis=1)
+    df['Qty1'], df['Qty2'] = calculate_invoice_quantities(df)
     df['cbp_qty'] = df['Qty1']  # Backward compatibility
 
     # Set HTSCode and MID
@@ -203,62 +176,33 @@ def process_invoice_data(
     melt_default = str(mid)[:2] if mid else ''
 
     # Calculate derivative fields (declaration codes, country codes, flags)
-    dec_type_list = []
-    country_melt_list = []
-    country_cast_list = []
-    prim_country_smelt_list = []
-    prim_smelt_flag_list = []
-    flag_list = []
-
-    for _, r in df.iterrows():
-        content_type = r.get('_content_type', '')
-        hts = r.get('hts_code', '')
-        material, dec_type, smelt_flag = lookup_tariff(hts)
-
-        # Set flag and declaration code based on content type
-        if content_type == 'steel':
-            flag = '232_Steel'
-            dec_type_list.append(dec_type if dec_type else '08')
-        elif content_type == 'aluminum':
-            flag = '232_Aluminum'
-            dec_type_list.append(dec_type if dec_type else '07')
-        elif content_type == 'copper':
-            flag = '232_Copper'
-            dec_type_list.append(dec_type if dec_type else '11')
-        elif content_type == 'wood':
-            flag = '232_Wood'
-            dec_type_list.append(dec_type if dec_type else '10')
-        elif content_type == 'auto':
-            flag = '232_Auto'
-            dec_type_list.append(dec_type if dec_type else '')
-        elif content_type == 'non_232':
-            flag = 'Non_232'
-            dec_type_list.append(dec_type)
-        else:
-            flag = f"232_{material}" if material else ''
-            dec_type_list.append(dec_type)
-
-        # Use imported country codes if available, otherwise fall back to MID-based default
-        country_of_melt = r.get('country_of_melt', '')
-        country_of_cast = r.get('country_of_cast', '')
-        country_of_smelt = r.get('country_of_smelt', '')
-
-        melt_code = country_of_melt if pd.notna(country_of_melt) and str(country_of_melt).strip() else melt_default
-        cast_code = country_of_cast if pd.notna(country_of_cast) and str(country_of_cast).strip() else melt_default
-        smelt_code = country_of_smelt if pd.notna(country_of_smelt) and str(country_of_smelt).strip() else melt_default
-
-        country_melt_list.append(melt_code)
-        country_cast_list.append(cast_code)
-        prim_country_smelt_list.append(smelt_code)
-        prim_smelt_flag_list.append(smelt_flag)
-        flag_list.append(flag)
-
-    df['DecTypeCd'] = dec_type_list
-    df['CountryofMelt'] = country_melt_list
-    df['CountryOfCast'] = country_cast_list
-    df['PrimCountryOfSmelt'] = prim_country_smelt_list
-    df['DeclarationFlag'] = prim_smelt_flag_list
-    df['_232_flag'] = flag_list
+    hts_codes = df['hts_code'] if 'hts_code' in df.columns else pd.Series('', index=df.index)
+    tariff_info = lookup_tariff_many(hts_codes)
+    content_types = df['_content_type']
+
+    # Flag and declaration code (default per material if the HTS has none) by content type
+    flags = content_types.map(CONTENT_TYPE_FLAGS)
+    unknown = flags.isna()
+    if unknown.any():
+        flags[unknown] = [f"232_{material}" if material else '' for material in tariff_info['material'][unknown]]
+    default_dec_types = content_types.map(CONTENT_TYPE_DEFAULT_DEC_TYPES)
+    dec_types = tariff_info['dec_code'].where(
+        tariff_info['dec_code'].astype(bool) | default_dec_types.isna(), default_dec_types)
+
+    # Use imported country codes if available, otherwise fall back to MID-based default
+    def country_codes(column: str) -> list:
+        if column not in df.columns:
+            return [melt_default] * len(df)
+        values = df[column]
+        present = values.notna() & (values.astype(str).str.strip() != '')
+        return values.where(present, melt_default).tolist()
+
+    df['DecTypeCd'] = dec_types.tolist()
+    df['CountryofMelt'] = country_codes('country_of_melt')
+    df['CountryOfCast'] = country_codes('country_of_cast')
+    df['PrimCountryOfSmelt'] = country_codes('country_of_smelt')
+    df['DeclarationFlag'] = tariff_info['smelt_flag'].tolist()
+    df['_232_flag'] = flags.tolist()
 
     # Rename columns for output
     df['Product No'] = df['part_number']
@@ -281,144 +225,54 @@ def process_invoice_data(
     )
 
 
-# Unit type categories for Qty1/Qty2 calculation
-# Weight-only units (Qty1 = weight in KG)
-WEIGHT_UNITS = {'KG', 'G', 'T', 'T ADW', 'T DWB'}
-
-# Count-only units (Qty1 = piece count)
-COUNT_UNITS = {'NO', 'PCS', 'DOZ', 'DOZ. PRS', 'DZ PCS', 'GROSS', 'HUNDREDS',
-               'THOUSANDS', 'PRS', 'PACK', 'DOSES', 'CARAT'}
-
-# Dual units: first quantity is count, second is weight (Qty1 = count, Qty2 = weight)
-DUAL_UNITS = {'NO. AND KG', 'NO/KG', 'NO\KG',
-              'CU KG', 'CY KG', 'NI KG', 'PB KG', 'ZN KG', 'KG AMC',
-              'AG G', 'AU G', 'IR G', 'OS G', 'PD G', 'PT G', 'RH G', 'RU G'}
-
-# Volume/Area/Length units (use quantity from invoice)
-MEASURE_UNITS = {'LITERS', 'PF.LITERS', 'BBL', 'M', 'LIN. M', 'M2', 'CM2', 'M3',
-                 'SQUARE', 'FIBER M', 'GBQ', 'MWH', 'THOUSAND M', 'THOUSAND M3'}
-
-# Units that should have BOTH Qty1 and Qty2 empty (measurement-only units per CBP requirements)
-NO_QTY_UNITS = {'M', 'M2', 'M3'}
+def _lookup_each(
+    hts_codes: pd.Series,
+    lookup_tariff: Callable[[str], Tuple[Optional[str], str, str]]
+) -> pd.DataFrame:
+    """Call a single-code tariff lookup once per distinct HTS code (get_info_many columns)."""
+    codes, uniques = pd.factorize(pd.Series(hts_codes), use_na_sentinel=False)
+    results = [lookup_tariff(hts_code) for hts_code in uniques]
+    columns = {}
+    for position, name in enumerate(('material', 'dec_code', 'smelt_flag')):
+        values = np.array([result[position] for result in results], dtype=object)
+        columns[name] = values[codes] if len(results) else []
+    return pd.DataFrame(columns, index=pd.Series(hts_codes).index)
 
 
-def _get_qty1(row: pd.Series) -> str:
+def _expand_material_rows(
+    df: pd.DataFrame,
+    lookup_tariff_many: Callable[[pd.Series], pd.DataFrame]
+) -> pd.DataFrame:
     """
-    Calculate Qty1 based on qty_unit type from HTS database.
+    Split each row into one row per material with a ratio above zero.
 
-    Categories:
-    - Weight-only: KG, G, T -> Qty1 = CalcWtNet, Qty2 = empty
-    - Count-only: NO, PCS, DOZ, etc. -> Qty1 = quantity (pieces), Qty2 = empty
-    - Dual (count + weight): NO. AND KG, XX KG, XX G -> Qty1 = quantity, Qty2 = CalcWtNet
-    - Other units (volume, area, length): Use quantity if available
+    Derivative rows follow their source row in MATERIAL_RATIO_COLUMNS order. Each
+    keeps its own ratio (all other ratio columns zeroed), gets value_usd scaled by
+    that ratio, and _content_type set. Rows without any ratio are 100% of the
+    material their HTS code maps to (steel if none); each distinct HTS code is
+    looked up once (lookup_tariff_many: HTS column -> get_info_many columns).
     """
-    qty_unit = str(row.get('qty_unit', '')).strip().upper() if pd.notna(row.get('qty_unit')) else ''
-
-    if qty_unit == '':
-        return ''
-
-    # If qty_unit is in NO_QTY_UNITS, leave Qty1 empty
-    if qty_unit in NO_QTY_UNITS:
-        return ''
-
-    # Weight-only units: Qty1 is net weight
-    if qty_unit in WEIGHT_UNITS:
-        return str(int(round(row['CalcWtNet']))) if row['CalcWtNet'] > 0 else ''
-
-    # Count-only units: Qty1 is piece count from invoice
-    if qty_unit in COUNT_UNITS:
-        qty = row.get('quantity', '')
-        if pd.notna(qty) and str(qty).strip():
-            try:
-                return str(int(float(str(qty).replace(',', '').strip())))
-            except (ValueError, TypeError):
-                return ''
-        return ''
-
-    # Dual units: Qty1 is piece count
-    if qty_unit in DUAL_UNITS:
-        qty = row.get('quantity', '')
-        if pd.notna(qty) and str(qty).strip():
-            try:
-                return str(int(float(str(qty).replace(',', '').strip())))
-            except (ValueError, TypeError):
-                return ''
-        return ''
-
-    # Measure units: Use quantity from invoice if available
-    if qty_unit in MEASURE_UNITS:
-        qty = row.get('quantity', '')
-        if pd.notna(qty) and str(qty).strip():
-            try:
-                return str(int(float(str(qty).replace(',', '').strip())))
-            except (ValueError, TypeError):
-                return ''
-        return ''
-
-    # Unknown unit type - try quantity first, fall back to empty
-    qty = row.get('quantity', '')
-    if pd.notna(qty) and str(qty).strip():
-        try:
-            return str(int(float(str(qty).replace(',', '').strip())))
-        except (ValueError, TypeError):
-            return ''
-    return ''
-
-
-def _get_qty2(row: pd.Series) -> str:
-    """
-    Calculate Qty2 based on qty_unit type.
-    CBP requires Qty2 (weight) for ALL Section 232 material types.
-    Other dual units (NO. AND KG, metal+weight) also populate Qty2 with weight.
-    """
-    qty_unit = str(row.get('qty_unit', '')).strip().upper() if pd.notna(row.get('qty_unit')) else ''
+    ratio_columns = [column for _, column in MATERIAL_RATIO_COLUMNS]
+    ratios = df[ratio_columns].to_numpy(dtype=float, copy=True)
 
-    # If qty_unit is in NO_QTY_UNITS, leave Qty2 empty
-    if qty_unit in NO_QTY_UNITS:
-        return ''
+    no_ratio = np.flatnonzero((ratios == 0).all(axis=1))
+    if len(no_ratio):
+        hts_codes = df['hts_code'].iloc[no_ratio] if 'hts_code' in df.columns else pd.Series([''] * len(no_ratio))
+        materials = lookup_tariff_many(hts_codes)['material']
+        default_columns = [MATERIAL_DEFAULT_COLUMN.get(material, 0) for material in materials]
+        ratios[no_ratio, default_columns] = 100.0
 
-    # Get content_type safely - handle NaN, None, and various string formats
-    content_type_raw = row.get('_content_type', '')
-    if pd.notna(content_type_raw) and content_type_raw:
-        content_type = str(content_type_raw).strip().lower()
-    else:
-        content_type = ''
-
-    # Get HTS code to check material type by chapter
-    hts_raw = row.get('hts_code', '')
-    hts_code = str(hts_raw).replace('.', '').strip() if pd.notna(hts_raw) else ''
-    hts_chapter = hts_code[:2] if len(hts_code) >= 2 else ''
-
-    # Get CalcWtNet safely
-    calc_wt = row.get('CalcWtNet', 0)
-    if pd.isna(calc_wt):
-        calc_wt = 0
-
-    # CBP requires Qty2 (weight) for ALL derivative rows (including non_232)
-    # This includes steel, aluminum, copper, wood, auto, AND non_232 portions
-    # Also applies to items in specific HTS chapters:
-    # - Aluminum = HTS Chapter 76
-    # - Steel = HTS Chapters 72, 73
-    # - Copper = HTS Chapter 74
-    is_derivative_row = content_type in ['steel', 'aluminum', 'copper', 'wood', 'auto', 'non_232']
-    is_aluminum_hts = hts_chapter == '76'
-    is_steel_hts = hts_chapter in ['72', '73']
-    is_copper_hts = hts_chapter == '74'
-
-    # Include Qty2 for any derivative row OR specific HTS chapters
-    if is_derivative_row or is_aluminum_hts or is_steel_hts or is_copper_hts:
-        if calc_wt > 0:
-            return str(int(round(calc_wt)))
-        return ''
-
-    # Dual units: Qty2 is net weight
-    if qty_unit in DUAL_UNITS:
-        if calc_wt > 0:
-            return str(int(round(calc_wt)))
-        return ''
-
-    # All other cases: Qty2 is empty
-    return ''
+    # Row-major nonzero order: source rows in order, materials in column order
+    row_positions, material_positions = np.nonzero(ratios > 0)
+    pct = ratios[row_positions, material_positions]
+
+    expanded = df.iloc[row_positions].reset_index(drop=True)
+    expanded['value_usd'] = df['value_usd'].to_numpy()[row_positions] * pct / 100.0
+    for column_pos, column in enumerate(ratio_columns):
+        expanded[column] = np.where(material_positions == column_pos, pct, 0.0)
+    content_types = np.array([content_type for content_type, _ in MATERIAL_RATIO_COLUMNS], dtype=object)
+    expanded['_content_type'] = content_types[material_positions]
+    return expanded
 
 
 def merge_with_parts_data(
@@ -474,10 +328,10 @@ def merge_with_parts_data(
         if db_col in merged.columns:
             # Use database value if it exists and is not empty
             if col in merged.columns:
-                merged[col] = merged.apply(
-                    lambda r: r[db_col] if pd.notna(r[db_col]) and str(r[db_col]).strip() else r.get(col, ''),
-                    axis=1
-                )
+                # Blank check once per distinct value; missing values get code -1 (-> False)
+                codes, uniques = pd.factorize(merged[db_col])
+                non_blank = np.array([str(value).strip() != '' for value in uniques] + [False], dtype=bool)
+                merged[col] = merged[db_col].where(non_blank[codes], merged[col])
             else:
                 merged[col] = merged[db_col]
             merged = merged.drop(columns=[db_col])
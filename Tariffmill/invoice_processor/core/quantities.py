@@ -0,0 +1,210 @@
+"""
+Column-wise CBP quantity (Qty1/Qty2) calculation.
+
+Unit types are classified once per distinct qty_unit and quantities parsed once
+per distinct value, then the Qty1/Qty2 rules are applied to whole columns.
+Two rule sets share these building blocks:
+- calculate_invoice_quantities: invoice_processor rules (process_invoice_data)
+- calculate_cbp_quantities: TariffMill rules (minimum 1 KG / 1 piece, dozens)
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+
+# Unit type categories for Qty1/Qty2 calculation
+# Weight-only units (Qty1 = weight in KG)
+WEIGHT_UNITS = {'KG', 'G', 'T', 'T ADW', 'T DWB'}
+
+# Count-only units (Qty1 = piece count)
+COUNT_UNITS = {'NO', 'PCS', 'DOZ', 'DOZ. PRS', 'DZ PCS', 'GROSS', 'HUNDREDS',
+               'THOUSANDS', 'PRS', 'PACK', 'DOSES', 'CARAT'}
+
+# Dual units: first quantity is count, second is weight (Qty1 = count, Qty2 = weight)
+# Includes NO. AND KG and metal+weight combinations
+DUAL_UNITS = {'NO. AND KG', 'NO/KG', 'NO\\KG', 'NO., KG', 'NO. KG', 'NO KG',
+              'CU KG', 'CY KG', 'NI KG', 'PB KG', 'ZN KG', 'KG AMC',
+              'AG G', 'AU G', 'IR G', 'OS G', 'PD G', 'PT G', 'RH G', 'RU G',
+              'DOZ., KG', 'DOZ. KG', 'DOZ KG', 'PRS., KG', 'PRS. KG', 'PRS KG'}
+
+# Volume/Area/Length units (use quantity from invoice)
+MEASURE_UNITS = {'LITERS', 'PF.LITERS', 'BBL', 'M', 'LIN. M', 'M2', 'CM2', 'M3',
+                 'SQUARE', 'FIBER M', 'GBQ', 'MWH', 'THOUSAND M', 'THOUSAND M3'}
+
+# Units that should have BOTH Qty1 and Qty2 empty (measurement-only units per CBP requirements)
+NO_QTY_UNITS = {'M', 'M2', 'M3'}
+
+# Content types of expanded derivative rows (see process_invoice_data)
+DERIVATIVE_CONTENT_TYPES = {'steel', 'aluminum', 'copper', 'wood', 'auto', 'non_232'}
+
+# HTS chapters whose rows always report weight as Qty2 (steel 72/73, copper 74, aluminum 76)
+WEIGHT_QTY2_CHAPTERS = {'72', '73', '74', '76'}
+
+
+def _unit_category(unit: str) -> str:
+    """Category of a normalized (stripped, uppercase) qty_unit."""
+    if unit == '':
+        return 'empty'
+    if unit in NO_QTY_UNITS:
+        return 'no_qty'
+    if unit in WEIGHT_UNITS:
+        return 'weight'
+    if unit in COUNT_UNITS:
+        return 'count'
+    if unit in DUAL_UNITS:
+        return 'dual'
+    if unit in MEASURE_UNITS:
+        return 'measure'
+    return 'other'
+
+
+def _parse_quantity(value) -> float:
+    """Invoice quantity as a number; NaN if missing or not numeric."""
+    if pd.isna(value):
+        return np.nan
+    text = str(value).replace(',', '').strip()
+    if not text:
+        return np.nan
+    try:
+        return float(text)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    """Apply func once per distinct value of a column and broadcast the results."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.array([func(value) for value in uniques], dtype=object)
+    return pd.Series(mapped[codes] if len(uniques) else [], index=values.index, dtype=object)
+
+
+def _column(df: pd.DataFrame, name: str, default='') -> pd.Series:
+    """Column by name, or a column of default values."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+def normalize_text_column(values: pd.Series) -> pd.Series:
+    """Stripped uppercase strings ('' for missing), computed once per distinct value."""
+    return _map_unique(values, lambda v: str(v).strip().upper() if pd.notna(v) else '')
+
+
+def classify_qty_units(qty_units: pd.Series) -> pd.Series:
+    """
+    Unit category for each qty_unit: 'empty', 'no_qty', 'weight', 'count',
+    'dual', 'measure' or 'other' (same precedence as the unit sets above).
+    """
+    return _map_unique(qty_units,
+                       lambda v: _unit_category(str(v).strip().upper() if pd.notna(v) else ''))
+
+
+def parse_quantities(quantities: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse invoice quantities ("1,200", 5, "x", None ...).
+
+    Returns:
+        Tuple of (values, present): values is a float array with NaN where the
+        quantity is missing or not numeric; present is False where it is missing
+        or blank (as opposed to present but invalid)
+    """
+    values = _map_unique(quantities, _parse_quantity).to_numpy(dtype=float)
+    present = _map_unique(quantities, lambda v: bool(pd.notna(v) and str(v).strip())).to_numpy(dtype=bool)
+    return values, present
+
+
+def format_whole(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Truncate values to whole numbers as strings; '' where not valid."""
+    valid = valid & np.isfinite(values)
+    result = np.full(len(values), '', dtype=object)
+    result[valid] = np.trunc(values[valid]).astype(np.int64).astype(str)
+    return result
+
+
+def _weights(df: pd.DataFrame, weight_column: str) -> np.ndarray:
+    """Weight column as floats (missing = 0)."""
+    return np.nan_to_num(pd.to_numeric(_column(df, weight_column, 0), errors='coerce')
+                         .to_numpy(dtype=float), nan=0.0)
+
+
+def calculate_invoice_quantities(df: pd.DataFrame, weight_column: str = 'CalcWtNet') -> Tuple[pd.Series, pd.Series]:
+    """
+    Qty1/Qty2 columns with the invoice_processor rules.
+
+    - Weight-only units: Qty1 = weight (empty if not positive)
+    - No-quantity units (M, M2, M3) or no unit: Qty1 empty
+    - Any other unit: Qty1 = whole-number invoice quantity
+    - Qty2 = weight for derivative rows, HTS chapters 72/73/74/76 and dual units
+      (empty if the weight is not positive or the unit is M/M2/M3)
+
+    Returns:
+        Tuple of (Qty1, Qty2) string Series aligned with df
+    """
+    category = classify_qty_units(_column(df, 'qty_unit')).to_numpy()
+    quantity, present = parse_quantities(_column(df, 'quantity'))
+    weight = _weights(df, weight_column)
+
+    weight_text = format_whole(np.round(weight), weight > 0)
+    qty1 = format_whole(quantity, present)
+    qty1 = np.where(category == 'weight', weight_text, qty1)
+    qty1[(category == 'empty') | (category == 'no_qty')] = ''
+
+    content_type = _map_unique(_column(df, '_content_type'),
+                               lambda v: str(v).strip().lower() if pd.notna(v) and v else '')
+    chapter = _map_unique(_column(df, 'hts_code'),
+                          lambda v: str(v).replace('.', '').strip()[:2] if pd.notna(v) else '')
+    weighted = (content_type.isin(DERIVATIVE_CONTENT_TYPES).to_numpy() |
+                chapter.isin(WEIGHT_QTY2_CHAPTERS).to_numpy() |
+                (category == 'dual'))
+    qty2 = np.where(weighted & (category != 'no_qty'), weight_text, '')
+
+    return pd.Series(qty1, index=df.index), pd.Series(qty2, index=df.index)
+
+
+def calculate_cbp_quantities(df: pd.DataFrame, weight_column: str = 'CalcWtNet') -> Tuple[pd.Series, pd.Series]:
+    """
+    Qty1/Qty2 columns with the TariffMill rules (CBP minimums).
+
+    - Weight-only units: Qty1 = weight, minimum 1 KG
+    - Dual units: Qty1 = piece count (minimum 1, '1' if missing for NO-based units;
+      dozens kept to 2 decimals for DOZ units, converted to pieces for NO units
+      when the invoice quantity_unit is DOZ), Qty2 = weight, minimum 1 KG
+    - No-quantity units (M, M2, M3) or no unit: Qty1 empty
+    - Any other unit: Qty1 = whole-number invoice quantity
+    - Qty2 is empty for everything but dual units
+
+    Returns:
+        Tuple of (Qty1, Qty2) string Series aligned with df
+    """
+    units = normalize_text_column(_column(df, 'qty_unit'))
+    category = classify_qty_units(units).to_numpy()
+    quantity, present = parse_quantities(_column(df, 'quantity'))
+    weight = _weights(df, weight_column)
+    weight_text = np.maximum(np.round(weight), 1).astype(np.int64).astype(str).astype(object)
+
+    qty1 = format_whole(quantity, present)
+    qty1 = np.where(category == 'weight', weight_text, qty1)
+
+    dual = np.flatnonzero(category == 'dual')
+    if len(dual):
+        dual_units = units.to_numpy()[dual]
+        dozen_unit = np.array(['DOZ' in unit for unit in dual_units], dtype=bool)
+        number_unit = np.array(['NO' in unit for unit in dual_units], dtype=bool)
+        invoice_units = normalize_text_column(_column(df, 'quantity_unit').astype(str)).to_numpy()[dual]
+        dual_qty = quantity[dual]
+        dual_qty = np.where(number_unit & ~dozen_unit & (invoice_units == 'DOZ'), dual_qty * 12, dual_qty)
+        valid = np.isfinite(dual_qty)
+
+        dual_text = np.full(len(dual), '', dtype=object)
+        pieces = valid & ~dozen_unit
+        dual_text[pieces] = np.maximum(np.trunc(dual_qty[pieces]), 1).astype(np.int64).astype(str)
+        dual_text[valid & dozen_unit] = [f"{value:.2f}" for value in dual_qty[valid & dozen_unit]]
+        dual_text[~present[dual] & number_unit] = '1'
+        qty1[dual] = dual_text
+
+    qty1[(category == 'empty') | (category == 'no_qty')] = ''
+    qty2 = np.where(category == 'dual', weight_text, '')
+
+    return pd.Series(qty1, index=df.index), pd.Series(qty2, index=df.index)
+
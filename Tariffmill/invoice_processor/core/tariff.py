@@ -5,6 +5,7 @@ This module provides tariff classification lookups for customs processing,
 supporting both database-backed lookups and in-memory data.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Tuple, Dict, Any
 
@@ -36,18 +37,26 @@ class TariffLookup:
                          If None, lookups will return empty results.
         """
         self._data: Dict[str, Dict[str, Any]] = {}
+        self._table: Optional[pd.DataFrame] = None  # Resolved lookup columns, built by get_info_many
+        self._table_source: Optional[Dict[str, Dict[str, Any]]] = None
 
         if tariff_data is not None and not tariff_data.empty:
             self._load_from_dataframe(tariff_data)
 
     def _load_from_dataframe(self, df: pd.DataFrame) -> None:
         """Load tariff data from a DataFrame into internal lookup dict."""
-        for _, row in df.iterrows():
-            hts_code = str(row.get('hts_code', '')).replace(".", "").strip().upper()
+        if 'hts_code' not in df.columns:
+            return
+        hts_codes = df['hts_code'].map(str).str.replace(".", "", regex=False).str.strip().str.upper()
+        materials = df['material'] if 'material' in df.columns else pd.Series('', index=df.index)
+        declarations = (df['declaration_required'] if 'declaration_required' in df.columns
+                        else pd.Series('', index=df.index))
+        # Later rows win, as with repeated assignment
+        for hts_code, material, declaration in zip(hts_codes.tolist(), materials.tolist(), declarations.tolist()):
             if hts_code:
                 self._data[hts_code] = {
-                    'material': row.get('material', ''),
-                    'declaration_required': row.get('declaration_required', ''),
+                    'material': material,
+                    'declaration_required': declaration,
                 }
 
     @classmethod
@@ -124,6 +133,67 @@ class TariffLookup:
 
         return None, "", ""
 
+    def _lookup_table(self) -> pd.DataFrame:
+        """
+        Lookup entries as columns indexed by normalized HTS code, with the
+        declaration code and smelt flag already resolved (rebuilt if _data changes).
+        """
+        if self._table is None or self._table_source is not self._data or len(self._table) != len(self._data):
+            materials = [row.get('material', '') for row in self._data.values()]
+            dec_codes = []
+            for row in self._data.values():
+                dec_code = row.get('declaration_required', '')
+                dec_code = dec_code if isinstance(dec_code, str) else ''
+                dec_codes.append(dec_code.split(" - ")[0] if " - " in dec_code else dec_code)
+            self._table = pd.DataFrame({
+                'material': np.array(materials, dtype=object),
+                'dec_code': dec_codes,
+                'smelt_flag': ["Y" if material in ["Aluminum", "Wood", "Copper"] else "" for material in materials],
+            }, index=pd.Index(list(self._data.keys()), dtype=object))
+            self._table_source = self._data
+        return self._table
+
+    def get_info_many(self, hts_codes: pd.Series) -> pd.DataFrame:
+        """
+        Lookup Section 232 tariff information for a column of HTS codes.
+
+        Same results as calling get_info() on each value, but each distinct code is
+        normalized once and matched with two joins (10-digit, then 8-digit).
+
+        Args:
+            hts_codes: Series of HTS codes (with or without dots)
+
+        Returns:
+            DataFrame aligned with hts_codes, with columns material (None if not
+            found), dec_code and smelt_flag
+        """
+        hts_codes = pd.Series(hts_codes)
+        codes, uniques = pd.factorize(hts_codes, use_na_sentinel=False)
+        normalized = pd.Series(
+            [str(code).replace(".", "").strip().upper() if code else "" for code in uniques],
+            dtype=object
+        )
+
+        table = self._lookup_table()
+        match_10 = table.index.get_indexer(normalized.str[:10])
+        match_8 = table.index.get_indexer(normalized.str[:8])
+        position = np.where(match_10 >= 0, match_10, match_8)
+        position[(normalized == "").to_numpy()] = -1
+
+        found = position >= 0
+        material = np.full(len(uniques), None, dtype=object)
+        dec_code = np.full(len(uniques), "", dtype=object)
+        smelt_flag = np.full(len(uniques), "", dtype=object)
+        material[found] = table['material'].to_numpy()[position[found]]
+        dec_code[found] = table['dec_code'].to_numpy()[position[found]]
+        smelt_flag[found] = table['smelt_flag'].to_numpy()[position[found]]
+
+        return pd.DataFrame({
+            'material': pd.Series(material[codes], index=hts_codes.index, dtype=object),
+            'dec_code': dec_code[codes],
+            'smelt_flag': smelt_flag[codes],
+        }, index=hts_codes.index)
+
     def __len__(self) -> int:
         """Return number of HTS codes in lookup."""
         return len(self._data)
@@ -0,0 +1,327 @@
+"""
+OCRMill Template Benchmark for TariffMill
+Measures template throughput, memory and accuracy over a corpus of sample PDFs.
+
+The corpus is a folder of PDFs, each optionally accompanied by a golden CSV with
+the expected line items (same stem, e.g. acme_0423.pdf + acme_0423.csv, in the
+OCRMill CSV format). Each template is forced in turn (all other templates
+disabled) and run over every PDF it matches.
+
+Usage:
+    python -m Tariffmill.ocrmill_benchmark corpus/ --output bench.json
+    python -m Tariffmill.ocrmill_benchmark corpus/ --template hebei_shinyee --baseline bench.json
+
+Output (JSON): run metadata (commit, time, Python version) and per template:
+files matched, items, items/sec, ms/page, peak memory (MB), field accuracy, plus
+per-file details. --baseline prints the change against an earlier output file.
+"""
+
+import argparse
+import csv
+import difflib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional
+
+try:
+    from Tariffmill.ocrmill_processor import ProcessorEngine, OCRMillConfig, DeferredStatsRecorder
+    from Tariffmill.ocrmill_document import ParsedDocument
+    from Tariffmill.templates import get_routing_index
+except ImportError:
+    from ocrmill_processor import ProcessorEngine, OCRMillConfig, DeferredStatsRecorder
+    from ocrmill_document import ParsedDocument
+    from templates import get_routing_index
+
+
+# Item fields compared against golden CSVs (only those present in the golden file)
+DEFAULT_FIELDS = ['invoice_number', 'project_number', 'part_number', 'quantity', 'total_price']
+
+
+def normalize_value(value) -> str:
+    """Normalize a field for comparison: numbers by value, text case/space-insensitive."""
+    text = str(value if value is not None else "").strip()
+    number = text.replace(',', '').replace('$', '')
+    try:
+        return f"{float(number):.4f}"
+    except ValueError:
+        return " ".join(text.upper().split())
+
+
+def load_golden(csv_path: Path) -> List[Dict]:
+    """Read expected items from a golden CSV."""
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def compare_items(expected: List[Dict], actual: List[Dict], fields: List[str]) -> Dict:
+    """
+    Field-level accuracy of extracted items against golden items.
+
+    Rows are aligned on part_number order (difflib), so one missed row doesn't
+    shift every following row. Every golden cell counts once; cells of missing
+    rows count as wrong.
+
+    Returns:
+        Dict with expected_rows, extracted_rows, matched_rows, correct, total,
+        accuracy and per-field {correct, total}
+    """
+    fields = [f for f in fields if expected and f in expected[0]]
+    per_field = {f: {'correct': 0, 'total': len(expected)} for f in fields}
+
+    expected_keys = [normalize_value(row.get('part_number')) for row in expected]
+    actual_keys = [normalize_value(item.get('part_number')) for item in actual]
+    matcher = difflib.SequenceMatcher(None, expected_keys, actual_keys, autojunk=False)
+    pairs = []
+    for tag, e1, e2, a1, a2 in matcher.get_opcodes():
+        if tag in ('equal', 'replace'):
+            pairs.extend(zip(range(e1, e2), range(a1, a2)))
+
+    for e_idx, a_idx in pairs:
+        for f in fields:
+            if normalize_value(expected[e_idx].get(f)) == normalize_value(actual[a_idx].get(f)):
+                per_field[f]['correct'] += 1
+
+    correct = sum(v['correct'] for v in per_field.values())
+    total = sum(v['total'] for v in per_field.values())
+    return {
+        'expected_rows': len(expected),
+        'extracted_rows': len(actual),
+        'matched_rows': len(pairs),
+        'correct': correct,
+        'total': total,
+        'accuracy': round(correct / total, 4) if total else None,
+        'fields': per_field,
+    }
+
+
+def get_git_commit(path: Path) -> Optional[str]:
+    """Current commit of the repository containing path, if available."""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(path),
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class TemplateBenchmark:
+    """Runs templates over a PDF corpus and collects timing, memory and accuracy."""
+
+    def __init__(self, corpus: Path, golden_dir: Path = None, fields: List[str] = None,
+                 repeat: int = 1, measure_memory: bool = True, log=print):
+        """
+        Args:
+            corpus: Folder of sample PDFs
+            golden_dir: Folder of golden CSVs (default: the corpus folder)
+            fields: Item fields to compare (default: DEFAULT_FIELDS)
+            repeat: Timed runs per file (the median is reported)
+            measure_memory: Do an extra traced run per file for peak memory
+            log: Progress output callback
+        """
+        self.corpus = Path(corpus)
+        self.golden_dir = Path(golden_dir) if golden_dir else self.corpus
+        self.fields = fields or DEFAULT_FIELDS
+        self.repeat = max(1, repeat)
+        self.measure_memory = measure_memory
+        self.log = log
+        self.pdf_files = sorted(p for p in self.corpus.iterdir() if p.suffix.lower() == '.pdf')
+        config = OCRMillConfig()
+        config.result_cache_path = None  # Cached results would skip extraction entirely
+        self.engine = ProcessorEngine(DeferredStatsRecorder(), config, log_callback=lambda msg: None)
+        self._texts = {}
+
+    def _full_text(self, pdf_path: Path) -> str:
+        """Document text, extracted once per PDF for match checks."""
+        if pdf_path not in self._texts:
+            with ParsedDocument.open(pdf_path, streaming=True) as document:
+                self._texts[pdf_path] = document.full_text
+        return self._texts[pdf_path]
+
+    def _matches(self, name: str, template, text: str) -> bool:
+        """True if the forced template would be selected for this text (as in get_best_template)."""
+        routing = get_routing_index()
+        if name in routing.max_confidence and name not in routing.shortlist(text):
+            return False
+        return template.enabled and template.get_confidence_score(text) > 0
+
+    def _reset_memos(self):
+        """
+        Drop results memoized by the templates (SmartExtractor), so repeated and
+        traced runs of the same PDF measure extraction rather than memo hits.
+        """
+        for template in self.engine.templates.values():
+            extractor = getattr(template, '_extractor', None)
+            if extractor is not None and hasattr(extractor, 'clear_memo'):
+                extractor.clear_memo()
+
+    def _run_once(self, pdf_path: Path) -> tuple:
+        """Extract one PDF with the current config. Returns (items, elapsed_ms, page_count)."""
+        self._reset_memos()
+        start = time.perf_counter()
+        items = self.engine.process_pdf(pdf_path)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        records = self.engine.parts_db.take_records()
+        page_count = records[-1].get('page_count') if records else None
+        return items, elapsed_ms, page_count
+
+    def run_template(self, name: str) -> Dict:
+        """Benchmark one template (all others disabled) over the corpus."""
+        template = self.engine.templates[name]
+        self.engine.config.template_settings = {other: other == name for other in self.engine.templates}
+
+        files = []
+        for pdf_path in self.pdf_files:
+            if not self._matches(name, template, self._full_text(pdf_path)):
+                continue
+
+            runs = [self._run_once(pdf_path) for _ in range(self.repeat)]
+            items, _, page_count = runs[-1]
+            file_result = {
+                'file': pdf_path.name,
+                'pages': page_count,
+                'items': len(items),
+                'ms': round(statistics.median(run[1] for run in runs), 2),
+                'peak_mb': None,
+                'accuracy': None,
+            }
+
+            if self.measure_memory:
+                tracemalloc.start()
+                try:
+                    self._run_once(pdf_path)
+                    file_result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+                finally:
+                    tracemalloc.stop()
+
+            golden_path = self.golden_dir / f"{pdf_path.stem}.csv"
+            if golden_path.exists():
+                file_result['accuracy'] = compare_items(load_golden(golden_path), items, self.fields)
+            files.append(file_result)
+
+        total_ms = sum(f['ms'] for f in files)
+        total_items = sum(f['items'] for f in files)
+        total_pages = sum(f['pages'] or 0 for f in files)
+        scored = [f['accuracy'] for f in files if f['accuracy']]
+        correct = sum(a['correct'] for a in scored)
+        total = sum(a['total'] for a in scored)
+        peaks = [f['peak_mb'] for f in files if f['peak_mb'] is not None]
+
+        result = {
+            'template': name,
+            'template_name': template.name,
+            'version': str(getattr(template, 'version', '')),
+            'files_matched': len(files),
+            'files_with_golden': len(scored),
+            'items': total_items,
+            'pages': total_pages,
+            'total_ms': round(total_ms, 2),
+            'items_per_sec': round(total_items / (total_ms / 1000), 2) if total_ms else None,
+            'ms_per_page': round(total_ms / total_pages, 2) if total_pages else None,
+            'peak_mb': max(peaks) if peaks else None,
+            'accuracy': round(correct / total, 4) if total else None,
+            'files': files,
+        }
+        accuracy = "n/a" if result['accuracy'] is None else f"{result['accuracy']:.1%}"
+        self.log(f"{name}: {len(files)} file(s), {total_items} items, "
+                 f"{result['items_per_sec'] or 0:.1f} items/s, {result['ms_per_page'] or 0:.1f} ms/page, "
+                 f"accuracy {accuracy}")
+        return result
+
+    def run(self, template_names: List[str] = None) -> Dict:
+        """Benchmark the given templates (default: every registered template)."""
+        names = template_names or list(self.engine.templates)
+        unknown = [n for n in names if n not in self.engine.templates]
+        if unknown:
+            raise KeyError(f"Unknown template(s): {', '.join(unknown)}")
+
+        return {
+            'commit': get_git_commit(Path(__file__).parent),
+            'date': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'corpus': str(self.corpus),
+            'pdf_count': len(self.pdf_files),
+            'repeat': self.repeat,
+            'templates': {name: self.run_template(name) for name in names},
+        }
+
+
+def compare_runs(baseline: Dict, current: Dict) -> List[str]:
+    """Human-readable per-template changes between two benchmark outputs."""
+    lines = [f"Baseline {baseline.get('commit') or '?'} -> current {current.get('commit') or '?'}"]
+    for name, now in current['templates'].items():
+        before = baseline.get('templates', {}).get(name)
+        if not before:
+            lines.append(f"  {name}: new")
+            continue
+        parts = []
+        for key, label, fmt in (('items_per_sec', 'items/s', '{:+.1%}'),
+                                ('ms_per_page', 'ms/page', '{:+.1%}'),
+                                ('peak_mb', 'peak MB', '{:+.1%}')):
+            if before.get(key) and now.get(key) is not None:
+                parts.append(f"{label} {fmt.format(now[key] / before[key] - 1)}")
+        if before.get('accuracy') is not None and now.get('accuracy') is not None:
+            parts.append(f"accuracy {now['accuracy'] - before['accuracy']:+.2%}")
+        lines.append(f"  {name}: " + (", ".join(parts) if parts else "no comparable data"))
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point. Returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark OCRMill templates over a corpus of PDFs.")
+    parser.add_argument("corpus", help="Folder of sample PDFs (golden CSVs alongside, same stem)")
+    parser.add_argument("-t", "--template", action="append", help="Template to benchmark (may be repeated)")
+    parser.add_argument("--golden", help="Folder of golden CSVs (default: the corpus folder)")
+    parser.add_argument("--fields", help=f"Comma-separated fields to compare (default: {','.join(DEFAULT_FIELDS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per file; the median is used")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run for peak memory")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON output to compare against")
+    args = parser.parse_args(argv)
+
+    corpus = Path(args.corpus)
+    if not corpus.is_dir():
+        print(f"Error: Corpus folder not found: {corpus}", file=sys.stderr)
+        return 2
+
+    def log(message: str):
+        print(message, file=sys.stderr, flush=True)
+
+    benchmark = TemplateBenchmark(
+        corpus,
+        golden_dir=args.golden,
+        fields=args.fields.split(',') if args.fields else None,
+        repeat=args.repeat,
+        measure_memory=not args.no_memory,
+        log=log
+    )
+    try:
+        results = benchmark.run(args.template)
+    except KeyError as e:
+        log(f"Error: {e.args[0]}")
+        return 2
+
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for line in compare_runs(baseline, results):
+            log(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+OCRMill Extraction Result Cache for TariffMill
+Content-addressed cache of extracted line items, keyed by PDF hash and template.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+
+
+def hash_file(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Bump when extraction code shared by all templates changes in a way that alters
+# results (page parsing, invoice splitting in the processor) or when the cache
+# schema changes; caches written with another version are discarded on open.
+CACHE_VERSION = 3
+
+
+class ExtractionCache:
+    """
+    Persistent cache of process_pdf results.
+
+    Entries are keyed by the SHA-256 of the PDF contents and the name of the
+    template that was selected for it, and record the template version, a
+    fingerprint of the template's source code (see
+    ProcessorEngine.get_template_fingerprint) and a key of the template set the
+    selection was made from (see ProcessorEngine.get_template_set_key).
+
+    The processor looks a PDF up by hash before opening it (get_selection): while
+    the template set is unchanged, the same template would be selected again, so
+    its items are returned without parsing the PDF. After a template set change
+    it looks entries up after template selection instead, so a newly added or
+    better-scoring template is still applied to a PDF cached with another one.
+    Either way a hit is only returned while the version and fingerprint match.
+
+    The cache lives in its own SQLite file (normally on the local machine), separate
+    from the shared TariffMill database.
+    """
+
+    def __init__(self, cache_path: Path, max_age_days: int = 30, max_size_mb: int = 200):
+        """
+        Args:
+            cache_path: Path to the cache SQLite file (created if missing)
+            max_age_days: Entries not used for this many days are evicted
+            max_size_mb: Oldest entries are evicted once stored items exceed this size
+        """
+        self.cache_path = Path(cache_path)
+        self.max_age_days = max_age_days
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._ensure_table()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get a cache connection with row factory."""
+        conn = sqlite3.connect(str(self.cache_path), timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self):
+        """Create the extraction_cache table, discarding caches from other CACHE_VERSIONs."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] != CACHE_VERSION:
+            cursor.execute("DROP TABLE IF EXISTS extraction_cache")
+            cursor.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                pdf_hash TEXT NOT NULL,
+                template_name TEXT NOT NULL,
+                template_version TEXT,
+                template_fingerprint TEXT,
+                template_set TEXT,
+                confidence_score REAL,
+                item_count INTEGER DEFAULT 0,
+                items_json TEXT NOT NULL,
+                size_bytes INTEGER DEFAULT 0,
+                created_date TEXT NOT NULL,
+                last_used TEXT NOT NULL,
+                PRIMARY KEY (pdf_hash, template_name)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_extraction_cache_used ON extraction_cache(last_used)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_extraction_cache_created ON extraction_cache(pdf_hash, created_date)
+        """)
+        conn.commit()
+        conn.close()
+
+    def get_selection(self, pdf_hash: str) -> Optional[Dict]:
+        """
+        Template selection stored with a PDF's most recent extraction.
+
+        Returns:
+            Dict with template_name, template_set and confidence_score, or None
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT template_name, template_set, confidence_score FROM extraction_cache
+            WHERE pdf_hash = ?
+            ORDER BY created_date DESC
+            LIMIT 1
+        """, (pdf_hash,))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def get(self, pdf_hash: str, template, template_fingerprint: str) -> Optional[List[Dict]]:
+        """
+        Look up cached items for a PDF extracted with a template.
+
+        Args:
+            pdf_hash: SHA-256 of the PDF contents
+            template: Template selected for the PDF
+            template_fingerprint: Current fingerprint of the template's source code
+
+        Returns:
+            List of cached items, or None on a miss / stale entry (stale entries are deleted)
+        """
+        key = (pdf_hash, template.name)
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT template_version, template_fingerprint, items_json FROM extraction_cache
+                WHERE pdf_hash = ? AND template_name = ?
+            """, key)
+            row = cursor.fetchone()
+            if row is None:
+                conn.close()
+                return None
+
+            if (str(template.version) != row['template_version'] or
+                    template_fingerprint != row['template_fingerprint']):
+                # Template changed since this result was cached
+                cursor.execute("DELETE FROM extraction_cache WHERE pdf_hash = ? AND template_name = ?", key)
+                conn.commit()
+                conn.close()
+                return None
+
+            cursor.execute("UPDATE extraction_cache SET last_used = ? WHERE pdf_hash = ? AND template_name = ?",
+                           (datetime.now().isoformat(),) + key)
+            conn.commit()
+            conn.close()
+
+        return json.loads(row['items_json'])
+
+    def put(self, pdf_hash: str, template, template_fingerprint: str, template_set: str,
+            confidence_score: float, items: List[Dict]):
+        """Store extracted items for a PDF and template, replacing any previous entry."""
+        try:
+            items_json = json.dumps(items, default=str)
+        except (TypeError, ValueError):
+            return  # Items that can't be serialized are simply not cached
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO extraction_cache (
+                    pdf_hash, template_name, template_version, template_fingerprint, template_set,
+                    confidence_score, item_count, items_json, size_bytes, created_date, last_used
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                pdf_hash,
+                template.name,
+                str(template.version),
+                template_fingerprint,
+                template_set,
+                confidence_score,
+                len(items),
+                items_json,
+                len(items_json),
+                now,
+                now
+            ))
+            conn.commit()
+            conn.close()
+
+    def prune(self):
+        """Evict entries older than max_age_days, then oldest entries until under max_size_mb."""
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM extraction_cache WHERE last_used < ?", (cutoff,))
+
+            cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM extraction_cache")
+            total_size = cursor.fetchone()[0]
+            if total_size > self.max_size_bytes:
+                cursor.execute("""
+                    SELECT pdf_hash, template_name, size_bytes FROM extraction_cache ORDER BY last_used
+                """)
+                to_delete = []
+                for row in cursor.fetchall():
+                    if total_size <= self.max_size_bytes:
+                        break
+                    to_delete.append((row['pdf_hash'], row['template_name']))
+                    total_size -= row['size_bytes']
+                cursor.executemany("DELETE FROM extraction_cache WHERE pdf_hash = ? AND template_name = ?",
+                                   to_delete)
+
+            conn.commit()
+            conn.close()
+
+    def invalidate(self, pdf_hash: str = None):
+        """Remove the cached entries of one PDF, or the whole cache if pdf_hash is None."""
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            if pdf_hash:
+                cursor.execute("DELETE FROM extraction_cache WHERE pdf_hash = ?", (pdf_hash,))
+            else:
+                cursor.execute("DELETE FROM extraction_cache")
+            conn.commit()
+            conn.close()
+
+    def get_stats(self) -> Dict:
+        """Get cache entry count and total stored size."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) as entries, COALESCE(SUM(size_bytes), 0) as size_bytes
+            FROM extraction_cache
+        """)
+        stats = dict(cursor.fetchone())
+        conn.close()
+        return stats
@@ -0,0 +1,296 @@
+"""
+OCRMill Command-Line Batch Processing for TariffMill
+Headless PDF invoice extraction (no Qt / display required) with a JSONL run report.
+
+Usage:
+    python -m Tariffmill.ocrmill_cli --db tariffmill.db --output OCR_Output OCR_Input/
+    python ocrmill_cli.py --db tariffmill.db --workers 8 --report run.jsonl a.pdf b.pdf
+
+Exit codes:
+    0 - every PDF produced CSV output
+    1 - at least one PDF failed or had no items
+    2 - invalid arguments, missing or uninitialized database, or no PDFs found
+"""
+
+import argparse
+import json
+import multiprocessing
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Callable, Optional, Iterable
+
+try:
+    from Tariffmill.ocrmill_database import OCRMillDatabase
+    from Tariffmill.ocrmill_processor import (
+        ProcessorEngine, OCRMillConfig, init_worker_process, extract_pdf_in_worker
+    )
+except ImportError:
+    from ocrmill_database import OCRMillDatabase
+    from ocrmill_processor import (
+        ProcessorEngine, OCRMillConfig, init_worker_process, extract_pdf_in_worker
+    )
+
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+
+
+def collect_pdf_files(paths: Iterable[str], recursive: bool = False) -> tuple:
+    """
+    Expand command-line paths into a list of PDFs.
+
+    Folders contribute their *.pdf files (sorted by name); files are taken as given.
+    Duplicates are dropped, keeping first-seen order.
+
+    Returns:
+        Tuple of (pdf_files, missing_paths)
+    """
+    pdf_files = []
+    missing = []
+    seen = set()
+    for raw_path in paths:
+        path = Path(raw_path)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = sorted(p for p in path.glob(pattern)
+                                if p.is_file() and p.suffix.lower() == ".pdf")
+        elif path.is_file():
+            candidates = [path]
+        else:
+            missing.append(raw_path)
+            continue
+        for candidate in candidates:
+            key = candidate.resolve()
+            if key not in seen:
+                seen.add(key)
+                pdf_files.append(candidate)
+    return pdf_files, missing
+
+
+def finish_result(processor: ProcessorEngine, result: Dict, output_folder: Path,
+                  move_files: bool = False) -> Dict:
+    """
+    Complete one extraction result in the parent process and build its report record.
+
+    Replays the worker's template stats, writes CSVs / parts database entries, and
+    optionally moves the PDF to Processed/ or Failed/ next to it (as the GUI does).
+    """
+    pdf_path = Path(result['pdf_path'])
+    items = result.get('items') or []
+    error = result.get('error')
+    usage = {}
+    for record in result.get('template_usage', []):
+        usage = record
+        try:
+            processor.parts_db.record_template_usage(**record)
+        except Exception:
+            pass  # Don't fail on stat recording error
+
+    csv_files = []
+    save_start = time.time()
+    if items and not error:
+        try:
+            csv_files = processor.save_to_csv(items, output_folder, pdf_name=pdf_path.name)
+        except Exception as e:
+            error = f"CSV output failed: {e}"
+    save_ms = int((time.time() - save_start) * 1000)
+
+    if error:
+        status = 'error'
+    elif csv_files:
+        status = 'ok'
+    else:
+        status = 'no_items'
+
+    if move_files:
+        try:
+            if status == 'ok':
+                processor.move_to_processed(pdf_path, pdf_path.parent / "Processed")
+            else:
+                reason = error[:50] if error else "No items extracted"
+                processor.move_to_failed(pdf_path, pdf_path.parent / "Failed", reason)
+        except OSError as e:
+            processor.log(f"  Could not move {pdf_path.name}: {e}")
+
+    extract_ms = result.get('elapsed_ms', 0)
+    return {
+        'type': 'file',
+        'file': str(pdf_path),
+        'status': status,
+        'error': error,
+        'template': usage.get('template_name'),
+        'confidence': usage.get('confidence_score'),
+        'items': len(items) if status == 'ok' else 0,
+        'invoices': len({item.get('invoice_number', 'UNKNOWN') for item in items}) if status == 'ok' else 0,
+        'pages': usage.get('page_count'),
+        'csv_files': [str(path) for path in csv_files],
+        'extract_ms': extract_ms,
+        'save_ms': save_ms,
+        'total_ms': extract_ms + save_ms,
+        'stage_timings': usage.get('stage_timings') or {},
+        'finished': datetime.now().isoformat(),
+    }
+
+
+def run_batch(processor: ProcessorEngine, pdf_files: List[Path], output_folder: Path,
+              workers: int = 1, report_file=None, move_files: bool = False,
+              log: Callable[[str], None] = print) -> Dict:
+    """
+    Extract a list of PDFs, writing CSVs and one JSONL report line per file.
+
+    With more than one worker, extraction runs in a process pool (see
+    extract_pdf_in_worker); CSV output and database writes always happen here.
+
+    Returns:
+        Summary dict (also written as the last report line)
+    """
+    output_folder.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+    counts = {'ok': 0, 'no_items': 0, 'error': 0}
+    total_items = 0
+
+    def handle(result: Dict):
+        nonlocal total_items
+        for line in result.get('log', []):
+            log(line)
+        record = finish_result(processor, result, output_folder, move_files)
+        counts[record['status']] += 1
+        total_items += record['items']
+        if record['status'] == 'ok':
+            log(f"  ✓ {Path(record['file']).name}: {record['items']} items ({record['total_ms']} ms)")
+        elif record['status'] == 'no_items':
+            log(f"  - {Path(record['file']).name}: No items extracted")
+        else:
+            log(f"  ✗ {Path(record['file']).name}: {record['error']}")
+        if report_file is not None:
+            report_file.write(json.dumps(record, default=str) + "\n")
+            report_file.flush()
+
+    if workers > 1:
+        log(f"Processing {len(pdf_files)} PDF(s) with {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_process,
+                                 initargs=(processor.config,)) as executor:
+            futures = {executor.submit(extract_pdf_in_worker, str(path)): path for path in pdf_files}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. out of memory) - report and carry on
+                    result = {'pdf_path': str(futures[future]), 'items': [], 'error': str(e)}
+                handle(result)
+    else:
+        log(f"Processing {len(pdf_files)} PDF(s)...")
+        # One file at a time in this process, so large PDFs may still split their pages
+        init_worker_process(processor.config, page_parallel=True)
+        for path in pdf_files:
+            handle(extract_pdf_in_worker(str(path)))
+
+    summary = {
+        'type': 'summary',
+        'files': len(pdf_files),
+        'succeeded': counts['ok'],
+        'no_items': counts['no_items'],
+        'failed': counts['error'],
+        'items': total_items,
+        'workers': workers,
+        'elapsed_ms': int((time.time() - start_time) * 1000),
+        'finished': datetime.now().isoformat(),
+    }
+    if report_file is not None:
+        report_file.write(json.dumps(summary) + "\n")
+        report_file.flush()
+    log(f"Batch complete: {total_items} items from {counts['ok']} of {len(pdf_files)} file(s) "
+        f"in {summary['elapsed_ms'] / 1000:.1f}s")
+    return summary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line arguments for the batch runner."""
+    parser = argparse.ArgumentParser(
+        prog="ocrmill",
+        description="Extract invoice line items from PDFs to CSV without the TariffMill GUI."
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files and/or folders containing PDFs")
+    parser.add_argument("--db", required=True, help="Path to the TariffMill SQLite database")
+    parser.add_argument("-o", "--output", default="OCR_Output", help="Output folder for CSV files")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Worker processes (default: CPU count - 1; 1 = no process pool)")
+    parser.add_argument("--report", help="Write a JSONL run report to this file ('-' for stdout)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search folders recursively")
+    parser.add_argument("--consolidate", action="store_true",
+                        help="Write multi-invoice PDFs to a single CSV")
+    parser.add_argument("--move", action="store_true",
+                        help="Move PDFs to Processed/ or Failed/ next to each file afterwards")
+    parser.add_argument("--cache", help="SQLite file for cached extraction results")
+    parser.add_argument("--disable-template", action="append", default=[], metavar="NAME",
+                        help="Skip a template (may be repeated)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print errors and the summary")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the headless batch runner. Returns the process exit code."""
+    args = build_parser().parse_args(argv)
+
+    def log(message: str):
+        if not args.quiet or message.startswith(("  ✗", "Batch complete", "Error")):
+            print(message, file=sys.stderr, flush=True)
+
+    db_path = Path(args.db)
+    if not db_path.is_file():
+        log(f"Error: Database not found: {db_path}")
+        return EXIT_USAGE
+    database = OCRMillDatabase(db_path)
+    try:
+        missing_tables = database.get_missing_tables()
+    except sqlite3.DatabaseError as e:
+        log(f"Error: Not a TariffMill database: {db_path} ({e})")
+        return EXIT_USAGE
+    if missing_tables:
+        log(f"Error: Database is not initialized (missing tables: {', '.join(missing_tables)}). "
+            f"Open it in TariffMill once to create them: {db_path}")
+        return EXIT_USAGE
+
+    pdf_files, missing = collect_pdf_files(args.inputs, recursive=args.recursive)
+    for path in missing:
+        log(f"Error: No such file or folder: {path}")
+    if missing:
+        return EXIT_USAGE
+    if not pdf_files:
+        log("Error: No PDF files found")
+        return EXIT_USAGE
+
+    config = OCRMillConfig()
+    config.output_folder = Path(args.output)
+    config.consolidate_multi_invoice = args.consolidate
+    config.max_workers = max(args.workers, 0)
+    config.result_cache_path = Path(args.cache) if args.cache else None
+    for name in args.disable_template:
+        config.set_template_enabled(name, False)
+    workers = min(config.get_worker_count(use_processes=True), len(pdf_files))
+
+    processor = ProcessorEngine(database, config, log_callback=log)
+
+    report_file = None
+    try:
+        if args.report == "-":
+            report_file = sys.stdout
+        elif args.report:
+            report_file = open(args.report, "w", encoding="utf-8")
+        summary = run_batch(processor, pdf_files, config.output_folder, workers=workers,
+                            report_file=report_file, move_files=args.move, log=log)
+    finally:
+        if report_file is not None and report_file is not sys.stdout:
+            report_file.close()
+
+    return EXIT_OK if summary['succeeded'] == summary['files'] else EXIT_FAILURES
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
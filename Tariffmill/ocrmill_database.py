@@ -3,8 +3,10 @@ OCRMill Database Extensions for TariffMill
 Extends TariffMill's database with OCR invoice processing capabilities.
 """
 
+import math
 import sqlite3
 import threading
+import unicodedata
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
@@ -12,6 +14,13 @@ import pandas as pd
 import re
 
 
+# Lookup indexes per database file, shared by all OCRMillDatabase instances in the process
+_hts_index_cache = {}
+_hts_index_lock = threading.Lock()
+_manufacturer_index_cache = {}
+_manufacturer_index_lock = threading.Lock()
+
+
 class PartDescriptionExtractor:
     """
     Extracts product descriptions from part numbers and maps to HTS codes.
@@ -142,17 +151,182 @@ class PartDescriptionExtractor:
         return best_match if best_score > 0 else None
 
 
+class HTSMatchIndex:
+    """
+    Inverted index over hts_codes descriptions for matching item descriptions to HTS codes.
+
+    Each description word maps to the entries containing it. Entries are scored by the
+    summed IDF of the words they share with the query, normalized by entry length, so
+    rare words ("BOLLARD") outweigh common ones ("STEEL") and short, specific
+    descriptions win over long ones. Ties go to the earliest entry.
+    """
+
+    TOKEN_PATTERN = re.compile(r'[A-Z0-9]{3,}')
+
+    def __init__(self, entries: List[Tuple[str, str]]):
+        """
+        Args:
+            entries: (hts_code, description) pairs in table order
+        """
+        self.codes = []
+        self.norms = []
+        self.postings = {}
+
+        for hts_code, description in entries:
+            if not hts_code or not description:
+                continue
+            tokens = self.tokenize(description)
+            if not tokens:
+                continue
+            entry_id = len(self.codes)
+            self.codes.append(hts_code)
+            self.norms.append(math.sqrt(len(tokens)))
+            for token in tokens:
+                self.postings.setdefault(token, []).append(entry_id)
+
+        total = len(self.codes)
+        self.idf = {token: math.log((total + 1) / (len(ids) + 1)) + 1.0
+                    for token, ids in self.postings.items()}
+
+    @classmethod
+    def tokenize(cls, text: str) -> set:
+        """Uppercase alphanumeric words of at least 3 characters."""
+        return set(cls.TOKEN_PATTERN.findall(text.upper())) if text else set()
+
+    def match(self, description: str) -> Optional[str]:
+        """Return the best-scoring HTS code for a description, or None if no word matches."""
+        scores = {}
+        for token in self.tokenize(description):
+            ids = self.postings.get(token)
+            if not ids:
+                continue
+            weight = self.idf[token]
+            for entry_id in ids:
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight
+
+        if not scores:
+            return None
+        best_id = max(scores, key=lambda entry_id: (scores[entry_id] / self.norms[entry_id], -entry_id))
+        return self.codes[best_id]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class ManufacturerNameIndex:
+    """
+    In-memory index of mid_table manufacturer names for get_manufacturer_by_name.
+
+    Names are accent-stripped and lowercased once when the index is built. Exact
+    matches are a dict lookup; containment matches use the search string's own
+    substrings (names contained in the search) and a trigram index (names that
+    contain the search), so a lookup never scans the whole table.
+    """
+
+    NGRAM = 3
+
+    def __init__(self, rows: List[Dict]):
+        """
+        Args:
+            rows: mid_table rows as dicts, in table order
+        """
+        self.rows = rows
+        self.names = [self.normalize(row.get('manufacturer_name') or '') for row in rows]
+        self.exact = {}
+        self.ngrams = {}
+        for row_id, name in enumerate(self.names):
+            self.exact.setdefault(name, []).append(row_id)
+            for gram in self._ngrams(name):
+                self.ngrams.setdefault(gram, set()).add(row_id)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Strip accents (NFD combining marks) and lowercase."""
+        return ''.join(
+            c for c in unicodedata.normalize('NFD', name)
+            if unicodedata.category(c) != 'Mn'
+        ).lower()
+
+    @classmethod
+    def _ngrams(cls, text: str) -> set:
+        return {text[i:i + cls.NGRAM] for i in range(len(text) - cls.NGRAM + 1)}
+
+    def lookup(self, company_name: str) -> Optional[Dict]:
+        """
+        Find the manufacturer row for a company name.
+
+        An exact normalized match wins; otherwise the row whose name contains, or
+        is contained in, the search string with the best length ratio (earliest
+        row on ties).
+        """
+        search = self.normalize(company_name)
+
+        exact_ids = self.exact.get(search)
+        if exact_ids:
+            return dict(self.rows[exact_ids[0]])
+
+        # Names contained in the search string (including the empty name)
+        candidate_ids = set()
+        for start in range(len(search)):
+            for end in range(start + 1, len(search) + 1):
+                candidate_ids.update(self.exact.get(search[start:end], ()))
+        candidate_ids.update(self.exact.get('', ()))
+
+        # Names containing the search string
+        grams = self._ngrams(search)
+        if grams:
+            containing = set.intersection(*(self.ngrams.get(gram, set()) for gram in grams))
+        else:
+            containing = range(len(self.names))  # Search too short for trigrams
+        candidate_ids.update(row_id for row_id in containing if search in self.names[row_id])
+
+        best_id, best_score = None, None
+        for row_id in sorted(candidate_ids):
+            name = self.names[row_id]
+            score = min(len(search), len(name)) / max(len(search), len(name))
+            if best_score is None or score > best_score:
+                best_id, best_score = row_id, score
+
+        return dict(self.rows[best_id]) if best_id is not None else None
+
+
 class OCRMillDatabase:
     """
     Database extensions for OCRMill invoice processing.
     Uses TariffMill's existing database with additional OCRMill tables.
     """
 
+    # Tables created by TariffMill that invoice processing reads and writes
+    REQUIRED_TABLES = ('parts_master', 'part_occurrences', 'mid_table')
+
+    OCCURRENCE_INSERT_SQL = """
+        INSERT INTO part_occurrences (
+            part_number, invoice_number, project_number, quantity, total_price, unit_price,
+            steel_pct, steel_kg, steel_value,
+            aluminum_pct, aluminum_kg, aluminum_value,
+            net_weight, ncm_code, hts_code, processed_date, source_file, mid, client_code
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self._lock = threading.Lock()
         self.description_extractor = PartDescriptionExtractor()
 
+    def get_missing_tables(self) -> List[str]:
+        """
+        Names of the TariffMill tables invoice processing needs (REQUIRED_TABLES)
+        that don't exist yet, e.g. in a database TariffMill never opened.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            existing = {row['name'] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+        return [table for table in self.REQUIRED_TABLES if table not in existing]
+
     def _get_connection(self) -> sqlite3.Connection:
         """Get a database connection with row factory."""
         conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
@@ -178,67 +352,8 @@ class OCRMillDatabase:
                 conn.close()
                 return False
 
-            # Extract description if not provided
-            if not part_data.get('description'):
-                part_data['description'] = self.description_extractor.extract_description(part_number)
-
-            # Check for FSC certification in description
-            description = part_data.get('description', '')
-            if 'FSC 100%' in description or 'FSC100%' in description.replace(' ', ''):
-                part_data['fsc_certified'] = 'FSC 100%'
-                part_data['fsc_certificate_code'] = 'PBN-COC-065387'
-            elif 'FSC' in description.upper():
-                part_data['fsc_certified'] = 'FSC'
-
-            # Try to find HTS code if not provided
-            if not part_data.get('hts_code'):
-                hts_code = self.description_extractor.find_hts_from_description(part_data['description'])
-                if not hts_code:
-                    cursor.execute("SELECT * FROM hts_codes")
-                    hts_database = [dict(row) for row in cursor.fetchall()]
-                    hts_code = self.description_extractor.match_with_hts_database(
-                        part_data['description'], hts_database
-                    )
-                if hts_code:
-                    part_data['hts_code'] = hts_code
-
-            # Calculate unit price if not provided
-            unit_price = part_data.get('unit_price')
-            if not unit_price and part_data.get('total_price') and part_data.get('quantity'):
-                try:
-                    unit_price = float(part_data['total_price']) / float(part_data['quantity'])
-                except (ValueError, ZeroDivisionError):
-                    unit_price = None
-
             # Insert occurrence
-            cursor.execute("""
-                INSERT INTO part_occurrences (
-                    part_number, invoice_number, project_number, quantity, total_price, unit_price,
-                    steel_pct, steel_kg, steel_value,
-                    aluminum_pct, aluminum_kg, aluminum_value,
-                    net_weight, ncm_code, hts_code, processed_date, source_file, mid, client_code
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                part_number,
-                part_data.get('invoice_number'),
-                part_data.get('project_number'),
-                part_data.get('quantity'),
-                part_data.get('total_price'),
-                unit_price,
-                part_data.get('steel_pct'),
-                part_data.get('steel_kg'),
-                part_data.get('steel_value'),
-                part_data.get('aluminum_pct'),
-                part_data.get('aluminum_kg'),
-                part_data.get('aluminum_value'),
-                part_data.get('net_weight'),
-                part_data.get('ncm_code'),
-                part_data.get('hts_code'),
-                datetime.now().isoformat(),
-                part_data.get('source_file'),
-                part_data.get('mid'),
-                part_data.get('client_code')
-            ))
+            cursor.execute(self.OCCURRENCE_INSERT_SQL, self._prepare_occurrence(part_data, self.get_hts_index))
 
             # Update or create part master record
             self._update_part_master(cursor, part_number, part_data)
@@ -247,6 +362,205 @@ class OCRMillDatabase:
             conn.close()
             return True
 
+    def add_part_occurrences(self, items: List[Dict]) -> int:
+        """
+        Add part occurrences for many line items at once.
+
+        Same result as calling add_part_occurrence for each item in order, but runs in
+        one connection and one transaction: part_occurrences rows are inserted with
+        executemany and parts_master inserts/updates are resolved per part number.
+        Items are updated in place (description, hts_code, FSC fields) like
+        add_part_occurrence does.
+
+        Args:
+            items: List of part data dictionaries
+
+        Returns:
+            int: Number of occurrences added (items without part_number are skipped)
+        """
+        items = [part_data for part_data in items if part_data.get('part_number')]
+        if not items:
+            return 0
+
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            try:
+                rows = [self._prepare_occurrence(part_data, self.get_hts_index) for part_data in items]
+                part_numbers = list(dict.fromkeys(part_data['part_number'] for part_data in items))
+
+                # Existing parts and their most recent occurrence, before this batch
+                existing_parts = set()
+                latest = {}
+                for start in range(0, len(part_numbers), 500):
+                    chunk = part_numbers[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(f"SELECT part_number FROM parts_master WHERE part_number IN ({placeholders})", chunk)
+                    existing_parts.update(row['part_number'] for row in cursor.fetchall())
+                    cursor.execute(f"""
+                        SELECT part_number, steel_pct, aluminum_pct, MAX(processed_date) AS processed_date
+                        FROM part_occurrences
+                        WHERE part_number IN ({placeholders})
+                        GROUP BY part_number
+                    """, chunk)
+                    for row in cursor.fetchall():
+                        latest[row['part_number']] = (row['processed_date'], row['steel_pct'], row['aluminum_pct'])
+
+                cursor.executemany(self.OCCURRENCE_INSERT_SQL, rows)
+
+                # Fold each part's occurrences, in order, into one parts_master write
+                new_parts = {}      # part_number -> full row values
+                part_updates = {}   # part_number -> non-NULL values to COALESCE onto the row
+                for part_data, row in zip(items, rows):
+                    part_number = part_data['part_number']
+                    processed_date = row[15]
+                    previous = latest.get(part_number)
+                    if previous is None or previous[0] is None or processed_date >= previous[0]:
+                        latest[part_number] = (processed_date, part_data.get('steel_pct'), part_data.get('aluminum_pct'))
+                    _, steel_ratio, aluminum_ratio = latest[part_number]
+
+                    if part_number not in existing_parts and part_number not in new_parts:
+                        new_parts[part_number] = {
+                            'description': part_data.get('description'),
+                            'hts_code': part_data.get('hts_code'),
+                            'steel_ratio': steel_ratio,
+                            'aluminum_ratio': aluminum_ratio,
+                            'mid': part_data.get('mid'),
+                            'country_origin': part_data.get('country_origin'),
+                            'client_code': part_data.get('client_code'),
+                            'fsc_certified': part_data.get('fsc_certified'),
+                            'fsc_certificate_code': part_data.get('fsc_certificate_code'),
+                        }
+                        continue
+
+                    # HTS_CODE is NEVER updated from PDF (database is master)
+                    values = {
+                        'description': self._clean_master_value(part_data.get('description')),
+                        'steel_ratio': steel_ratio,
+                        'aluminum_ratio': aluminum_ratio,
+                        'mid': self._clean_master_value(part_data.get('mid')),
+                        'country_origin': self._clean_master_value(part_data.get('country_origin')),
+                        'client_code': self._clean_master_value(part_data.get('client_code')),
+                        'fsc_certified': self._clean_master_value(part_data.get('fsc_certified')),
+                        'fsc_certificate_code': self._clean_master_value(part_data.get('fsc_certificate_code')),
+                    }
+                    target = new_parts.get(part_number)
+                    if target is None:
+                        target = part_updates.setdefault(part_number, dict.fromkeys(values))
+                    for column, value in values.items():
+                        if value is not None:
+                            target[column] = value
+
+                now = datetime.now().isoformat()
+                cursor.executemany("""
+                    INSERT INTO parts_master (
+                        part_number, description, hts_code, steel_ratio, aluminum_ratio,
+                        mid, country_origin, client_code, fsc_certified, fsc_certificate_code, last_updated
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (part_number, v['description'], v['hts_code'], v['steel_ratio'], v['aluminum_ratio'],
+                     v['mid'], v['country_origin'], v['client_code'], v['fsc_certified'],
+                     v['fsc_certificate_code'], now)
+                    for part_number, v in new_parts.items()
+                ])
+                cursor.executemany("""
+                    UPDATE parts_master SET
+                        description = COALESCE(?, description),
+                        steel_ratio = COALESCE(?, steel_ratio),
+                        aluminum_ratio = COALESCE(?, aluminum_ratio),
+                        mid = COALESCE(?, mid),
+                        country_origin = COALESCE(?, country_origin),
+                        client_code = COALESCE(?, client_code),
+                        fsc_certified = COALESCE(?, fsc_certified),
+                        fsc_certificate_code = COALESCE(?, fsc_certificate_code),
+                        last_updated = ?
+                    WHERE part_number = ?
+                """, [
+                    (v['description'], v['steel_ratio'], v['aluminum_ratio'], v['mid'], v['country_origin'],
+                     v['client_code'], v['fsc_certified'], v['fsc_certificate_code'], now, part_number)
+                    for part_number, v in part_updates.items()
+                ])
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+        return len(items)
+
+    def _prepare_occurrence(self, part_data: Dict, get_hts_index) -> tuple:
+        """
+        Fill in description, FSC and HTS fields on part_data and build its part_occurrences row.
+
+        Args:
+            part_data: Dictionary containing part information (modified in place)
+            get_hts_index: Callable returning the HTSMatchIndex, only called when needed
+
+        Returns:
+            tuple: Parameters for OCCURRENCE_INSERT_SQL
+        """
+        part_number = part_data.get('part_number')
+
+        # Extract description if not provided
+        if not part_data.get('description'):
+            part_data['description'] = self.description_extractor.extract_description(part_number)
+
+        # Check for FSC certification in description
+        description = part_data.get('description', '')
+        if 'FSC 100%' in description or 'FSC100%' in description.replace(' ', ''):
+            part_data['fsc_certified'] = 'FSC 100%'
+            part_data['fsc_certificate_code'] = 'PBN-COC-065387'
+        elif 'FSC' in description.upper():
+            part_data['fsc_certified'] = 'FSC'
+
+        # Try to find HTS code if not provided
+        if not part_data.get('hts_code'):
+            hts_code = self.description_extractor.find_hts_from_description(part_data['description'])
+            if not hts_code:
+                hts_code = get_hts_index().match(part_data['description'])
+            if hts_code:
+                part_data['hts_code'] = hts_code
+
+        # Calculate unit price if not provided
+        unit_price = part_data.get('unit_price')
+        if not unit_price and part_data.get('total_price') and part_data.get('quantity'):
+            try:
+                unit_price = float(part_data['total_price']) / float(part_data['quantity'])
+            except (ValueError, ZeroDivisionError):
+                unit_price = None
+
+        return (
+            part_number,
+            part_data.get('invoice_number'),
+            part_data.get('project_number'),
+            part_data.get('quantity'),
+            part_data.get('total_price'),
+            unit_price,
+            part_data.get('steel_pct'),
+            part_data.get('steel_kg'),
+            part_data.get('steel_value'),
+            part_data.get('aluminum_pct'),
+            part_data.get('aluminum_kg'),
+            part_data.get('aluminum_value'),
+            part_data.get('net_weight'),
+            part_data.get('ncm_code'),
+            part_data.get('hts_code'),
+            datetime.now().isoformat(),
+            part_data.get('source_file'),
+            part_data.get('mid'),
+            part_data.get('client_code')
+        )
+
+    @staticmethod
+    def _clean_master_value(value):
+        """Normalize a value for a COALESCE update: blank strings become None."""
+        if value is None:
+            return None
+        str_val = str(value).strip()
+        return str_val if str_val else None
+
     def _update_part_master(self, cursor, part_number: str, part_data: Dict):
         """Update the parts_master table with latest occurrence data."""
         # Check if part exists
@@ -265,11 +579,7 @@ class OCRMillDatabase:
 
         if exists:
             # Update existing part - HTS_CODE is NEVER updated from PDF (database is master)
-            def clean_value(value):
-                if value is None:
-                    return None
-                str_val = str(value).strip()
-                return str_val if str_val else None
+            clean_value = self._clean_master_value
 
             new_mid = clean_value(part_data.get('mid'))
             new_country = clean_value(part_data.get('country_origin'))
@@ -352,28 +662,45 @@ class OCRMillDatabase:
             conn.close()
             return result['hts_code']
 
+        conn.close()
+
         # Try to match based on description keywords
         if description:
-            keywords = description.upper().split()
-            for keyword in keywords:
-                if len(keyword) > 3:
-                    cursor.execute("""
-                        SELECT hts_code, description
-                        FROM hts_codes
-                        WHERE UPPER(description) LIKE ?
-                        ORDER BY LENGTH(description)
-                        LIMIT 1
-                    """, (f'%{keyword}%',))
-                    result = cursor.fetchone()
-                    if result:
-                        conn.close()
-                        return result['hts_code']
-
-        conn.close()
+            hts_code = self.get_hts_index().match(description)
+            if hts_code:
+                return hts_code
 
         # Use description extractor as fallback
         return self.description_extractor.find_hts_from_description(description)
 
+    def get_hts_index(self) -> HTSMatchIndex:
+        """
+        Get the HTS description index for this database.
+
+        Built from hts_codes on first use and shared for the life of the process;
+        call invalidate_hts_index() after hts_codes is changed.
+        """
+        key = str(Path(self.db_path).resolve())
+        with _hts_index_lock:
+            index = _hts_index_cache.get(key)
+            if index is None:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT hts_code, description FROM hts_codes ORDER BY rowid")
+                    index = HTSMatchIndex([(row['hts_code'], row['description']) for row in cursor.fetchall()])
+                except sqlite3.OperationalError:
+                    index = HTSMatchIndex([])  # hts_codes table not created yet
+                finally:
+                    conn.close()
+                _hts_index_cache[key] = index
+            return index
+
+    def invalidate_hts_index(self):
+        """Drop the cached HTS description index so it is rebuilt from hts_codes on next use."""
+        with _hts_index_lock:
+            _hts_index_cache.pop(str(Path(self.db_path).resolve()), None)
+
     def load_hts_mapping(self, xlsx_path: Path) -> bool:
         """Load HTS code mapping from Excel file."""
         try:
@@ -402,6 +729,7 @@ class OCRMillDatabase:
 
             conn.commit()
             conn.close()
+            self.invalidate_hts_index()
             return True
         except Exception as e:
             print(f"Error loading HTS mapping: {e}")
@@ -411,40 +739,31 @@ class OCRMillDatabase:
         """Get manufacturer by company name from mid_table."""
         if not company_name:
             return None
+        return self.get_manufacturer_index().lookup(company_name)
 
-        import unicodedata
-        def normalize(s):
-            return ''.join(
-                c for c in unicodedata.normalize('NFD', s)
-                if unicodedata.category(c) != 'Mn'
-            ).lower()
-
-        normalized_search = normalize(company_name)
-
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM mid_table")
-
-        candidates = []
-        for row in cursor.fetchall():
-            db_name = row['manufacturer_name'] or ''
-            normalized_db = normalize(db_name)
+    def get_manufacturer_index(self) -> ManufacturerNameIndex:
+        """
+        Get the manufacturer name index for this database.
 
-            if normalized_db == normalized_search:
+        Built from mid_table on first use and shared for the life of the process;
+        call invalidate_manufacturer_index() after mid_table is changed.
+        """
+        key = str(Path(self.db_path).resolve())
+        with _manufacturer_index_lock:
+            index = _manufacturer_index_cache.get(key)
+            if index is None:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM mid_table")
+                index = ManufacturerNameIndex([dict(row) for row in cursor.fetchall()])
                 conn.close()
-                return dict(row)
+                _manufacturer_index_cache[key] = index
+            return index
 
-            if normalized_search in normalized_db or normalized_db in normalized_search:
-                score = min(len(normalized_search), len(normalized_db)) / max(len(normalized_search), len(normalized_db))
-                candidates.append((score, row))
-
-        conn.close()
-
-        if candidates:
-            candidates.sort(key=lambda x: x[0], reverse=True)
-            return dict(candidates[0][1])
-
-        return None
+    def invalidate_manufacturer_index(self):
+        """Drop the cached manufacturer name index so it is rebuilt from mid_table on next use."""
+        with _manufacturer_index_lock:
+            _manufacturer_index_cache.pop(str(Path(self.db_path).resolve()), None)
 
     def get_manufacturer_by_mid(self, mid: str) -> Optional[Dict]:
         """Get manufacturer by MID from mid_table."""
@@ -478,15 +797,41 @@ class OCRMillDatabase:
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_template_stats_date ON template_stats(processed_date)
         """)
+        # Per-stage timings for each template_stats row (see OCRMill ProcessorEngine stages)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS template_stage_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stats_id INTEGER NOT NULL,
+                template_name TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                duration_ms REAL NOT NULL,
+                page_count INTEGER,
+                char_count INTEGER,
+                processed_date TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_template_stage_stats_name ON template_stage_stats(template_name, stage)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_template_stage_stats_stats ON template_stage_stats(stats_id)
+        """)
         conn.commit()
         conn.close()
 
     def record_template_usage(self, template_name: str, pdf_file: str = None,
                               items_extracted: int = 0, confidence_score: float = None,
                               processing_time_ms: int = None, success: bool = True,
-                              error_message: str = None):
-        """Record template usage statistics."""
+                              error_message: str = None, stage_timings: Dict[str, float] = None,
+                              page_count: int = None, char_count: int = None):
+        """
+        Record template usage statistics.
+
+        stage_timings (stage name -> milliseconds), page_count and char_count are
+        stored in template_stage_stats, linked to the new template_stats row.
+        """
         self.ensure_template_stats_table()
+        now = datetime.now().isoformat()
         with self._lock:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -503,11 +848,119 @@ class OCRMillDatabase:
                 processing_time_ms,
                 1 if success else 0,
                 error_message,
-                datetime.now().isoformat()
+                now
             ))
+            if stage_timings:
+                stats_id = cursor.lastrowid
+                cursor.executemany("""
+                    INSERT INTO template_stage_stats (
+                        stats_id, template_name, stage, duration_ms, page_count, char_count, processed_date
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (stats_id, template_name, stage, duration_ms, page_count, char_count, now)
+                    for stage, duration_ms in stage_timings.items()
+                ])
             conn.commit()
             conn.close()
 
+    def record_stage_timings(self, pdf_file: str, stage_timings: Dict[str, float]):
+        """
+        Add stage timings measured after extraction (e.g. CSV export) to the most
+        recent template_stats row for pdf_file.
+
+        Skipped if that row already has these stages, e.g. when the same PDF's
+        items are saved again without being extracted again.
+        """
+        if not pdf_file or not stage_timings:
+            return
+        self.ensure_template_stats_table()
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, template_name FROM template_stats
+                WHERE pdf_file = ?
+                ORDER BY id DESC
+                LIMIT 1
+            """, (pdf_file,))
+            stats_row = cursor.fetchone()
+            if stats_row:
+                cursor.execute("""
+                    SELECT stage, page_count, char_count FROM template_stage_stats WHERE stats_id = ?
+                """, (stats_row['id'],))
+                existing = cursor.fetchall()
+                existing_stages = {row['stage'] for row in existing}
+                if not existing_stages & set(stage_timings):
+                    page_count = existing[0]['page_count'] if existing else None
+                    char_count = existing[0]['char_count'] if existing else None
+                    now = datetime.now().isoformat()
+                    cursor.executemany("""
+                        INSERT INTO template_stage_stats (
+                            stats_id, template_name, stage, duration_ms, page_count, char_count, processed_date
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, [
+                        (stats_row['id'], stats_row['template_name'], stage, duration_ms,
+                         page_count, char_count, now)
+                        for stage, duration_ms in stage_timings.items()
+                    ])
+                    conn.commit()
+            conn.close()
+
+    def get_stage_timing_percentiles(self, recent_per_template: int = 500) -> List[Dict]:
+        """
+        Get p50/p95 duration per template and processing stage.
+
+        Uses the most recent recent_per_template PDFs of each template.
+
+        Returns:
+            List of dicts with template_name, stage, samples, p50_ms, p95_ms,
+            avg_pages and avg_chars, ordered by template then stage order of use
+        """
+        self.ensure_template_stats_table()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.template_name, s.stage, s.duration_ms, s.page_count, s.char_count
+            FROM template_stage_stats s
+            WHERE s.stats_id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY template_name ORDER BY id DESC) AS rn
+                    FROM template_stats
+                ) WHERE rn <= ?
+            )
+            ORDER BY s.template_name, s.id
+        """, (recent_per_template,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        groups = {}
+        for row in rows:
+            group = groups.setdefault((row['template_name'], row['stage']), {'durations': [], 'pages': [], 'chars': []})
+            group['durations'].append(row['duration_ms'])
+            if row['page_count'] is not None:
+                group['pages'].append(row['page_count'])
+            if row['char_count'] is not None:
+                group['chars'].append(row['char_count'])
+
+        def percentile(sorted_values, pct):
+            # Nearest-rank percentile
+            rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+            return sorted_values[rank - 1]
+
+        results = []
+        for (template_name, stage), group in groups.items():
+            durations = sorted(group['durations'])
+            results.append({
+                'template_name': template_name,
+                'stage': stage,
+                'samples': len(durations),
+                'p50_ms': round(percentile(durations, 50), 1),
+                'p95_ms': round(percentile(durations, 95), 1),
+                'avg_pages': round(sum(group['pages']) / len(group['pages']), 1) if group['pages'] else None,
+                'avg_chars': int(sum(group['chars']) / len(group['chars'])) if group['chars'] else None,
+            })
+        return results
+
     def get_template_statistics(self) -> List[Dict]:
         """Get aggregated template usage statistics."""
         self.ensure_template_stats_table()
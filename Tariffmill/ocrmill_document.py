@@ -0,0 +1,253 @@
+"""
+OCRMill Parsed Document for TariffMill
+Single-pass PDF parsing layer - each page's text and tables are extracted once and memoized.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import List, Iterator, Optional
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+
+def extract_pages_in_worker(pdf_path: str, page_indices: List[int], tables: bool = False,
+                            with_tables: bool = False) -> List:
+    """
+    Extract text (or tables) for some pages of a PDF inside a worker process.
+
+    Returns one entry per index: the page text / table list, or None if that page
+    failed (it is then extracted on demand in the parent, which logs the error).
+    With with_tables, text entries are (text, tables) pairs, tables being None if
+    only the table extraction failed.
+    """
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for idx in page_indices:
+            page = pdf.pages[idx]
+            try:
+                if tables:
+                    results.append(page.extract_tables() or [])
+                elif with_tables:
+                    text = page.extract_text() or ""
+                    try:
+                        page_tables = page.extract_tables() or []
+                    except Exception:
+                        page_tables = None
+                    results.append((text, page_tables))
+                else:
+                    results.append(page.extract_text() or "")
+            except Exception:
+                results.append(None)
+            page.close()
+    return results
+
+
+class ParsedPage:
+    """
+    A single PDF page whose text and tables are extracted at most once.
+
+    pdfplumber's extract_text()/extract_tables() re-run layout analysis on every
+    call, so all consumers (template detection, BOL scan, invoice splitting)
+    should read from this wrapper instead of the raw page.
+    """
+
+    def __init__(self, page, index: int, release_after_text: bool = False, with_tables: bool = False):
+        """
+        Args:
+            page: pdfplumber Page object
+            index: Zero-based page index within the document
+            release_after_text: Drop pdfplumber's layout caches as soon as the
+                text has been extracted (used for streaming large PDFs)
+            with_tables: Extract the tables together with the text, while the
+                page layout is loaded (cheap compared to parsing the page again)
+        """
+        self.index = index
+        self._page = page
+        self._release_after_text = release_after_text
+        self._with_tables = with_tables
+        self._text = None
+        self._lower = None
+        self._tables = None
+        self._tables_error = None
+
+    @property
+    def number(self) -> int:
+        """One-based page number for log messages."""
+        return self.index + 1
+
+    @property
+    def text(self) -> str:
+        """Page text (empty string if nothing could be extracted)."""
+        if self._text is None:
+            self._text = self._page.extract_text() or ""
+            if self._with_tables and self._tables is None:
+                try:
+                    self._tables = self._page.extract_tables() or []
+                except Exception as e:
+                    self._tables = []
+                    self._tables_error = e  # Raised on first access to tables
+            if self._release_after_text:
+                self._flush_page_cache()
+        return self._text
+
+    @property
+    def lower(self) -> str:
+        """Lowercase page text, used for keyword checks."""
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def tables(self) -> List[List[List[str]]]:
+        """
+        Tables detected on the page.
+
+        A failed extraction is memoized as an empty list and the error re-raised
+        once, so callers can log it without the page being parsed again.
+        """
+        if self._tables_error is not None:
+            error, self._tables_error = self._tables_error, None
+            raise error
+        if self._tables is None:
+            try:
+                self._tables = self._page.extract_tables() or []
+            except Exception:
+                self._tables = []
+                raise
+        return self._tables
+
+    def _flush_page_cache(self):
+        """Drop pdfplumber's cached layout objects for this page."""
+        if hasattr(self._page, 'close'):
+            self._page.close()
+        elif hasattr(self._page, 'flush_cache'):
+            self._page.flush_cache()
+
+    def release(self):
+        """
+        Free memory held for this page once the caller is done with it.
+
+        The extracted text is kept (it is small and needed for later passes);
+        tables and pdfplumber's layout caches are dropped and will be rebuilt
+        if accessed again.
+        """
+        self._tables = None
+        self._flush_page_cache()
+
+
+class ParsedDocument:
+    """
+    Memoized view over an open pdfplumber PDF.
+
+    Usage:
+        with ParsedDocument.open(pdf_path) as document:
+            for page in document:
+                print(page.number, len(page.text))
+    """
+
+    def __init__(self, pdf, streaming: bool = False, with_tables: bool = False):
+        """
+        Args:
+            pdf: Open pdfplumber PDF object. Closed by close() if owned.
+            streaming: Release each page's layout caches right after its text is
+                extracted, so memory does not grow with page count
+            with_tables: Extract each page's tables together with its text (see
+                ParsedPage), so a streamed page is never parsed a second time
+        """
+        self._pdf = pdf
+        self._owns_pdf = False
+        self.path = None
+        self.with_tables = with_tables
+        self.pages = [ParsedPage(page, idx, release_after_text=streaming, with_tables=with_tables)
+                      for idx, page in enumerate(pdf.pages)]
+        self._full_text = None
+
+    @classmethod
+    def open(cls, pdf_path: Path, streaming: bool = False, with_tables: bool = False) -> 'ParsedDocument':
+        """Open a PDF file and wrap it. The returned document owns the file handle."""
+        if pdfplumber is None:
+            raise ImportError("pdfplumber is not installed. Run: pip install pdfplumber")
+        document = cls(pdfplumber.open(pdf_path), streaming=streaming, with_tables=with_tables)
+        document._owns_pdf = True
+        document.path = Path(pdf_path)
+        return document
+
+    def prefetch_parallel(self, max_workers: int, tables: bool = False,
+                          page_indices: Optional[List[int]] = None) -> bool:
+        """
+        Extract page text (or tables) across worker processes. Text extraction
+        also extracts tables if the document was opened with_tables.
+
+        Pages are split into contiguous chunks, each worker opens the PDF itself,
+        and results are memoized on the pages in page order - later access is
+        identical to sequential extraction, just already done.
+
+        Args:
+            max_workers: Number of worker processes
+            tables: Extract tables instead of text
+            page_indices: Pages to extract (default: all pages not yet extracted)
+
+        Returns:
+            bool: False if parallel extraction could not run (pages are then
+                  extracted on demand as usual)
+        """
+        if self.path is None or max_workers < 2:
+            return False
+        if page_indices is None:
+            page_indices = [page.index for page in self.pages
+                            if (page._tables if tables else page._text) is None]
+        if not page_indices:
+            return True
+
+        # Several chunks per worker to even out slow pages
+        chunk_size = max(1, -(-len(page_indices) // (max_workers * 4)))
+        chunks = [page_indices[i:i + chunk_size] for i in range(0, len(page_indices), chunk_size)]
+
+        with_tables = self.with_tables and not tables
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                results = executor.map(extract_pages_in_worker, repeat(str(self.path)), chunks,
+                                       repeat(tables), repeat(with_tables))
+                for chunk, chunk_results in zip(chunks, results):
+                    for idx, value in zip(chunk, chunk_results):
+                        if value is None:
+                            continue
+                        if tables:
+                            self.pages[idx]._tables = value
+                        elif with_tables:
+                            self.pages[idx]._text, self.pages[idx]._tables = value
+                        else:
+                            self.pages[idx]._text = value
+        except Exception:
+            return False
+        return True
+
+    @property
+    def full_text(self) -> str:
+        """Text of all pages, each non-empty page followed by a newline."""
+        if self._full_text is None:
+            self._full_text = "".join(page.text + "\n" for page in self.pages if page.text)
+        return self._full_text
+
+    def close(self):
+        """Close the underlying PDF if this document opened it."""
+        if self._owns_pdf and self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __iter__(self) -> Iterator[ParsedPage]:
+        return iter(self.pages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,269 @@
+"""
+OCRMill Page Store for TariffMill
+Persistent, compressed store of extracted PDF page text and tables, keyed by PDF hash.
+"""
+
+import json
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+
+try:
+    from Tariffmill.ocrmill_cache import hash_file
+    from Tariffmill.ocrmill_document import ParsedDocument
+except ImportError:
+    from ocrmill_cache import hash_file
+    from ocrmill_document import ParsedDocument
+
+
+class PageStore:
+    """
+    On-disk store of per-page text and tables.
+
+    Template authoring tools (AI assistant, template generator, SmartExtractor)
+    repeatedly extract the same sample PDFs; with the store only the first read
+    runs pdfplumber, later reads decompress the stored pages. Entries are keyed by
+    the SHA-256 of the PDF contents, so a renamed copy is still a hit and an edited
+    file is a miss. Pages are stored individually and only extracted on demand, so
+    reading the first 5 pages of a 200-page PDF does not parse the rest.
+    """
+
+    def __init__(self, store_path: Path, max_age_days: int = 60, max_size_mb: int = 200):
+        """
+        Args:
+            store_path: Path to the store SQLite file (created if missing)
+            max_age_days: PDFs not read for this many days are evicted
+            max_size_mb: Least recently read PDFs are evicted once stored pages exceed this size
+        """
+        self.store_path = Path(store_path)
+        self.max_age_days = max_age_days
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._hashes = {}  # (path, size, mtime_ns) -> pdf hash
+        self._ensure_tables()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get a store connection."""
+        return sqlite3.connect(str(self.store_path), timeout=10, check_same_thread=False)
+
+    def _ensure_tables(self):
+        """Create the page store tables if they don't exist."""
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS page_store_files (
+                pdf_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL,
+                size_bytes INTEGER DEFAULT 0,
+                last_used TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS page_store_pages (
+                pdf_hash TEXT NOT NULL,
+                page_index INTEGER NOT NULL,
+                text_data BLOB,
+                tables_data BLOB,
+                PRIMARY KEY (pdf_hash, page_index)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get_pdf_hash(self, pdf_path: Path) -> str:
+        """SHA-256 of a PDF, memoized per path/size/mtime for the life of the store."""
+        stat = Path(pdf_path).stat()
+        key = (str(Path(pdf_path).resolve()), stat.st_size, stat.st_mtime_ns)
+        pdf_hash = self._hashes.get(key)
+        if pdf_hash is None:
+            pdf_hash = hash_file(Path(pdf_path))
+            self._hashes[key] = pdf_hash
+        return pdf_hash
+
+    def get_page_texts(self, pdf_path, max_pages: int = None) -> List[str]:
+        """
+        Text of each page (empty string for pages without text).
+
+        Args:
+            pdf_path: Path to the PDF file
+            max_pages: Only return the first max_pages pages (None = all)
+        """
+        return self._get_pages(Path(pdf_path), max_pages, tables=False)
+
+    def get_page_tables(self, pdf_path, max_pages: int = None) -> List[List[List[List[str]]]]:
+        """
+        Tables detected on each page (one list of tables per page).
+
+        Args:
+            pdf_path: Path to the PDF file
+            max_pages: Only return the first max_pages pages (None = all)
+        """
+        return self._get_pages(Path(pdf_path), max_pages, tables=True)
+
+    def _get_pages(self, pdf_path: Path, max_pages: Optional[int], tables: bool) -> List:
+        """Read stored pages, extracting and storing any that are missing."""
+        pdf_hash = self.get_pdf_hash(pdf_path)
+        column = "tables_data" if tables else "text_data"
+
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT page_count FROM page_store_files WHERE pdf_hash = ?", (pdf_hash,))
+            row = cursor.fetchone()
+            stored = {}
+            page_count = None
+            if row:
+                page_count = row[0]
+                cursor.execute(f"""
+                    SELECT page_index, {column} FROM page_store_pages
+                    WHERE pdf_hash = ? AND page_index < ? AND {column} IS NOT NULL
+                """, (pdf_hash, page_count if max_pages is None else max_pages))
+                stored = {page_index: json.loads(zlib.decompress(data))
+                          for page_index, data in cursor.fetchall()}
+            conn.close()
+
+        wanted = None if page_count is None else (
+            page_count if max_pages is None else min(page_count, max_pages))
+        if wanted is not None and len(stored) == wanted:
+            self._touch(pdf_hash)
+            return [stored[idx] for idx in range(wanted)]
+
+        page_count, extracted = self._extract(pdf_path, max_pages, tables, skip=set(stored))
+        self._save(pdf_hash, page_count, extracted, column)
+        stored.update(extracted)
+        wanted = page_count if max_pages is None else min(page_count, max_pages)
+        return [stored[idx] for idx in range(wanted)]
+
+    def _extract(self, pdf_path: Path, max_pages: Optional[int], tables: bool,
+                 skip: set) -> Tuple[int, Dict[int, object]]:
+        """Extract the requested pages not already stored. Returns (page_count, {index: value})."""
+        extracted = {}
+        with ParsedDocument.open(pdf_path, streaming=not tables) as document:
+            for page in document.pages[:max_pages]:
+                if page.index in skip:
+                    continue
+                extracted[page.index] = page.tables if tables else page.text
+                page.release()
+            return len(document), extracted
+
+    def _save(self, pdf_hash: str, page_count: int, pages: Dict[int, object], column: str):
+        """Store extracted pages (compressed JSON) and update the file's size/last use."""
+        rows = []
+        added_bytes = 0
+        for page_index, value in pages.items():
+            data = zlib.compress(json.dumps(value).encode('utf-8'))
+            added_bytes += len(data)
+            rows.append((pdf_hash, page_index, data))
+
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO page_store_files (pdf_hash, page_count, size_bytes, last_used)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(pdf_hash) DO UPDATE SET
+                    size_bytes = size_bytes + excluded.size_bytes,
+                    last_used = excluded.last_used
+            """, (pdf_hash, page_count, added_bytes, now))
+            cursor.executemany("""
+                INSERT INTO page_store_pages (pdf_hash, page_index) VALUES (?, ?)
+                ON CONFLICT(pdf_hash, page_index) DO NOTHING
+            """, [(pdf_hash, page_index) for _, page_index, _ in rows])
+            cursor.executemany(f"""
+                UPDATE page_store_pages SET {column} = ? WHERE pdf_hash = ? AND page_index = ?
+            """, [(data, pdf_hash, page_index) for _, page_index, data in rows])
+            conn.commit()
+            conn.close()
+
+    def _touch(self, pdf_hash: str):
+        """Record that a PDF's pages were read (for eviction)."""
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute("UPDATE page_store_files SET last_used = ? WHERE pdf_hash = ?",
+                         (datetime.now().isoformat(), pdf_hash))
+            conn.commit()
+            conn.close()
+
+    def prune(self):
+        """Evict PDFs older than max_age_days, then least recently read PDFs until under max_size_mb."""
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT pdf_hash FROM page_store_files WHERE last_used < ?", (cutoff,))
+            to_delete = [(row[0],) for row in cursor.fetchall()]
+
+            cursor.execute("""
+                SELECT pdf_hash, size_bytes FROM page_store_files
+                WHERE last_used >= ? ORDER BY last_used DESC
+            """, (cutoff,))
+            total_size = 0
+            for pdf_hash, size_bytes in cursor.fetchall():
+                total_size += size_bytes or 0
+                if total_size > self.max_size_bytes:
+                    to_delete.append((pdf_hash,))
+
+            cursor.executemany("DELETE FROM page_store_pages WHERE pdf_hash = ?", to_delete)
+            cursor.executemany("DELETE FROM page_store_files WHERE pdf_hash = ?", to_delete)
+            conn.commit()
+            conn.close()
+
+    def invalidate(self, pdf_path=None):
+        """Remove one PDF's stored pages, or the whole store if pdf_path is None."""
+        pdf_hash = self.get_pdf_hash(Path(pdf_path)) if pdf_path else None
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            if pdf_hash:
+                cursor.execute("DELETE FROM page_store_pages WHERE pdf_hash = ?", (pdf_hash,))
+                cursor.execute("DELETE FROM page_store_files WHERE pdf_hash = ?", (pdf_hash,))
+            else:
+                cursor.execute("DELETE FROM page_store_pages")
+                cursor.execute("DELETE FROM page_store_files")
+            conn.commit()
+            conn.close()
+
+
+# Shared store used by the template authoring tools (see get_page_store)
+DEFAULT_STORE_PATH = Path.home() / ".tariffmill" / "Cache" / "ocrmill_pages.db"
+_page_store = None
+_page_store_path = DEFAULT_STORE_PATH
+_page_store_configured = False  # set_page_store_path() called (see get_configured_page_store)
+_page_store_lock = threading.Lock()
+
+
+def set_page_store_path(store_path: Path):
+    """Use a different store file (e.g. under the TariffMill data folder)."""
+    global _page_store, _page_store_path, _page_store_configured
+    with _page_store_lock:
+        _page_store_configured = True
+        if Path(store_path) != _page_store_path:
+            _page_store_path = Path(store_path)
+            _page_store = None
+
+
+def get_page_store() -> PageStore:
+    """Shared PageStore, opened (and pruned) on first use."""
+    global _page_store
+    with _page_store_lock:
+        if _page_store is None:
+            _page_store = PageStore(_page_store_path)
+            _page_store.prune()
+        return _page_store
+
+
+def get_configured_page_store() -> Optional[PageStore]:
+    """
+    Shared PageStore if the application chose a store file with set_page_store_path(),
+    else None. For library code (e.g. SmartExtractor) that may also run outside
+    TariffMill and must not create a store in the user's home folder on its own.
+    """
+    with _page_store_lock:
+        if not _page_store_configured:
+            return None
+    return get_page_store()
@@ -3,10 +3,18 @@ OCRMill Processing Engine for TariffMill
 PDF invoice processing using OCR templates.
 """
 
+import copy
 import csv
+import hashlib
+import inspect
+import json
+import os
+import pickle
 import re
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Iterable, Iterator
 from datetime import datetime
 import time
 
@@ -16,11 +24,20 @@ except ImportError:
     pdfplumber = None
 
 try:
-    from Tariffmill.templates import get_all_templates, refresh_templates
+    from Tariffmill.templates import get_template_registry, refresh_templates
     from Tariffmill.templates.bill_of_lading import BillOfLadingTemplate
+    from Tariffmill.ocrmill_document import ParsedDocument
+    from Tariffmill.ocrmill_cache import ExtractionCache, hash_file
 except ImportError:
-    from templates import get_all_templates, refresh_templates
+    from templates import get_template_registry, refresh_templates
     from templates.bill_of_lading import BillOfLadingTemplate
+    from ocrmill_document import ParsedDocument
+    from ocrmill_cache import ExtractionCache, hash_file
+
+
+# Leading CSV columns; any other item fields follow in first-seen order
+CSV_BASE_COLUMNS = ['invoice_number', 'project_number', 'part_number', 'description',
+                    'mid', 'country_origin', 'hts_code', 'quantity', 'quantity_unit', 'total_price']
 
 
 class OCRMillConfig:
@@ -33,6 +50,13 @@ class OCRMillConfig:
         self.poll_interval = 60
         self.auto_start = False
         self.template_settings = {}  # template_name -> enabled
+        self.use_process_pool = True  # parallel workers run in separate processes (GIL-free parsing)
+        self.max_workers = 0  # 0 = automatic (based on CPU count)
+        self.result_cache_path = None  # SQLite file for cached extraction results (None = disabled)
+        self.result_cache_max_age_days = 30
+        self.result_cache_max_mb = 200
+        # Split page extraction of PDFs with at least this many pages across processes (0 = never)
+        self.page_parallel_threshold = 40
 
     def get_template_enabled(self, template_name: str) -> bool:
         """Check if a template is enabled."""
@@ -42,6 +66,66 @@ class OCRMillConfig:
         """Set template enabled state."""
         self.template_settings[template_name] = enabled
 
+    def get_worker_count(self, use_processes: bool = None) -> int:
+        """
+        Number of parallel workers to use for multi-file processing.
+
+        Thread workers stay capped at 4 because pdfplumber parsing holds the GIL.
+        Process workers scale with the CPU count, leaving one core for the UI.
+        """
+        if self.max_workers and self.max_workers > 0:
+            return self.max_workers
+        if use_processes is None:
+            use_processes = self.use_process_pool
+        cpu_count = os.cpu_count() or 4
+        if use_processes:
+            return max(1, cpu_count - 1)
+        return min(cpu_count, 4)
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per processing stage.
+
+    Stages (stored in template_stage_stats): cache_lookup, text_extraction,
+    template_scoring, table_extraction, line_items, enrichment, csv_output.
+    Results served from the extraction cache also record a cache_hit stage.
+    """
+
+    def __init__(self):
+        self.timings = {}  # stage -> milliseconds
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of work, adding to any earlier time for the same stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed_ms, 2)
+
+
+class DeferredStatsRecorder:
+    """
+    Stand-in for OCRMillDatabase inside worker processes.
+
+    Collects record_template_usage() calls so the parent process can replay them
+    against the real database - worker processes never write to SQLite.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def record_template_usage(self, **kwargs):
+        """Queue a template usage record for the parent process."""
+        self.records.append(kwargs)
+
+    def take_records(self) -> List[Dict]:
+        """Return and clear the queued records."""
+        records, self.records = self.records, []
+        return records
+
 
 class ProcessorEngine:
     """Core processing engine using templates for PDF invoice extraction."""
@@ -57,13 +141,138 @@ class ProcessorEngine:
         """
         self.config = config or OCRMillConfig()
         self.log_callback = log_callback or print
-        self.templates = {}
+        self._active_templates = ({}, None)  # (name -> template instance, routing index)
         self.parts_db = db
+        self.result_cache = None
+        self._template_fingerprints = {}  # source path -> (mtime_ns, digest)
         self._load_templates()
+        self._init_result_cache()
 
     def _load_templates(self):
-        """Load all available templates."""
-        self.templates = get_all_templates()
+        """Load all available templates from the current registry snapshot."""
+        registry = get_template_registry()
+        # Replaced as one tuple so a file in progress never mixes two registries
+        self._active_templates = (registry.get_instances(), registry.routing)
+
+    @property
+    def templates(self) -> Dict:
+        """Current template instances, keyed by name."""
+        return self._active_templates[0]
+
+    def _init_result_cache(self):
+        """Open the extraction result cache if configured, evicting stale entries."""
+        cache_path = getattr(self.config, 'result_cache_path', None)
+        if not cache_path:
+            return
+        try:
+            self.result_cache = ExtractionCache(
+                Path(cache_path),
+                max_age_days=self.config.result_cache_max_age_days,
+                max_size_mb=self.config.result_cache_max_mb
+            )
+            self.result_cache.prune()
+        except Exception as e:
+            self.log(f"Warning: Extraction result cache disabled: {e}")
+            self.result_cache = None
+
+    @staticmethod
+    def _template_source_files(template) -> List[Path]:
+        """
+        Source files a template's results depend on: the modules of its class
+        hierarchy (e.g. base_template.py) and of the classes its module imports
+        (e.g. SmartExtractor for the smart templates).
+        """
+        template_class = type(template)
+        classes = list(template_class.__mro__)
+        module = inspect.getmodule(template_class)
+        if module is not None:
+            classes.extend(value for value in vars(module).values() if inspect.isclass(value))
+
+        files = []
+        for cls in classes:
+            try:
+                source = Path(inspect.getfile(cls))
+            except TypeError:
+                continue  # Built-in class
+            if source not in files:
+                files.append(source)
+        return files
+
+    def get_template_fingerprint(self, template) -> str:
+        """
+        Fingerprint of a template's source code, used to invalidate cached results.
+
+        Covers the template file and the shared code it builds on (see
+        _template_source_files). Each file's digest is recomputed only when its
+        mtime changes.
+        """
+        digest = hashlib.sha1()
+        for source in self._template_source_files(template):
+            source_digest = self._get_source_digest(source)
+            if source_digest:
+                digest.update(f"{source.name}:{source_digest}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _get_source_digest(self, source: Path) -> Optional[str]:
+        """Digest of a source file, recomputed only when its mtime changes (None if missing)."""
+        try:
+            mtime_ns = source.stat().st_mtime_ns
+        except OSError:
+            return None  # No source on disk (e.g. frozen build)
+        cached = self._template_fingerprints.get(source)
+        if not cached or cached[0] != mtime_ns:
+            cached = (mtime_ns, hashlib.sha1(source.read_bytes()).hexdigest())
+            self._template_fingerprints[source] = cached
+        return cached[1]
+
+    def get_template_set_key(self, templates: Dict) -> str:
+        """
+        Key of the template set selection is made from: every template's name,
+        whether it is enabled, its version and the digest of its own file.
+
+        Unlike the registry generation this stays the same across runs, so a
+        cached selection remains valid until a template is added, removed,
+        enabled/disabled or edited.
+        """
+        digest = hashlib.sha1()
+        for name, template in templates.items():
+            enabled = self.config.get_template_enabled(name) and template.enabled
+            try:
+                source_digest = self._get_source_digest(Path(inspect.getfile(type(template))))
+            except TypeError:
+                source_digest = None
+            digest.update(f"{name}:{enabled}:{template.version}:{source_digest}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _get_cached_selection(self, pdf_hash: str) -> Optional[Dict]:
+        """Template selection cached with a PDF's last extraction (errors are logged, never raised)."""
+        try:
+            return self.result_cache.get_selection(pdf_hash)
+        except Exception as e:
+            self.log(f"  Result cache lookup failed: {e}")
+            return None
+
+    def _get_cached_items(self, pdf_hash: str, template) -> Optional[List[Dict]]:
+        """Return items cached for a PDF hash and template if the template is unchanged."""
+        try:
+            items = self.result_cache.get(pdf_hash, template, self.get_template_fingerprint(template))
+        except Exception as e:
+            self.log(f"  Result cache lookup failed: {e}")
+            return None
+
+        if not items:
+            return None
+        self.log(f"  Cache hit: {len(items)} items from previous extraction (template: {template.name})")
+        return items
+
+    def _store_cached_items(self, pdf_hash: str, template, template_set: str,
+                            confidence_score: float, items: List[Dict]):
+        """Save extracted items to the result cache (errors are logged, never raised)."""
+        try:
+            self.result_cache.put(pdf_hash, template, self.get_template_fingerprint(template),
+                                  template_set, confidence_score, items)
+        except Exception as e:
+            self.log(f"  Result cache store failed: {e}")
 
     def reload_templates(self):
         """Reload templates from disk. Call after adding/removing template files."""
@@ -75,31 +284,66 @@ class ProcessorEngine:
         """Log a message."""
         self.log_callback(message)
 
-    def get_best_template(self, text: str):
+    def get_best_template(self, text: str, active_templates: tuple = None):
         """Find the best template for the given text.
 
+        Templates are shortlisted with the routing index (cheap keyword scan), then
+        scored in order of their max_confidence so that templates which can no longer
+        win are skipped. The result is the same as scoring every template: highest
+        score wins, ties go to the template registered first.
+
+        Args:
+            text: Document text
+            active_templates: (templates, routing index) pair to use; defaults to
+                the engine's current set
+
         Returns:
             Tuple of (template, confidence_score) or (None, 0.0) if no match
         """
-        best_template = None
-        best_score = 0.0
-
-        self.log(f"  Evaluating {len(self.templates)} templates...")
+        templates, routing = active_templates or self._active_templates
+        shortlist = routing.shortlist(text)
+        registry_order = {name: idx for idx, name in enumerate(templates)}
 
-        for name, template in self.templates.items():
+        candidates = []
+        not_shortlisted = 0
+        for name, template in templates.items():
             if not self.config.get_template_enabled(name):
                 self.log(f"    - {name}: Disabled in config")
                 continue
             if not template.enabled:
                 self.log(f"    - {name}: Disabled in template")
                 continue
+            if name in routing.max_confidence and name not in shortlist:
+                not_shortlisted += 1
+                continue
+            candidates.append((name, template))
+
+        self.log(f"  Evaluating {len(candidates)} templates "
+                 f"({not_shortlisted} skipped by routing keywords)...")
+
+        # Stable sort keeps registry order among templates with equal max_confidence
+        candidates.sort(key=lambda c: -getattr(c[1], 'max_confidence', 1.0))
+
+        best_template = None
+        best_score = 0.0
+        best_idx = None
+
+        for name, template in candidates:
+            idx = registry_order[name]
+            max_score = getattr(template, 'max_confidence', 1.0)
+            can_win = max_score > best_score or (
+                best_template is not None and max_score == best_score and idx < best_idx)
+            if not can_win:
+                self.log(f"    - {name}: Skipped (max score {max_score:.2f} cannot beat {best_score:.2f})")
+                continue
 
             score = template.get_confidence_score(text)
             self.log(f"    - {name}: Confidence score {score:.2f}")
 
-            if score > best_score:
+            if score > best_score or (score > 0 and score == best_score and idx < best_idx):
                 best_score = score
                 best_template = template
+                best_idx = idx
 
         if best_template:
             self.log(f"  Selected template: {best_template.name} (score: {best_score:.2f})")
@@ -108,42 +352,126 @@ class ProcessorEngine:
 
         return best_template, best_score
 
-    def process_pdf(self, pdf_path: Path) -> List[Dict]:
+    def _get_page_worker_count(self, page_count: int, page_parallel: bool = True) -> int:
+        """Number of processes for page extraction of one PDF (1 = sequential)."""
+        threshold = self.config.page_parallel_threshold
+        if not page_parallel or not threshold or page_count < threshold:
+            return 1
+        return min(self.config.get_worker_count(use_processes=True), page_count)
+
+    def process_pdf(self, pdf_path: Path, page_parallel: bool = True) -> List[Dict]:
         """
         Process a single PDF file, handling multiple invoices per PDF.
 
         Args:
             pdf_path: Path to the PDF file
+            page_parallel: Allow splitting page extraction across processes (pass
+                False when several files are already being processed in parallel)
 
         Returns:
             List of extracted line items as dictionaries
         """
+        all_items = []
+        try:
+            for items in self.process_pdf_iter(pdf_path, page_parallel=page_parallel):
+                all_items.extend(items)
+        except Exception:
+            return []  # Already logged and recorded by process_pdf_iter
+        return all_items
+
+    def process_pdf_iter(self, pdf_path: Path, page_parallel: bool = True) -> Iterator[List[Dict]]:
+        """
+        Process a single PDF file, yielding line items one invoice at a time.
+
+        Items for an invoice are yielded as soon as the next invoice boundary is
+        found, and page caches are released as pages are consumed, so memory use
+        stays flat regardless of page count. Errors are logged and recorded in
+        template stats, then re-raised.
+
+        Args:
+            pdf_path: Path to the PDF file
+            page_parallel: Allow splitting page extraction across processes (see
+                OCRMillConfig.page_parallel_threshold)
+
+        Yields:
+            Lists of extracted line items (one list per invoice)
+        """
         if pdfplumber is None:
             self.log("Error: pdfplumber is not installed. Run: pip install pdfplumber")
-            return []
+            return
 
         self.log(f"Processing: {pdf_path.name}")
         start_time = time.time()
-
+        template = None
+        timer = StageTimer()
+        page_count = None
+        char_count = None
+        # Templates stay fixed for this file even if reload_templates() runs meanwhile
+        active_templates = self._active_templates
+
+        pdf_hash = None
+        template_set = None
+        recheck_cache = False
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # First pass: extract all text to detect template
-                full_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
+            # A PDF extracted before with the same template set gets the same template,
+            # so its cached items are returned without opening it
+            if self.result_cache is not None:
+                cached_items = None
+                with timer.stage('cache_lookup'):
+                    try:
+                        pdf_hash = hash_file(pdf_path)
+                    except OSError as e:
+                        self.log(f"  Could not hash {pdf_path.name} for result cache: {e}")
+                    if pdf_hash:
+                        template_set = self.get_template_set_key(active_templates[0])
+                        selection = self._get_cached_selection(pdf_hash)
+                        if selection and selection['template_set'] != template_set:
+                            recheck_cache = True
+                        elif selection:
+                            cached_template = active_templates[0].get(selection['template_name'])
+                            if cached_template is not None:
+                                cached_items = self._get_cached_items(pdf_hash, cached_template)
+                if cached_items:
+                    processing_time_ms = int((time.time() - start_time) * 1000)
+                    self.parts_db.record_template_usage(
+                        template_name=cached_template.name,
+                        pdf_file=pdf_path.name,
+                        items_extracted=len(cached_items),
+                        confidence_score=selection['confidence_score'],
+                        processing_time_ms=processing_time_ms,
+                        success=True,
+                        stage_timings=dict(timer.timings, cache_hit=timer.timings['cache_lookup'])
+                    )
+                    yield cached_items
+                    return
+
+            # Each page is parsed once; pdfplumber's layout caches are dropped as soon
+            # as a page's text is read and the memoized text serves all later passes.
+            # If a template that uses tables may be selected, the page's tables are
+            # read before its layout is dropped too.
+            with_tables = any(template.uses_tables() for name, template in active_templates[0].items()
+                              if template.enabled and self.config.get_template_enabled(name))
+            with ParsedDocument.open(pdf_path, streaming=True, with_tables=with_tables) as document:
+                page_count = len(document)
+                page_workers = self._get_page_worker_count(page_count, page_parallel)
+                with timer.stage('text_extraction'):
+                    if page_workers > 1:
+                        self.log(f"  Extracting {page_count} pages with {page_workers} processes")
+                        if not document.prefetch_parallel(page_workers):
+                            self.log(f"  Parallel page extraction unavailable, extracting sequentially")
+                    full_text = document.full_text
+                char_count = len(full_text)
 
                 if not full_text.strip():
                     self.log(f"  No text extracted from {pdf_path.name}")
-                    return []
+                    return
 
                 # Scan for Bill of Lading and extract gross weight
                 bol_weight = None
                 bol_template = BillOfLadingTemplate()
 
-                for page in pdf.pages:
-                    page_text = page.extract_text()
+                for page in document:
+                    page_text = page.text
                     if page_text and bol_template.can_process(page_text):
                         self.log(f"  Found Bill of Lading on a page")
                         bol_weight = bol_template.extract_gross_weight(page_text)
@@ -152,7 +480,8 @@ class ProcessorEngine:
                             break
 
                 # Find the best template
-                template, confidence_score = self.get_best_template(full_text)
+                with timer.stage('template_scoring'):
+                    template, confidence_score = self.get_best_template(full_text, active_templates)
                 if not template:
                     self.log(f"  No matching template for {pdf_path.name}")
                     # Record failed template match
@@ -164,35 +493,83 @@ class ProcessorEngine:
                         confidence_score=0.0,
                         processing_time_ms=processing_time_ms,
                         success=False,
-                        error_message="No matching template found"
+                        error_message="No matching template found",
+                        stage_timings=timer.timings,
+                        page_count=page_count,
+                        char_count=char_count
                     )
-                    return []
+                    return
 
                 self.log(f"  Using template: {template.name}")
 
                 # Check if packing list only
                 if template.is_packing_list(full_text):
                     self.log(f"  Skipping packing list: {pdf_path.name}")
-                    return []
+                    return
+
+                # Cached with another template set: return its items if this template
+                # was also the one selected then
+                if recheck_cache:
+                    with timer.stage('cache_lookup'):
+                        cached_items = self._get_cached_items(pdf_hash, template)
+                    if cached_items:
+                        processing_time_ms = int((time.time() - start_time) * 1000)
+                        self.parts_db.record_template_usage(
+                            template_name=template.name,
+                            pdf_file=pdf_path.name,
+                            items_extracted=len(cached_items),
+                            confidence_score=confidence_score,
+                            processing_time_ms=processing_time_ms,
+                            success=True,
+                            stage_timings=dict(timer.timings, cache_hit=timer.timings['cache_lookup']),
+                            page_count=page_count,
+                            char_count=char_count
+                        )
+                        self._store_cached_items(pdf_hash, template, template_set, confidence_score,
+                                                 cached_items)
+                        yield cached_items
+                        return
 
                 # Second pass: process page-by-page to handle multiple invoices
-                all_items = []
                 current_invoice = None
                 current_project = None
                 page_buffer = []
-                page_tables = []  # Collect tables from all processed pages
-
-                self.log(f"  PDF has {len(pdf.pages)} page(s)")
-
-                for page_idx, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
+                page_tables = []  # Tables from the pages of the current invoice
+                uses_tables = template.uses_tables()
+                if uses_tables and page_workers > 1:
+                    with timer.stage('table_extraction'):
+                        document.prefetch_parallel(page_workers, tables=True)
+
+                # Running per-invoice summary: invoice -> [project, item count, total]
+                invoice_summary = {}
+                item_count = 0
+                cache_items = [] if pdf_hash else None
+
+                def finish_items(items):
+                    nonlocal item_count
+                    item_count += len(items)
+                    for item in items:
+                        inv = item.get('invoice_number', 'UNKNOWN')
+                        if inv not in invoice_summary:
+                            invoice_summary[inv] = [item.get('project_number', 'UNKNOWN'), 0, 0.0]
+                        invoice_summary[inv][1] += 1
+                        invoice_summary[inv][2] += float(item.get('total_price', 0) or 0)
+                    if cache_items is not None:
+                        # Copies: consumers may modify yielded items (e.g. save_to_csv)
+                        cache_items.extend(dict(item) for item in items)
+
+                self.log(f"  PDF has {len(document)} page(s)")
+
+                for page in document:
+                    page_idx = page.index
+                    page_text = page.text
                     if not page_text:
                         self.log(f"  Page {page_idx + 1}: No text extracted")
                         continue
 
                     # Skip packing list and BOL pages
                     # But be careful not to skip invoice pages that just REFERENCE a B/L number
-                    page_lower = page_text.lower()
+                    page_lower = page.lower
                     if 'packing list' in page_lower and 'invoice' not in page_lower:
                         self.log(f"  Page {page_idx + 1}: Skipped (packing list)")
                         continue
@@ -226,14 +603,18 @@ class ProcessorEngine:
 
                     self.log(f"  Page {page_idx + 1}: Processing ({len(page_text)} chars)")
 
-                    # Extract tables from page for table-based extraction
-                    try:
-                        tables = page.extract_tables()
-                        if tables:
-                            self.log(f"    Found {len(tables)} table(s) on page")
-                            page_tables.extend(tables)
-                    except Exception as e:
-                        self.log(f"    Table extraction failed: {e}")
+                    # Extract tables from page, only for templates that do table-based extraction
+                    # (added to page_tables once the page's invoice is known, below)
+                    tables = []
+                    if uses_tables:
+                        try:
+                            with timer.stage('table_extraction'):
+                                tables = page.tables or []
+                            if tables:
+                                self.log(f"    Found {len(tables)} table(s) on page")
+                        except Exception as e:
+                            self.log(f"    Table extraction failed: {e}")
+                    page.release()
 
                     # Debug: Show first 100 chars of page
                     preview = page_text[:100].replace('\n', ' ')
@@ -250,7 +631,8 @@ class ProcessorEngine:
                         if page_buffer:
                             buffer_text = "\n".join(page_buffer)
                             # Pass tables for table-based extraction
-                            _, _, items = template.extract_all(buffer_text, tables=page_tables if page_tables else None)
+                            with timer.stage('line_items'):
+                                _, _, items = template.extract_all(buffer_text, tables=page_tables if page_tables else None)
                             for item in items:
                                 item['invoice_number'] = current_invoice
                                 item['project_number'] = current_project
@@ -258,8 +640,11 @@ class ProcessorEngine:
                                     item['bol_gross_weight'] = bol_weight
                                 if bol_weight and ('net_weight' not in item or not item.get('net_weight')):
                                     item['net_weight'] = bol_weight
-                            all_items.extend(items)
                             page_buffer = []
+                            page_tables = []
+                            finish_items(items)
+                            if items:
+                                yield items
 
                     # Update current invoice/project if found
                     if inv_match:
@@ -269,19 +654,21 @@ class ProcessorEngine:
 
                     # Add page to buffer
                     page_buffer.append(page_text)
+                    page_tables.extend(tables)
 
                 # Process remaining pages in buffer
                 self.log(f"  Processing buffer with {len(page_buffer)} page(s), total chars: {sum(len(p) for p in page_buffer)}")
                 if page_buffer:
                     buffer_text = "\n".join(page_buffer)
 
-                    # If no invoice found with generic pattern, try the template's extraction
-                    if not current_invoice:
-                        current_invoice = template.extract_invoice_number(buffer_text)
-                        current_project = template.extract_project_number(buffer_text)
+                    with timer.stage('line_items'):
+                        # If no invoice found with generic pattern, try the template's extraction
+                        if not current_invoice:
+                            current_invoice = template.extract_invoice_number(buffer_text)
+                            current_project = template.extract_project_number(buffer_text)
 
-                    # Pass tables for table-based extraction
-                    _, _, items = template.extract_all(buffer_text, tables=page_tables if page_tables else None)
+                        # Pass tables for table-based extraction
+                        _, _, items = template.extract_all(buffer_text, tables=page_tables if page_tables else None)
                     if page_tables:
                         self.log(f"  Passed {len(page_tables)} table(s) to template")
                     self.log(f"  Template extracted {len(items)} line items from buffer")
@@ -296,31 +683,36 @@ class ProcessorEngine:
                             item['bol_gross_weight'] = bol_weight
                         if bol_weight and ('net_weight' not in item or not item.get('net_weight')):
                             item['net_weight'] = bol_weight
-                    all_items.extend(items)
+                    page_buffer = []
+                    page_tables = []
+                    finish_items(items)
+                    if items:
+                        yield items
 
                 # Count unique invoices and calculate grand total
-                unique_invoices = set(item.get('invoice_number', 'UNKNOWN') for item in all_items)
-                grand_total = sum(float(item.get('total_price', 0) or 0) for item in all_items)
-                self.log(f"  Found {len(unique_invoices)} invoice(s), {len(all_items)} total items, Grand Total: ${grand_total:,.2f}")
+                grand_total = sum(summary[2] for summary in invoice_summary.values())
+                self.log(f"  Found {len(invoice_summary)} invoice(s), {item_count} total items, Grand Total: ${grand_total:,.2f}")
 
-                for inv in sorted(unique_invoices):
-                    inv_items = [item for item in all_items if item.get('invoice_number') == inv]
-                    proj = inv_items[0].get('project_number', 'UNKNOWN') if inv_items else 'UNKNOWN'
-                    total_value = sum(float(item.get('total_price', 0) or 0) for item in inv_items)
-                    self.log(f"    - Invoice {inv} (Project {proj}): {len(inv_items)} items, ${total_value:,.2f}")
+                for inv in sorted(invoice_summary):
+                    proj, inv_count, total_value = invoice_summary[inv]
+                    self.log(f"    - Invoice {inv} (Project {proj}): {inv_count} items, ${total_value:,.2f}")
 
                 # Record successful template usage
                 processing_time_ms = int((time.time() - start_time) * 1000)
                 self.parts_db.record_template_usage(
                     template_name=template.name,
                     pdf_file=pdf_path.name,
-                    items_extracted=len(all_items),
+                    items_extracted=item_count,
                     confidence_score=confidence_score,
                     processing_time_ms=processing_time_ms,
-                    success=True
+                    success=True,
+                    stage_timings=timer.timings,
+                    page_count=page_count,
+                    char_count=char_count
                 )
 
-                return all_items
+                if cache_items:
+                    self._store_cached_items(pdf_hash, template, template_set, confidence_score, cache_items)
 
         except Exception as e:
             self.log(f"  Error processing {pdf_path.name}: {e}")
@@ -333,31 +725,18 @@ class ProcessorEngine:
                     items_extracted=0,
                     processing_time_ms=processing_time_ms,
                     success=False,
-                    error_message=str(e)
+                    error_message=str(e),
+                    stage_timings=timer.timings,
+                    page_count=page_count,
+                    char_count=char_count
                 )
             except Exception:
                 pass  # Don't fail on stat recording error
-            return []
-
-    def save_to_csv(self, items: List[Dict], output_folder: Path, pdf_name: str = None) -> List[Path]:
-        """
-        Save items to CSV files and add to parts database.
-
-        Args:
-            items: List of extracted line items
-            output_folder: Output folder for CSV files
-            pdf_name: Original PDF filename for reference
-
-        Returns:
-            List of paths to created CSV files
-        """
-        if not items:
-            return []
+            raise
 
-        output_folder.mkdir(exist_ok=True, parents=True)
-        created_files = []
-
-        # Add items to parts database and enrich with descriptions, HTS codes, MID
+    def _enrich_items(self, items: List[Dict], pdf_name: str = None):
+        """Add items to the parts database and enrich them with descriptions, HTS codes and MID."""
+        part_records = []
         for item in items:
             # Look up MID and country_origin from manufacturer name
             if ('mid' not in item or not item['mid']) or ('country_origin' not in item or not item['country_origin']):
@@ -380,8 +759,12 @@ class ProcessorEngine:
 
             part_data = item.copy()
             part_data['source_file'] = pdf_name or 'unknown'
-            self.parts_db.add_part_occurrence(part_data)
+            part_records.append(part_data)
 
+        # One transaction for all occurrences instead of one connection per item
+        self.parts_db.add_part_occurrences(part_records)
+
+        for item, part_data in zip(items, part_records):
             # Add description and HTS code back to item for CSV export
             if 'description' not in item or not item['description']:
                 item['description'] = part_data.get('description', '')
@@ -392,60 +775,168 @@ class ProcessorEngine:
             if 'manufacturer_name' in item:
                 del item['manufacturer_name']
 
-        # Group by invoice number
-        by_invoice = {}
-        for item in items:
-            inv_num = item.get('invoice_number', 'UNKNOWN')
-            if inv_num not in by_invoice:
-                by_invoice[inv_num] = []
-            by_invoice[inv_num].append(item)
+    def save_to_csv(self, items: List[Dict], output_folder: Path, pdf_name: str = None) -> List[Path]:
+        """
+        Save items to CSV files and add to parts database.
 
-        # Determine columns from items with specific ordering
-        columns = ['invoice_number', 'project_number', 'part_number', 'description',
-                   'mid', 'country_origin', 'hts_code', 'quantity', 'quantity_unit', 'total_price']
+        Args:
+            items: List of extracted line items
+            output_folder: Output folder for CSV files
+            pdf_name: Original PDF filename for reference
 
+        Returns:
+            List of paths to created CSV files
+        """
+        if not items:
+            return []
+
+        timer = StageTimer()
+        with timer.stage('enrichment'):
+            self._enrich_items(items, pdf_name)
+
+        # Determine columns from items with specific ordering
+        columns = list(CSV_BASE_COLUMNS)
+        invoice_counts = {}
         for item in items:
             for key in item.keys():
                 if key not in columns:
                     columns.append(key)
+            inv_num = item.get('invoice_number', 'UNKNOWN')
+            invoice_counts[inv_num] = invoice_counts.get(inv_num, 0) + 1
+
+        with timer.stage('csv_output'):
+            created_files = self._write_csv_files(items, columns, invoice_counts, output_folder, pdf_name)
+        self._record_output_timings(pdf_name, timer)
+        return created_files
+
+    def _record_output_timings(self, pdf_name: str, timer: StageTimer):
+        """Attach enrichment/CSV output timings to the PDF's template stats."""
+        try:
+            self.parts_db.record_stage_timings(pdf_name, timer.timings)
+        except Exception:
+            pass  # Don't fail on stat recording error
+
+    def save_stream_to_csv(self, item_batches: Iterable[List[Dict]], output_folder: Path,
+                           pdf_name: str = None) -> List[Path]:
+        """
+        Streaming counterpart of save_to_csv, e.g. for process_pdf_iter output.
+
+        Batches are spooled to a temporary file as they arrive, so only one batch
+        is held in memory. Nothing is added to the parts database or written to
+        CSV until item_batches is exhausted: if it raises part way (e.g. a PDF
+        fails on a later page), the PDF leaves no trace and can be retried. The
+        CSV files written are identical to save_to_csv for the same items.
+
+        Args:
+            item_batches: Iterable of line item lists
+            output_folder: Output folder for CSV files
+            pdf_name: Original PDF filename for reference
+
+        Returns:
+            List of paths to created CSV files
+        """
+        columns = list(CSV_BASE_COLUMNS)
+        invoice_counts = {}
+        timer = StageTimer()
+
+        with tempfile.TemporaryFile() as raw_spool, \
+                tempfile.TemporaryFile(mode='w+', encoding='utf-8') as spool:
+            for items in item_batches:
+                if items:
+                    pickle.dump(items, raw_spool, protocol=pickle.HIGHEST_PROTOCOL)
+
+            # Extraction finished cleanly - enrich and record the batches
+            raw_spool.seek(0)
+            while True:
+                try:
+                    items = pickle.load(raw_spool)
+                except EOFError:
+                    break
+                with timer.stage('enrichment'):
+                    self._enrich_items(items, pdf_name)
+                for item in items:
+                    for key in item.keys():
+                        if key not in columns:
+                            columns.append(key)
+                    inv_num = item.get('invoice_number', 'UNKNOWN')
+                    invoice_counts[inv_num] = invoice_counts.get(inv_num, 0) + 1
+                    spool.write(json.dumps(item, default=str) + "\n")
+
+            if not invoice_counts:
+                return []
+
+            spool.seek(0)
+            rows = (json.loads(line) for line in spool)
+            with timer.stage('csv_output'):
+                created_files = self._write_csv_files(rows, columns, invoice_counts, output_folder, pdf_name)
+        self._record_output_timings(pdf_name, timer)
+        return created_files
+
+    def _write_csv_files(self, rows: Iterable[Dict], columns: List[str], invoice_counts: Dict[str, int],
+                         output_folder: Path, pdf_name: str = None) -> List[Path]:
+        """
+        Write enriched items to CSV, either one file per invoice or one consolidated file.
+
+        Args:
+            rows: Enriched items in extraction order (iterated once)
+            columns: CSV column order
+            invoice_counts: Item count per invoice number, in first-seen order
+            output_folder: Output folder for CSV files
+            pdf_name: Original PDF filename for reference
+
+        Returns:
+            List of paths to created CSV files
+        """
+        output_folder.mkdir(exist_ok=True, parents=True)
+        created_files = []
 
         # Check consolidation mode
         consolidate = self.config.consolidate_multi_invoice
 
-        if consolidate and len(by_invoice) > 1:
+        if consolidate and len(invoice_counts) > 1:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             if pdf_name:
                 base_name = Path(pdf_name).stem
             else:
-                base_name = f"consolidated_{list(by_invoice.keys())[0]}"
+                base_name = f"consolidated_{next(iter(invoice_counts))}"
             filename = f"{base_name}_{timestamp}.csv"
             filepath = output_folder / filename
 
             with open(filepath, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
                 writer.writeheader()
-                writer.writerows(items)
+                writer.writerows(rows)
 
-            invoice_list = ", ".join(sorted(by_invoice.keys()))
-            self.log(f"  Saved: {filename} ({len(items)} items from {len(by_invoice)} invoices: {invoice_list})")
+            invoice_list = ", ".join(sorted(invoice_counts.keys()))
+            self.log(f"  Saved: {filename} ({sum(invoice_counts.values())} items from {len(invoice_counts)} invoices: {invoice_list})")
             created_files.append(filepath)
 
         else:
-            for inv_num, inv_items in by_invoice.items():
-                proj_num = inv_items[0].get('project_number', 'UNKNOWN')
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                # Sanitize invoice and project numbers for valid filenames
-                safe_inv_num = re.sub(r'[<>:"/\\|?*]', '-', inv_num)
-                safe_proj_num = re.sub(r'[<>:"/\\|?*]', '-', proj_num)
-                filename = f"{safe_inv_num}_{safe_proj_num}_{timestamp}.csv"
-                filepath = output_folder / filename
-
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
-                    writer.writeheader()
-                    writer.writerows(inv_items)
-
-                self.log(f"  Saved: {filename} ({len(inv_items)} items)")
+            # One file per invoice, opened when its first item is seen
+            open_files = {}
+            try:
+                for item in rows:
+                    inv_num = item.get('invoice_number', 'UNKNOWN')
+                    if inv_num not in open_files:
+                        proj_num = item.get('project_number', 'UNKNOWN')
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        # Sanitize invoice and project numbers for valid filenames
+                        safe_inv_num = re.sub(r'[<>:"/\\|?*]', '-', inv_num)
+                        safe_proj_num = re.sub(r'[<>:"/\\|?*]', '-', proj_num)
+                        filename = f"{safe_inv_num}_{safe_proj_num}_{timestamp}.csv"
+                        filepath = output_folder / filename
+
+                        f = open(filepath, 'w', newline='', encoding='utf-8')
+                        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                        writer.writeheader()
+                        open_files[inv_num] = (f, writer, filepath)
+                    open_files[inv_num][1].writerow(item)
+            finally:
+                for f, _, _ in open_files.values():
+                    f.close()
+
+            for inv_num, (_, _, filepath) in open_files.items():
+                self.log(f"  Saved: {filepath.name} ({invoice_counts[inv_num]} items)")
                 created_files.append(filepath)
 
         return created_files
@@ -511,9 +1002,10 @@ class ProcessorEngine:
 
         for pdf_path in pdf_files:
             try:
-                items = self.process_pdf(pdf_path)
-                if items:
-                    self.save_to_csv(items, output_folder, pdf_name=pdf_path.name)
+                # Stream invoices straight to CSV so large PDFs don't accumulate in memory
+                created_files = self.save_stream_to_csv(
+                    self.process_pdf_iter(pdf_path), output_folder, pdf_name=pdf_path.name)
+                if created_files:
                     self.move_to_processed(pdf_path, processed_folder)
                     processed_count += 1
                 else:
@@ -564,3 +1056,66 @@ class ProcessorEngine:
                 'description': getattr(template, 'description', 'No description'),
             }
         return template_info
+
+
+# Per-process engine used by process-pool workers (see init_worker_process)
+_worker_engine = None
+
+
+def init_worker_process(config: OCRMillConfig = None, page_parallel: bool = False):
+    """
+    ProcessPoolExecutor initializer.
+
+    Builds an engine with its own template registry in the worker process.
+    Template usage stats are deferred to the parent via DeferredStatsRecorder.
+
+    Args:
+        config: Processing settings from the parent
+        page_parallel: Keep page-level process pools for large PDFs. Off by default:
+            file-level workers each starting a page pool would run workers x workers
+            processes. Only pass True when files are processed one at a time in
+            the main process.
+    """
+    global _worker_engine
+    config = copy.copy(config or OCRMillConfig())
+    if not page_parallel:
+        config.page_parallel_threshold = 0
+    _worker_engine = ProcessorEngine(DeferredStatsRecorder(), config, log_callback=lambda msg: None)
+
+
+def extract_pdf_in_worker(pdf_path: str) -> Dict:
+    """
+    Extract line items from a PDF inside a worker process.
+
+    Only extraction runs here; the parent process does database writes and CSV output.
+
+    Args:
+        pdf_path: Path to the PDF file (as string, for pickling)
+
+    Returns:
+        Dict with keys: pdf_path, items (list of plain dicts), error (str or None),
+        log (list of log lines), template_usage (kwargs for record_template_usage),
+        elapsed_ms (extraction time in the worker)
+    """
+    if _worker_engine is None:
+        init_worker_process()
+
+    log_lines = []
+    _worker_engine.log_callback = log_lines.append
+    error = None
+    start_time = time.time()
+
+    try:
+        items = _worker_engine.process_pdf(Path(pdf_path))
+    except Exception as e:
+        items = []
+        error = str(e)
+
+    return {
+        'pdf_path': pdf_path,
+        'items': items or [],
+        'error': error,
+        'log': log_lines,
+        'template_usage': _worker_engine.parts_db.take_records(),
+        'elapsed_ms': int((time.time() - start_time) * 1000),
+    }
@@ -0,0 +1,176 @@
+"""
+OCRMill Folder Watching for TariffMill
+Change notifications for the monitored input folder, with polling fallback and
+a debounce so files still being copied are not picked up.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+from PyQt5.QtCore import QObject, QFileSystemWatcher, pyqtSignal, pyqtSlot
+
+
+# Filesystem types treated as network shares on Linux (from /proc/mounts)
+NETWORK_FILESYSTEMS = {'cifs', 'smbfs', 'smb3', 'nfs', 'nfs4', 'afs', 'fuse.sshfs', '9p'}
+
+
+def is_network_path(path: Path) -> bool:
+    """
+    Check if a folder is on a network share.
+
+    Change notifications are unreliable (or silently missing) on SMB/NFS mounts,
+    so such folders are polled instead.
+    """
+    path_str = str(path)
+    if path_str.startswith('\\\\') or path_str.startswith('//'):
+        return True  # UNC path
+
+    if sys.platform == 'win32':
+        drive = os.path.splitdrive(os.path.abspath(path_str))[0]
+        if not drive:
+            return False
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == DRIVE_REMOTE
+        except Exception:
+            return False
+
+    # POSIX: find the mount point containing the path and check its filesystem type
+    try:
+        resolved = os.path.realpath(path_str)
+        best_mount, best_type = '', ''
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                if (resolved == mount_point or resolved.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+        return best_type in NETWORK_FILESYSTEMS or best_type.startswith('nfs')
+    except OSError:
+        return False  # No /proc/mounts (e.g. macOS)
+
+
+class StableFileTracker:
+    """
+    Debounce for files that are still being written.
+
+    A file is only reported ready once its size and modification time have stayed
+    the same for settle_seconds across observations, it is non-empty, and it can be
+    opened for reading (copies in progress are often locked on Windows).
+    """
+
+    def __init__(self, settle_seconds: float = 2.0):
+        """
+        Args:
+            settle_seconds: How long size/mtime must stay unchanged
+        """
+        self.settle_seconds = settle_seconds
+        self._pending = {}  # path -> ((size, mtime_ns), stable_since)
+
+    def observe(self, paths: Iterable[Path]):
+        """Record the current size/mtime of the given files (a full folder listing)."""
+        now = time.monotonic()
+        seen = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Moved or deleted since the listing
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._pending.get(path)
+            if previous and previous[0] == signature:
+                seen[path] = previous
+            else:
+                seen[path] = (signature, now)
+        self._pending = seen
+
+    def refresh(self):
+        """Re-check only the files already pending, without listing the folder."""
+        self.observe(list(self._pending))
+
+    def has_pending(self) -> bool:
+        """Check if any files are waiting to settle."""
+        return bool(self._pending)
+
+    def take_ready(self) -> List[Path]:
+        """Remove and return files whose size/mtime have settled, in name order."""
+        now = time.monotonic()
+        ready = []
+        for path, ((size, _), stable_since) in list(self._pending.items()):
+            if size <= 0 or now - stable_since < self.settle_seconds:
+                continue
+            try:
+                with open(path, 'rb'):
+                    pass
+            except OSError:
+                continue  # Still locked by the copying process
+            ready.append(path)
+            del self._pending[path]
+        return sorted(ready)
+
+    def clear(self):
+        """Forget all pending files."""
+        self._pending = {}
+
+
+class FolderWatcher(QObject):
+    """
+    Watches one folder for changes using the OS (via QFileSystemWatcher).
+
+    Must be created in a thread with a running Qt event loop (normally the GUI
+    thread); watch() may be called from any thread. on_change is called from that
+    event loop whenever the folder contents change. Network paths, and folders that
+    can't be watched, are left to the caller to poll - see is_notifying().
+    """
+
+    _watch_requested = pyqtSignal(str)
+
+    def __init__(self, on_change: Callable[[], None], parent=None):
+        """
+        Args:
+            on_change: Callback for folder change notifications (must be thread-safe)
+            parent: Parent QObject
+        """
+        super().__init__(parent)
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._notifying_folder = None
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._watch_requested.connect(self._watch)
+
+    def watch(self, folder: Optional[Path]):
+        """Start watching folder instead of the current one (None stops watching)."""
+        self._watch_requested.emit(str(folder) if folder else "")
+
+    def is_notifying(self, folder: Path) -> bool:
+        """True if change notifications are active for folder (otherwise it must be polled)."""
+        with self._lock:
+            return self._notifying_folder == str(folder)
+
+    @pyqtSlot(str)
+    def _watch(self, folder: str):
+        directories = self._watcher.directories()
+        if directories:
+            self._watcher.removePaths(directories)
+
+        notifying = None
+        if folder and Path(folder).is_dir() and not is_network_path(Path(folder)):
+            if self._watcher.addPath(folder):
+                notifying = folder
+        with self._lock:
+            self._notifying_folder = notifying
+
+    def _on_directory_changed(self, path: str):
+        if not Path(path).is_dir():
+            # Folder was removed; QFileSystemWatcher has dropped it, so fall back to polling
+            with self._lock:
+                self._notifying_folder = None
+        self._on_change()
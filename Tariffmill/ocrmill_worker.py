@@ -3,13 +3,65 @@ OCRMill Background Worker for TariffMill
 Handles folder monitoring and background PDF processing.
 """
 
+import threading
 import time
-import os
 from pathlib import Path
 from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from PyQt5.QtCore import QThread, pyqtSignal, QMutex
 
+try:
+    from Tariffmill.ocrmill_processor import init_worker_process, extract_pdf_in_worker
+    from Tariffmill.ocrmill_watcher import FolderWatcher, StableFileTracker
+except ImportError:
+    from ocrmill_processor import init_worker_process, extract_pdf_in_worker
+    from ocrmill_watcher import FolderWatcher, StableFileTracker
+
+
+def _create_executor(processor, max_workers: int, use_processes: bool):
+    """
+    Create the executor for parallel PDF processing.
+
+    Process workers each load their own template registry (see init_worker_process)
+    and only return extracted items; thread workers share the processor.
+    """
+    if use_processes:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker_process,
+            initargs=(processor.config,)
+        )
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def _finish_worker_result(processor, result: Dict, output_folder: Path, log) -> tuple:
+    """
+    Complete a process-pool result in the parent: replay template stats,
+    forward worker log lines, and save CSVs / parts database entries.
+
+    Returns:
+        Tuple of (pdf_path, items, error_message)
+    """
+    pdf_path = Path(result['pdf_path'])
+    for line in result.get('log', []):
+        log(line)
+    for record in result.get('template_usage', []):
+        try:
+            processor.parts_db.record_template_usage(**record)
+        except Exception:
+            pass  # Don't fail on stat recording error
+
+    if result.get('error'):
+        return (pdf_path, [], result['error'])
+
+    items = result.get('items') or []
+    try:
+        if items:
+            processor.save_to_csv(items, output_folder, pdf_name=pdf_path.name)
+    except Exception as e:
+        return (pdf_path, [], str(e))
+    return (pdf_path, items, None)
+
 
 class OCRMillWorker(QThread):
     """
@@ -31,10 +83,16 @@ class OCRMillWorker(QThread):
     error = pyqtSignal(str)
     items_extracted = pyqtSignal(list)  # list of item dicts
 
+    # Full folder listing interval while OS change notifications are active (safety net)
+    NOTIFY_RESCAN_INTERVAL = 600  # seconds
+
     def __init__(self, processor, parent=None):
         """
         Initialize the worker.
 
+        Must be created in the GUI thread: change notifications for the input folder
+        are delivered through its event loop.
+
         Args:
             processor: ProcessorEngine instance
             parent: Parent QObject
@@ -43,9 +101,15 @@ class OCRMillWorker(QThread):
         self.processor = processor
         self._running = False
         self._monitoring = False
-        self._poll_interval = 60  # seconds
+        self._poll_interval = 60  # seconds, used when the folder can't be watched
         self._mutex = QMutex()
 
+        # Set to wake the run loop early (folder changed, settings changed, stop)
+        self._wake = threading.Event()
+        self._folder_dirty = False
+        self._folder_watcher = FolderWatcher(self._on_folder_changed)
+        self._file_tracker = StableFileTracker(settle_seconds=2.0)
+
         # Connect processor logging to our signal
         self.processor.log_callback = self._log
 
@@ -53,17 +117,34 @@ class OCRMillWorker(QThread):
         """Log callback that emits signal."""
         self.log_message.emit(message)
 
+    def _on_folder_changed(self):
+        """Change notification for the input folder (called from the GUI thread)."""
+        self._mutex.lock()
+        self._folder_dirty = True
+        self._mutex.unlock()
+        self._wake.set()
+
+    def _take_folder_dirty(self) -> bool:
+        """Return and reset the folder-changed flag."""
+        self._mutex.lock()
+        dirty = self._folder_dirty
+        self._folder_dirty = False
+        self._mutex.unlock()
+        return dirty
+
     def set_poll_interval(self, seconds: int):
         """Set the polling interval for folder monitoring."""
         self._mutex.lock()
         self._poll_interval = max(10, min(300, seconds))  # clamp to 10-300 seconds
         self._mutex.unlock()
+        self._wake.set()
 
     def start_monitoring(self):
         """Start folder monitoring mode."""
         self._mutex.lock()
         self._monitoring = True
         self._mutex.unlock()
+        self._wake.set()
         if not self.isRunning():
             self.start()
 
@@ -72,6 +153,7 @@ class OCRMillWorker(QThread):
         self._mutex.lock()
         self._monitoring = False
         self._mutex.unlock()
+        self._wake.set()
 
     def is_monitoring(self) -> bool:
         """Check if currently monitoring."""
@@ -86,11 +168,21 @@ class OCRMillWorker(QThread):
         self._running = False
         self._monitoring = False
         self._mutex.unlock()
+        self._wake.set()
         self.wait(5000)  # Wait up to 5 seconds for thread to finish
 
     def run(self):
-        """Main thread loop for folder monitoring."""
+        """
+        Main thread loop for folder monitoring.
+
+        Local folders are watched with OS change notifications and only listed when
+        something changes (plus a rare safety rescan); network folders, where
+        notifications are unreliable, are listed every poll interval. New PDFs are
+        processed once their size/mtime have settled, so half-copied files are skipped.
+        """
         self._running = True
+        watched_folder = None
+        last_scan = 0.0
 
         while self._running:
             self._mutex.lock()
@@ -98,39 +190,65 @@ class OCRMillWorker(QThread):
             poll_interval = self._poll_interval
             self._mutex.unlock()
 
-            if monitoring:
-                try:
-                    self._process_folder()
-                except Exception as e:
-                    self.error.emit(f"Monitoring error: {str(e)}")
+            if not monitoring:
+                if watched_folder is not None:
+                    self._folder_watcher.watch(None)
+                    self._file_tracker.clear()
+                    watched_folder = None
+                self._wake.wait(1)
+                self._wake.clear()
+                continue
+
+            input_folder = Path(self.processor.config.input_folder)
+            if input_folder != watched_folder:
+                self._folder_watcher.watch(input_folder)
+                self._file_tracker.clear()
+                watched_folder = input_folder
+                last_scan = 0.0  # List the new folder right away
+
+            notifying = self._folder_watcher.is_notifying(input_folder)
+            rescan_interval = self.NOTIFY_RESCAN_INTERVAL if notifying else poll_interval
+
+            try:
+                if self._take_folder_dirty() or time.monotonic() - last_scan >= rescan_interval:
+                    last_scan = time.monotonic()
+                    if input_folder.exists():
+                        self._file_tracker.observe(input_folder.glob("*.pdf"))
+                        if not notifying:
+                            self._folder_watcher.watch(input_folder)  # Folder may be watchable now
+                    else:
+                        self._file_tracker.clear()
+                elif self._file_tracker.has_pending():
+                    self._file_tracker.refresh()
+
+                ready_files = self._file_tracker.take_ready()
+                if ready_files:
+                    self._process_folder(ready_files)
+            except Exception as e:
+                self.error.emit(f"Monitoring error: {str(e)}")
 
-                # Sleep in small increments to allow for stopping
-                for _ in range(poll_interval):
-                    if not self._running or not self._monitoring:
-                        break
-                    time.sleep(1)
+            # Re-check unsettled files every second; otherwise sleep until a change
+            # notification, a settings change, or the next scheduled listing
+            if self._file_tracker.has_pending():
+                timeout = 1.0
             else:
-                # Not monitoring, just sleep briefly
-                time.sleep(1)
+                timeout = max(0.0, last_scan + rescan_interval - time.monotonic())
+            self._wake.wait(timeout)
+            self._wake.clear()
 
-    def _process_folder(self):
-        """Process PDFs in the input folder."""
+    def _process_folder(self, pdf_files: List[Path]):
+        """Process settled PDFs from the input folder."""
         input_folder = Path(self.processor.config.input_folder)
         output_folder = Path(self.processor.config.output_folder)
 
-        if not input_folder.exists():
-            return
-
-        pdf_files = list(input_folder.glob("*.pdf"))
-        if not pdf_files:
-            return
-
         self.processing_started.emit()
         total_items = 0
 
         for pdf_path in pdf_files:
             if not self._running or not self._monitoring:
                 break
+            if not pdf_path.exists():
+                continue  # Removed while waiting to settle
 
             try:
                 items = self.processor.process_pdf(pdf_path)
@@ -228,9 +346,10 @@ class SingleFileWorker(QThread):
 
 class MultiFileWorker(QThread):
     """
-    Worker for processing multiple PDF files in parallel using ThreadPoolExecutor.
+    Worker for processing multiple PDF files in parallel.
 
-    This significantly speeds up processing when multiple PDFs are dropped at once.
+    Uses a process pool by default (pdfplumber parsing is GIL-bound, so threads
+    barely help); falls back to a thread pool when use_processes is False.
     """
 
     log_message = pyqtSignal(str)
@@ -241,7 +360,7 @@ class MultiFileWorker(QThread):
     error = pyqtSignal(str)
 
     def __init__(self, processor, file_paths: List[Path], output_folder: Path = None,
-                 max_workers: int = None, parent=None):
+                 max_workers: int = None, use_processes: bool = None, parent=None):
         """
         Initialize the multi-file worker.
 
@@ -249,16 +368,16 @@ class MultiFileWorker(QThread):
             processor: ProcessorEngine instance
             file_paths: List of PDF file paths to process
             output_folder: Output folder for CSV files
-            max_workers: Maximum parallel workers (default: CPU count or 4, whichever is smaller)
+            max_workers: Maximum parallel workers (default: from config, see OCRMillConfig.get_worker_count)
+            use_processes: Run extraction in separate processes (default: config.use_process_pool)
             parent: Parent QObject
         """
         super().__init__(parent)
         self.processor = processor
         self.file_paths = [Path(p) for p in file_paths]
         self.output_folder = output_folder or Path(processor.config.output_folder)
-        # Limit workers to prevent overwhelming the system
-        # PDF processing is I/O and CPU intensive, so don't use too many threads
-        self.max_workers = max_workers or min(os.cpu_count() or 4, 4)
+        self.use_processes = processor.config.use_process_pool if use_processes is None else use_processes
+        self.max_workers = max_workers or processor.config.get_worker_count(self.use_processes)
         self._cancelled = False
         self._mutex = QMutex()
 
@@ -291,7 +410,8 @@ class MultiFileWorker(QThread):
         try:
             # Note: We create a simple log collector instead of emitting signals
             # because signals can't be emitted from non-Qt threads safely
-            items = self.processor.process_pdf(pdf_path)
+            # Files already run in parallel - no page-level process pools on top
+            items = self.processor.process_pdf(pdf_path, page_parallel=False)
             if items:
                 self.processor.save_to_csv(items, self.output_folder, pdf_name=pdf_path.name)
             return (pdf_path, items or [], None)
@@ -305,29 +425,41 @@ class MultiFileWorker(QThread):
             self.all_finished.emit([])
             return
 
-        self.log_message.emit(f"Starting parallel processing of {total} PDF(s) with {self.max_workers} workers...")
+        mode = "processes" if self.use_processes else "threads"
+        self.log_message.emit(f"Starting parallel processing of {total} PDF(s) with {self.max_workers} worker {mode}...")
 
         all_items = []
         completed = 0
 
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        with _create_executor(self.processor, self.max_workers, self.use_processes) as executor:
             # Submit all tasks
-            future_to_path = {
-                executor.submit(self._process_single_pdf, path): path
-                for path in self.file_paths
-            }
+            if self.use_processes:
+                future_to_path = {
+                    executor.submit(extract_pdf_in_worker, str(path)): path
+                    for path in self.file_paths
+                }
+            else:
+                future_to_path = {
+                    executor.submit(self._process_single_pdf, path): path
+                    for path in self.file_paths
+                }
 
             # Process results as they complete
             for future in as_completed(future_to_path):
                 if self.is_cancelled():
                     self.log_message.emit("Processing cancelled")
+                    for pending in future_to_path:
+                        pending.cancel()
                     break
 
                 pdf_path = future_to_path[future]
 
                 try:
-                    path, items, error = future.result()
+                    if self.use_processes:
+                        path, items, error = _finish_worker_result(
+                            self.processor, future.result(), self.output_folder, self.log_message.emit)
+                    else:
+                        path, items, error = future.result()
 
                     if error:
                         self.log_message.emit(f"  ✗ {path.name}: {error}")
@@ -365,12 +497,13 @@ class ParallelFolderWorker(QThread):
     error = pyqtSignal(str)
 
     def __init__(self, processor, input_folder: Path, output_folder: Path = None,
-                 max_workers: int = None, parent=None):
+                 max_workers: int = None, use_processes: bool = None, parent=None):
         super().__init__(parent)
         self.processor = processor
         self.input_folder = Path(input_folder)
         self.output_folder = Path(output_folder) if output_folder else Path(processor.config.output_folder)
-        self.max_workers = max_workers or min(os.cpu_count() or 4, 4)
+        self.use_processes = processor.config.use_process_pool if use_processes is None else use_processes
+        self.max_workers = max_workers or processor.config.get_worker_count(self.use_processes)
         self._cancelled = False
         self._mutex = QMutex()
 
@@ -392,7 +525,8 @@ class ParallelFolderWorker(QThread):
             return (pdf_path, [], "Cancelled")
 
         try:
-            items = self.processor.process_pdf(pdf_path)
+            # Files already run in parallel - no page-level process pools on top
+            items = self.processor.process_pdf(pdf_path, page_parallel=False)
             if items:
                 self.processor.save_to_csv(items, self.output_folder, pdf_name=pdf_path.name)
             return (pdf_path, items or [], None)
@@ -416,26 +550,39 @@ class ParallelFolderWorker(QThread):
             self.all_finished.emit(0)
             return
 
-        self.log_message.emit(f"Found {total} PDF(s), processing with {self.max_workers} workers...")
+        mode = "processes" if self.use_processes else "threads"
+        self.log_message.emit(f"Found {total} PDF(s), processing with {self.max_workers} worker {mode}...")
 
         total_items = 0
         completed = 0
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_path = {
-                executor.submit(self._process_single_pdf, path): path
-                for path in pdf_files
-            }
+        with _create_executor(self.processor, self.max_workers, self.use_processes) as executor:
+            if self.use_processes:
+                future_to_path = {
+                    executor.submit(extract_pdf_in_worker, str(path)): path
+                    for path in pdf_files
+                }
+            else:
+                future_to_path = {
+                    executor.submit(self._process_single_pdf, path): path
+                    for path in pdf_files
+                }
 
             for future in as_completed(future_to_path):
                 if self.is_cancelled():
                     self.log_message.emit("Processing cancelled")
+                    for pending in future_to_path:
+                        pending.cancel()
                     break
 
                 pdf_path = future_to_path[future]
 
                 try:
-                    path, items, error = future.result()
+                    if self.use_processes:
+                        path, items, error = _finish_worker_result(
+                            self.processor, future.result(), self.output_folder, self.log_message.emit)
+                    else:
+                        path, items, error = future.result()
 
                     if error:
                         self.log_message.emit(f"  ✗ {path.name}: {error}")
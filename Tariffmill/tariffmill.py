@@ -4638,6 +4638,10 @@ class TariffMill(QMainWindow):
             conn.commit()
             conn.close()
 
+            # OCRMill caches manufacturer names for MID lookup
+            if hasattr(self, 'ocrmill_db') and self.ocrmill_db:
+                self.ocrmill_db.invalidate_manufacturer_index()
+
             QMessageBox.information(self, "Saved", f"Saved {saved} MID records to database.")
             self.load_available_mids()
 
@@ -9672,122 +9676,11 @@ class TariffMill(QMainWindow):
         # - Count-only: NO, PCS, DOZ, etc. -> Qty1 = quantity (pieces), Qty2 = empty
         # - Dual (count + weight): NO. AND KG, XX KG, XX G -> Qty1 = quantity, Qty2 = CalcWtNet
         # - Other units (volume, area, length): Use quantity if available, else empty
-
-        # Weight-only units (Qty1 = weight in KG)
-        WEIGHT_UNITS = {'KG', 'G', 'T', 'T ADW', 'T DWB'}
-
-        # Count-only units (Qty1 = piece count)
-        COUNT_UNITS = {'NO', 'PCS', 'DOZ', 'DOZ. PRS', 'DZ PCS', 'GROSS', 'HUNDREDS',
-                       'THOUSANDS', 'PRS', 'PACK', 'DOSES', 'CARAT'}
-
-        # Dual units: first quantity is count, second is weight (Qty1 = count, Qty2 = weight)
-        # Includes NO. AND KG and metal+weight combinations
-        DUAL_UNITS = {'NO. AND KG', 'NO/KG', 'NO\\KG', 'NO., KG', 'NO. KG', 'NO KG',
-                      'CU KG', 'CY KG', 'NI KG', 'PB KG', 'ZN KG', 'KG AMC',
-                      'AG G', 'AU G', 'IR G', 'OS G', 'PD G', 'PT G', 'RH G', 'RU G',
-                      'DOZ., KG', 'DOZ. KG', 'DOZ KG', 'PRS., KG', 'PRS. KG', 'PRS KG'}
-
-        # Volume/Area/Length units (use quantity from invoice)
-        MEASURE_UNITS = {'LITERS', 'PF.LITERS', 'BBL', 'M', 'LIN. M', 'M2', 'CM2', 'M3',
-                         'SQUARE', 'FIBER M', 'GBQ', 'MWH', 'THOUSAND M', 'THOUSAND M3'}
-
-        # Units that should have BOTH Qty1 and Qty2 empty (measurement-only units per CBP requirements)
-        NO_QTY_UNITS = {'M', 'M2', 'M3'}
-
-        def get_qty1(row):
-            qty_unit = str(row.get('qty_unit', '')).strip().upper() if pd.notna(row.get('qty_unit')) else ''
-            if qty_unit == '':
-                return ''
-
-            # If qty_unit is in NO_QTY_UNITS, leave Qty1 empty
-            if qty_unit in NO_QTY_UNITS:
-                return ''
-
-            # Weight-only units: Qty1 is net weight (minimum 1 KG)
-            if qty_unit in WEIGHT_UNITS:
-                wt = int(round(row['CalcWtNet']))
-                return str(max(wt, 1))  # Minimum 1 KG
-
-            # Count-only units: Qty1 is piece count from invoice
-            if qty_unit in COUNT_UNITS:
-                qty = row.get('quantity', '')
-                if pd.notna(qty) and str(qty).strip():
-                    try:
-                        return str(int(float(str(qty).replace(',', '').strip())))
-                    except (ValueError, TypeError):
-                        return ''
-                return ''
-
-            # Dual units: Qty1 is piece count
-            if qty_unit in DUAL_UNITS:
-                qty = row.get('quantity', '')
-                if pd.notna(qty) and str(qty).strip():
-                    try:
-                        qty_val = float(str(qty).replace(',', '').strip())
-                        # Preserve 2 decimal places for dozen-based units (DOZ., KG etc.)
-                        if 'DOZ' in qty_unit:
-                            return f"{qty_val:.2f}"
-                        # For NO-based units, if qty appears to be in dozens (< 100 and has decimals),
-                        # it may need conversion. Check quantity_unit from invoice to determine.
-                        qty_unit_invoice = str(row.get('quantity_unit', '')).strip().upper()
-                        if 'NO' in qty_unit and qty_unit_invoice == 'DOZ':
-                            # Invoice reported in dozens, convert to pieces
-                            qty_val = qty_val * 12
-                        result = max(int(qty_val), 1)  # Minimum 1 piece
-                        return str(result)
-                    except (ValueError, TypeError):
-                        return ''
-                # If no quantity, return minimum of 1 for NO-based units
-                if 'NO' in qty_unit:
-                    return '1'
-                return ''
-
-            # Measure units: Use quantity from invoice if available
-            if qty_unit in MEASURE_UNITS:
-                qty = row.get('quantity', '')
-                if pd.notna(qty) and str(qty).strip():
-                    try:
-                        return str(int(float(str(qty).replace(',', '').strip())))
-                    except (ValueError, TypeError):
-                        return ''
-                return ''
-
-            # Unknown unit type - try quantity first, fall back to empty
-            qty = row.get('quantity', '')
-            if pd.notna(qty) and str(qty).strip():
-                try:
-                    return str(int(float(str(qty).replace(',', '').strip())))
-                except (ValueError, TypeError):
-                    return ''
-            return ''
-
-        def get_qty2(row):
-            qty_unit = str(row.get('qty_unit', '')).strip().upper() if pd.notna(row.get('qty_unit')) else ''
-
-            # If qty_unit is in NO_QTY_UNITS, leave Qty2 empty
-            if qty_unit in NO_QTY_UNITS:
-                return ''
-
-            # IMPORTANT: For single units (weight-only or count-only), Qty2 should always be empty
-            # Only dual units (like NO/KG) should have both Qty1 and Qty2
-            # Single weight units: KG, G, T - only Qty1 (weight)
-            # Single count units: NO, PCS, etc. - only Qty1 (count)
-            if qty_unit in WEIGHT_UNITS or qty_unit in COUNT_UNITS:
-                return ''
-
-            # Dual units: Qty2 is net weight (minimum 1 KG)
-            if qty_unit in DUAL_UNITS:
-                calc_wt = row.get('CalcWtNet', 0)
-                if pd.isna(calc_wt):
-                    calc_wt = 0
-                wt = int(round(calc_wt))
-                return str(max(wt, 1))  # Minimum 1 KG
-
-            # All other cases: Qty2 is empty
-            return ''
-
-        df['Qty1'] = df.apply(get_qty1, axis=1)
-        df['Qty2'] = df.apply(get_qty2, axis=1)
+        try:
+            from Tariffmill.invoice_processor.core.quantities import calculate_cbp_quantities
+        except ImportError:
+            from invoice_processor.core.quantities import calculate_cbp_quantities
+        df['Qty1'], df['Qty2'] = calculate_cbp_quantities(df)
 
         # Keep cbp_qty for backward compatibility (uses Qty1 logic)
         df['cbp_qty'] = df['Qty1']
@@ -16412,10 +16305,12 @@ class TariffMill(QMainWindow):
             from Tariffmill.ocrmill_database import OCRMillDatabase
             from Tariffmill.ocrmill_processor import ProcessorEngine, OCRMillConfig
             from Tariffmill.ocrmill_worker import OCRMillWorker, SingleFileWorker, MultiFileWorker, ParallelFolderWorker
+            from Tariffmill.ocrmill_page_store import set_page_store_path
         except ImportError:
             from ocrmill_database import OCRMillDatabase
             from ocrmill_processor import ProcessorEngine, OCRMillConfig
             from ocrmill_worker import OCRMillWorker, SingleFileWorker, MultiFileWorker, ParallelFolderWorker
+            from ocrmill_page_store import set_page_store_path
 
         # Use QVBoxLayout directly on the tab widget (like Process Shipment tab)
         layout = QVBoxLayout(self.tab_ocrmill)
@@ -16436,6 +16331,10 @@ class TariffMill(QMainWindow):
         set_user_setting('ocrmill_output_folder', str(self.ocrmill_config.output_folder))
         self.ocrmill_config.poll_interval = get_user_setting_int('ocrmill_poll_interval', 60)
         self.ocrmill_config.consolidate_multi_invoice = get_user_setting_bool('ocrmill_consolidate', False)
+        self.ocrmill_config.use_process_pool = get_user_setting_bool('ocrmill_process_pool', True)
+        self.ocrmill_config.max_workers = get_user_setting_int('ocrmill_max_workers', 0)
+        self.ocrmill_config.result_cache_path = BASE_DIR / "Cache" / "ocrmill_results.db"
+        set_page_store_path(BASE_DIR / "Cache" / "ocrmill_pages.db")
 
         self.ocrmill_processor = ProcessorEngine(self.ocrmill_db, self.ocrmill_config, log_callback=self.ocrmill_log)
         self.ocrmill_worker = OCRMillWorker(self.ocrmill_processor)
@@ -16593,6 +16492,31 @@ class TariffMill(QMainWindow):
 
         self.ocrmill_output_mode_group.buttonClicked.connect(self.ocrmill_output_mode_changed)
 
+        # Parallel processing settings for multi-file / folder processing
+        parallel_label = QLabel("Parallel processing:")
+        parallel_label.setStyleSheet("font-weight: bold; margin-top: 5px;")
+        actions_layout.addWidget(parallel_label)
+
+        self.ocrmill_process_pool_check = QCheckBox("Use separate processes (faster on multi-core)")
+        self.ocrmill_process_pool_check.setToolTip(
+            "Extract each PDF in its own worker process. Threads are limited by Python's GIL,\n"
+            "so processes scale much better for large batches.")
+        self.ocrmill_process_pool_check.setChecked(self.ocrmill_config.use_process_pool)
+        self.ocrmill_process_pool_check.toggled.connect(self.ocrmill_parallel_settings_changed)
+        actions_layout.addWidget(self.ocrmill_process_pool_check)
+
+        workers_row = QHBoxLayout()
+        workers_row.addWidget(QLabel("Workers:"))
+        self.ocrmill_workers_spin = QSpinBox()
+        self.ocrmill_workers_spin.setRange(0, 64)
+        self.ocrmill_workers_spin.setSpecialValueText("Auto")
+        self.ocrmill_workers_spin.setToolTip("Number of parallel workers (Auto = based on CPU count)")
+        self.ocrmill_workers_spin.setValue(self.ocrmill_config.max_workers)
+        self.ocrmill_workers_spin.valueChanged.connect(self.ocrmill_parallel_settings_changed)
+        workers_row.addWidget(self.ocrmill_workers_spin)
+        workers_row.addStretch()
+        actions_layout.addLayout(workers_row)
+
         actions_group.setLayout(actions_layout)
         left_side.addWidget(actions_group)
 
@@ -17603,6 +17527,25 @@ class TariffMill(QMainWindow):
         self._apply_stats_table_style(template_table)
         ocr_layout.addWidget(template_table)
 
+        # Per-stage processing times
+        stage_label = QLabel("Stage Timings (p50 / p95)")
+        stage_label.setStyleSheet("font-weight: bold; margin-top: 10px;")
+        ocr_layout.addWidget(stage_label)
+
+        stage_table = QTableWidget()
+        stage_table.setColumnCount(7)
+        stage_table.setHorizontalHeaderLabels([
+            "Template", "Stage", "Samples", "p50 (ms)", "p95 (ms)", "Avg Pages", "Avg Chars"
+        ])
+        stage_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for i in range(1, 7):
+            stage_table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        stage_table.setAlternatingRowColors(True)
+        stage_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        stage_table.verticalHeader().setVisible(False)
+        self._apply_stats_table_style(stage_table)
+        ocr_layout.addWidget(stage_table)
+
         scroll_layout.addWidget(ocr_group)
 
         # === Time Savings Analysis Section ===
@@ -17843,6 +17786,22 @@ class TariffMill(QMainWindow):
                 except Exception as e:
                     logger.error(f"Error loading OCRMill stats: {e}")
 
+                try:
+                    stage_stats = self.ocrmill_db.get_stage_timing_percentiles()
+                    stage_table.setRowCount(len(stage_stats))
+                    for row, stat in enumerate(stage_stats):
+                        stage_table.setItem(row, 0, QTableWidgetItem(stat.get('template_name', '')))
+                        stage_table.setItem(row, 1, QTableWidgetItem(stat.get('stage', '')))
+                        stage_table.setItem(row, 2, QTableWidgetItem(str(stat.get('samples', 0))))
+                        stage_table.setItem(row, 3, QTableWidgetItem(f"{stat.get('p50_ms', 0) or 0:.1f}"))
+                        stage_table.setItem(row, 4, QTableWidgetItem(f"{stat.get('p95_ms', 0) or 0:.1f}"))
+                        avg_pages = stat.get('avg_pages')
+                        avg_chars = stat.get('avg_chars')
+                        stage_table.setItem(row, 5, QTableWidgetItem(f"{avg_pages:.1f}" if avg_pages is not None else ""))
+                        stage_table.setItem(row, 6, QTableWidgetItem(str(int(avg_chars)) if avg_chars is not None else ""))
+                except Exception as e:
+                    logger.error(f"Error loading OCRMill stage timings: {e}")
+
             # === Time Savings Calculation ===
             try:
                 mins_per_line = mins_per_line_spin.value()
@@ -18682,13 +18641,13 @@ class TariffMill(QMainWindow):
         try:
             self.ai_new_pdf_path.setText(path)
 
-            # Extract text from PDF
-            text_parts = []
-            with pdfplumber.open(path) as pdf:
-                for page in pdf.pages[:5]:  # First 5 pages
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
+            try:
+                from Tariffmill.ocrmill_page_store import get_page_store
+            except ImportError:
+                from ocrmill_page_store import get_page_store
+
+            # Extract text from PDF (first 5 pages, reused from the page store if seen before)
+            text_parts = [page_text for page_text in get_page_store().get_page_texts(path, max_pages=5) if page_text]
 
             full_text = '\n\n'.join(text_parts)
             self.ai_new_invoice_text.setPlainText(full_text)
@@ -19427,17 +19386,21 @@ Please fix this error in the template code. Return the complete corrected templa
     def _ai_extract_pdf_text(self, pdf_path: str) -> str:
         """Extract text from a PDF file."""
         try:
-            import pdfplumber
-            text_parts = []
-            with pdfplumber.open(pdf_path) as pdf:
-                for i, page in enumerate(pdf.pages[:10]):  # Limit to first 10 pages
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(f"[Page {i+1}]\n{page_text}")
-            return "\n\n".join(text_parts)
+            import pdfplumber  # Required by the page store
         except ImportError:
             self.ocrmill_log("pdfplumber not installed - cannot extract PDF text")
             return ""
+        try:
+            try:
+                from Tariffmill.ocrmill_page_store import get_page_store
+            except ImportError:
+                from ocrmill_page_store import get_page_store
+            page_texts = get_page_store().get_page_texts(pdf_path, max_pages=10)  # Limit to first 10 pages
+            text_parts = [f"[Page {i+1}]\n{page_text}" for i, page_text in enumerate(page_texts) if page_text]
+            return "\n\n".join(text_parts)
+        except ImportError as e:
+            self.ocrmill_log(f"PDF page store unavailable - cannot extract PDF text: {e}")
+            return ""
         except Exception as e:
             self.ocrmill_log(f"Error extracting PDF text: {e}")
             return ""
@@ -19564,7 +19527,8 @@ Please fix this error in the template code. Return the complete corrected templa
             # Set context
             self._agent_manager.set_template_code(self.ai_code_edit.toPlainText())
             if invoice_text:
-                self._agent_manager.set_invoice(invoice_text)
+                # A single PDF's path lets template tests pull its tables from the page store
+                self._agent_manager.set_invoice(invoice_text, path=pdf_paths[0] if len(pdf_paths) == 1 else "")
 
             # Set database connection if available
             if hasattr(self, 'db') and self.db:
@@ -20040,6 +20004,13 @@ Please fix this error in the template code. Return the complete corrected templa
         mode_text = "single combined file" if consolidate else "separate files per invoice"
         self.ocrmill_log(f"Output mode changed to: {mode_text}")
 
+    def ocrmill_parallel_settings_changed(self, *args):
+        """Handle changes to the parallel processing mode or worker count."""
+        self.ocrmill_config.use_process_pool = self.ocrmill_process_pool_check.isChecked()
+        self.ocrmill_config.max_workers = self.ocrmill_workers_spin.value()
+        set_user_setting('ocrmill_process_pool', 'true' if self.ocrmill_config.use_process_pool else 'false')
+        set_user_setting('ocrmill_max_workers', str(self.ocrmill_config.max_workers))
+
     def ocrmill_toggle_monitoring(self):
         """Toggle folder monitoring on/off."""
         if self.ocrmill_monitor_btn.isChecked():
@@ -22,6 +22,11 @@ try:
 except ImportError:
     PDF_AVAILABLE = False
 
+try:
+    from Tariffmill.ocrmill_page_store import get_page_store
+except ImportError:
+    from ocrmill_page_store import get_page_store
+
 
 @dataclass
 class FieldPattern:
@@ -136,11 +141,8 @@ class TemplateGenerator:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-        # Extract text
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages[:pages]):
-                text += (page.extract_text() or "") + "\n"
+        # Extract text (reused from the page store when the sample was analyzed before)
+        text = "".join(page_text + "\n" for page_text in get_page_store().get_page_texts(pdf_path, max_pages=pages))
 
         if not text.strip():
             raise ValueError("No text extracted from PDF. It may be a scanned document.")
@@ -421,6 +423,9 @@ class {class_name}(BaseTemplate):
 
     extra_columns = {repr(extra_cols)}
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = {repr(indicators)}
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the invoice."""
         text_lower = text.lower()
@@ -5,104 +5,279 @@ Dynamically discovers and loads templates from this directory.
 """
 
 import os
+import hashlib
 import importlib
 import importlib.util
 import sys
+import threading
 from pathlib import Path
+from types import MappingProxyType
 
 from .base_template import BaseTemplate
 
-# Registry of all available templates (populated dynamically)
+# Registry of all available templates (populated dynamically; a new dict per discovery,
+# see TemplateRegistry for the snapshot workers should use)
 TEMPLATE_REGISTRY = {}
 
 # Files to exclude from template discovery
 EXCLUDED_FILES = {'__init__.py', 'base_template.py', 'sample_template.py'}
 
 
+class TemplateRoutingIndex:
+    """
+    Keyword index used to shortlist templates before confidence scoring.
+
+    Templates declaring routing_keywords are only shortlisted when one of their
+    keywords appears in the (lowercased) text; templates without keywords are
+    always shortlisted.
+    """
+
+    def __init__(self, template_classes: dict):
+        self.keyword_to_templates = {}  # keyword -> set of template names
+        self.unrouted = set()  # templates that are always candidates
+        self.max_confidence = {}  # template name -> max achievable score
+
+        for name, cls in template_classes.items():
+            self.max_confidence[name] = getattr(cls, 'max_confidence', 1.0)
+            keywords = [kw.lower() for kw in getattr(cls, 'routing_keywords', None) or [] if kw]
+            if not keywords:
+                self.unrouted.add(name)
+                continue
+            for keyword in keywords:
+                self.keyword_to_templates.setdefault(keyword, set()).add(name)
+
+    def shortlist(self, text: str) -> set:
+        """Return names of templates whose routing keywords occur in the text."""
+        text_lower = text.lower()
+        candidates = set(self.unrouted)
+        for keyword, names in self.keyword_to_templates.items():
+            if not names <= candidates and keyword in text_lower:
+                candidates |= names
+        return candidates
+
+
+class TemplateRegistry:
+    """
+    Immutable snapshot of the discovered template classes and their routing index.
+
+    Discovery publishes a new snapshot instead of modifying the current one, so a
+    worker that took a snapshot (or instances created from it) keeps a consistent
+    set of templates until it finishes its current file, even if templates are
+    refreshed meanwhile.
+
+    Each snapshot also holds one shared instance per template (see get_instances).
+    Templates are stateless between calls - per-document state goes through the
+    ExtractionContext passed to their hooks - so the shared instances can be used
+    from several threads at once.
+    """
+
+    def __init__(self, template_classes: dict, generation: int = 0, previous: 'TemplateRegistry' = None):
+        """
+        Args:
+            template_classes: Template name -> class, in discovery order
+            generation: Increases with each published snapshot
+            previous: Snapshot being replaced; its instances are kept for unchanged classes
+        """
+        self.classes = MappingProxyType(dict(template_classes))  # name -> class, in discovery order
+        self.routing = TemplateRoutingIndex(self.classes)
+        self.generation = generation
+        self._instances = {}
+        self._instances_lock = threading.Lock()
+        if previous is not None:
+            with previous._instances_lock:
+                self._instances = {name: instance for name, instance in previous._instances.items()
+                                   if self.classes.get(name) is type(instance)}
+
+    def create_templates(self) -> dict:
+        """New instances of every template, keyed by name."""
+        return {name: cls() for name, cls in self.classes.items()}
+
+    def get_instance(self, name: str) -> BaseTemplate:
+        """The shared instance of one template, created on first use."""
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._instances_lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self.classes[name]()
+                    self._instances[name] = instance
+        return instance
+
+    def get_instances(self) -> dict:
+        """Shared instances of every template, keyed by name."""
+        return {name: self.get_instance(name) for name in self.classes}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.classes
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+
+class _LoadedTemplate:
+    """A template file as last loaded: file signature, content hash, and template class."""
+
+    __slots__ = ('mtime_ns', 'size', 'digest', 'template_class')
+
+    def __init__(self, mtime_ns: int, size: int, digest: str, template_class):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.template_class = template_class
+
+
+# Current registry snapshot (replaced, never modified, by discovery/registration)
+_REGISTRY = None
+# Per-file load cache used to skip unchanged files on refresh (module name -> _LoadedTemplate)
+_LOADED_FILES = {}
+# Manually registered templates, kept across refreshes
+_REGISTERED = {}
+_DISCOVERY_LOCK = threading.RLock()
+
+
+def _load_template_class(module_name: str, file_path: Path):
+    """Import a template file fresh and return its BaseTemplate subclass (or None)."""
+    full_module_name = f"{__name__}.{module_name}"  # templates.x or Tariffmill.templates.x
+
+    # The source loader reuses/writes compiled bytecode in __pycache__
+    spec = importlib.util.spec_from_file_location(full_module_name, file_path)
+    if spec is None or spec.loader is None:
+        return None
+
+    module = importlib.util.module_from_spec(spec)
+    previous = sys.modules.get(full_module_name)
+    sys.modules[full_module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        # Keep the previously loaded version of the module importable
+        if previous is not None:
+            sys.modules[full_module_name] = previous
+        else:
+            sys.modules.pop(full_module_name, None)
+        raise
+
+    # Find template class (class that inherits from BaseTemplate)
+    for attr_name in dir(module):
+        attr = getattr(module, attr_name)
+        if (isinstance(attr, type) and
+            issubclass(attr, BaseTemplate) and
+            attr is not BaseTemplate):
+            return attr
+    return None
+
+
 def _discover_templates():
     """
-    Dynamically discover and load all template classes from this directory.
+    Discover template classes from this directory and publish a new registry.
+
     Templates must:
     - Be .py files in the templates directory
     - Contain a class that inherits from BaseTemplate
     - Not be in EXCLUDED_FILES
+
+    Discovery is incremental: a file is only re-imported if its size/mtime changed
+    and its content hash differs from the version already loaded. Files that failed
+    to load are retried on every refresh.
     """
-    global TEMPLATE_REGISTRY
-    TEMPLATE_REGISTRY.clear()
+    global TEMPLATE_REGISTRY, _REGISTRY
 
     templates_dir = Path(__file__).parent
 
-    for file_path in templates_dir.glob('*.py'):
-        if file_path.name in EXCLUDED_FILES:
-            continue
-
-        # Skip files with spaces in names (invalid Python module names)
-        if ' ' in file_path.name:
-            print(f"Warning: Skipping template '{file_path.name}' - filename contains spaces. Rename to use underscores.")
-            continue
-
-        module_name = file_path.stem  # filename without .py
-        full_module_name = f"templates.{module_name}"
-
-        try:
-            # Remove from cache if already loaded (force reload)
-            if full_module_name in sys.modules:
-                del sys.modules[full_module_name]
-
-            # Load the module fresh
-            spec = importlib.util.spec_from_file_location(
-                full_module_name,
-                file_path
-            )
-            if spec is None or spec.loader is None:
+    with _DISCOVERY_LOCK:
+        discovered = {}
+        seen_modules = set()
+
+        for file_path in templates_dir.glob('*.py'):
+            if file_path.name in EXCLUDED_FILES:
+                continue
+
+            # Skip files with spaces in names (invalid Python module names)
+            if ' ' in file_path.name:
+                print(f"Warning: Skipping template '{file_path.name}' - filename contains spaces. Rename to use underscores.")
                 continue
 
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[full_module_name] = module
-            spec.loader.exec_module(module)
+            module_name = file_path.stem  # filename without .py
+            seen_modules.add(module_name)
 
-            # Find template class (class that inherits from BaseTemplate)
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if (isinstance(attr, type) and
-                    issubclass(attr, BaseTemplate) and
-                    attr is not BaseTemplate):
-                    # Register the template
-                    TEMPLATE_REGISTRY[module_name] = attr
-                    break
+            try:
+                stat = file_path.stat()
+                loaded = _LOADED_FILES.get(module_name)
+                if loaded is None or (loaded.mtime_ns, loaded.size) != (stat.st_mtime_ns, stat.st_size):
+                    digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+                    if loaded is not None and loaded.digest == digest:
+                        # Touched but not changed (e.g. saved without edits)
+                        loaded.mtime_ns, loaded.size = stat.st_mtime_ns, stat.st_size
+                    else:
+                        template_class = _load_template_class(module_name, file_path)
+                        loaded = _LoadedTemplate(stat.st_mtime_ns, stat.st_size, digest, template_class)
+                        _LOADED_FILES[module_name] = loaded
+
+                if loaded.template_class is not None:
+                    discovered[module_name] = loaded.template_class
+
+            except Exception as e:
+                _LOADED_FILES.pop(module_name, None)
+                print(f"Warning: Failed to load template {module_name}: {e}")
+                continue
 
-        except Exception as e:
-            print(f"Warning: Failed to load template {module_name}: {e}")
-            continue
+        # Forget files that were deleted
+        for module_name in list(_LOADED_FILES):
+            if module_name not in seen_modules:
+                del _LOADED_FILES[module_name]
+                sys.modules.pop(f"{__name__}.{module_name}", None)
+
+        discovered.update(_REGISTERED)
+        generation = _REGISTRY.generation + 1 if _REGISTRY is not None else 0
+        _REGISTRY = TemplateRegistry(discovered, generation, previous=_REGISTRY)
+        TEMPLATE_REGISTRY = dict(_REGISTRY.classes)
+        return _REGISTRY
 
 
 def refresh_templates():
     """
-    Re-scan the templates directory and reload all templates.
+    Re-scan the templates directory, reloading only new or changed templates.
     Call this to pick up new templates or remove deleted ones.
     """
-    _discover_templates()
+    return _discover_templates()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Get the current registry snapshot (discovering templates on first use)."""
+    registry = _REGISTRY
+    if registry is None:
+        registry = _discover_templates()
+    return registry
 
 
 def get_template(name: str) -> BaseTemplate:
-    """Get a template instance by name."""
-    if not TEMPLATE_REGISTRY:
-        _discover_templates()
-    if name in TEMPLATE_REGISTRY:
-        return TEMPLATE_REGISTRY[name]()
+    """Get the shared template instance by name."""
+    registry = get_template_registry()
+    if name in registry:
+        return registry.get_instance(name)
     raise ValueError(f"Unknown template: {name}")
 
 
 def get_all_templates() -> dict:
-    """Get all available templates."""
-    if not TEMPLATE_REGISTRY:
-        _discover_templates()
-    return {name: cls() for name, cls in TEMPLATE_REGISTRY.items()}
+    """Get the shared instances of all available templates."""
+    return get_template_registry().get_instances()
+
+
+def get_routing_index() -> TemplateRoutingIndex:
+    """Get the routing index for the current template registry."""
+    return get_template_registry().routing
 
 
 def register_template(name: str, template_class):
     """Register a new template manually."""
-    TEMPLATE_REGISTRY[name] = template_class
+    global TEMPLATE_REGISTRY, _REGISTRY
+    with _DISCOVERY_LOCK:
+        _REGISTERED[name] = template_class
+        current = get_template_registry()
+        classes = dict(current.classes)
+        classes[name] = template_class
+        _REGISTRY = TemplateRegistry(classes, current.generation + 1, previous=current)
+        TEMPLATE_REGISTRY = dict(_REGISTRY.classes)
 
 
 # Initial discovery on import
@@ -3,9 +3,61 @@ Base Template Class for Invoice OCR Extraction
 All invoice templates should inherit from this class.
 """
 
+import inspect
 import re
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Tuple
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+
+class ExtractionContext:
+    """
+    Scratch state for one document extraction (one extract_all() call).
+
+    Template instances are shared between threads and documents, so anything
+    computed for the current document (an extractor result, values needed again
+    in post-processing, ...) is kept here instead of on the template.
+    """
+
+    def __init__(self, text: str = "", tables: List[List[List[str]]] = None):
+        """
+        Args:
+            text: Pre-processed document text being extracted
+            tables: Tables passed to extract_all, if any
+        """
+        self.text = text
+        self.tables = tables
+        self.values = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a stored value."""
+        return self.values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        """Store a value for later steps of this extraction."""
+        self.values[key] = value
+
+    def memo(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return the stored value for key, computing it with factory() on first use."""
+        if key not in self.values:
+            self.values[key] = factory()
+        return self.values[key]
+
+
+# (template class, method name) -> whether the method takes a context argument
+_CONTEXT_HOOKS = {}
+
+
+def _accepts_context(cls, method_name: str) -> bool:
+    """Check (once per class) if a template method declares a 'context' parameter."""
+    key = (cls, method_name)
+    accepts = _CONTEXT_HOOKS.get(key)
+    if accepts is None:
+        try:
+            accepts = 'context' in inspect.signature(getattr(cls, method_name)).parameters
+        except (TypeError, ValueError):
+            accepts = False
+        _CONTEXT_HOOKS[key] = accepts
+    return accepts
 
 
 class BaseTemplate(ABC):
@@ -17,6 +69,14 @@ class BaseTemplate(ABC):
     2. Inherit from BaseTemplate
     3. Implement all abstract methods
     4. Register in templates/__init__.py
+
+    Lifecycle: one instance per template is created when templates are loaded and
+    shared by all workers/threads. Only set up read-only data (patterns, lookup
+    tables) in __init__; never store per-document state on self. Extraction hooks
+    (extract_invoice_number, extract_project_number, extract_manufacturer_name,
+    extract_line_items, extract_from_tables, post_process_items) that need such
+    state can declare a 'context' keyword argument and will receive the
+    ExtractionContext of the current extract_all() call.
     """
     
     # Template metadata
@@ -30,6 +90,16 @@ class BaseTemplate(ABC):
     
     # CSV columns this template produces (in addition to standard columns)
     extra_columns: List[str] = []
+
+    # Routing: cheap lowercase signature keywords / supplier fingerprints.
+    # If set, the template is only scored when at least one keyword appears in the
+    # text, so every keyword set must be a necessary condition of can_process().
+    # Leave empty for generic templates that must always be scored.
+    routing_keywords: List[str] = []
+
+    # Highest score get_confidence_score() can return. Lets the router skip
+    # scoring once another template has already scored higher.
+    max_confidence: float = 1.0
     
     # Standard columns all templates must produce
     STANDARD_COLUMNS = [
@@ -170,7 +240,15 @@ class BaseTemplate(ABC):
         """Get all columns this template produces."""
         return self.STANDARD_COLUMNS + self.extra_columns
     
-    def extract_all(self, text: str, tables: List[List[List[str]]] = None) -> Tuple[str, str, List[Dict]]:
+    def _call_hook(self, method_name: str, *args, context: ExtractionContext):
+        """Call an extraction hook, passing the context if the hook declares one."""
+        method = getattr(self, method_name)
+        if _accepts_context(type(self), method_name):
+            return method(*args, context=context)
+        return method(*args)
+
+    def extract_all(self, text: str, tables: List[List[List[str]]] = None,
+                    context: ExtractionContext = None) -> Tuple[str, str, List[Dict]]:
         """
         Main extraction method - extracts everything from the text and optional tables.
 
@@ -178,31 +256,36 @@ class BaseTemplate(ABC):
             text: Full text extracted from the PDF
             tables: Optional list of tables from pdfplumber. Each table is a list of rows,
                    each row is a list of cell values (strings).
+            context: Scratch state for this extraction (a new one is created if None)
 
         Returns:
             Tuple of (invoice_number, project_number, line_items)
             Note: Each line item includes 'manufacturer_name' if detected
         """
         processed_text = self.pre_process_text(text)
+        if context is None:
+            context = ExtractionContext()
+        context.text = processed_text
+        context.tables = tables
 
-        invoice_number = self.extract_invoice_number(processed_text)
-        project_number = self.extract_project_number(processed_text)
-        manufacturer_name = self.extract_manufacturer_name(processed_text)
+        invoice_number = self._call_hook('extract_invoice_number', processed_text, context=context)
+        project_number = self._call_hook('extract_project_number', processed_text, context=context)
+        manufacturer_name = self._call_hook('extract_manufacturer_name', processed_text, context=context)
 
         # Try table-based extraction first if tables are provided and template supports it
         if tables and hasattr(self, 'extract_from_tables') and callable(self.extract_from_tables):
-            items = self.extract_from_tables(tables, processed_text)
+            items = self._call_hook('extract_from_tables', tables, processed_text, context=context)
             if items:  # If table extraction returned items, use those
                 # Add manufacturer name to each item if detected
                 if manufacturer_name:
                     for item in items:
                         if 'manufacturer_name' not in item or not item['manufacturer_name']:
                             item['manufacturer_name'] = manufacturer_name
-                items = self.post_process_items(items)
+                items = self._call_hook('post_process_items', items, context=context)
                 return invoice_number, project_number, items
 
         # Fall back to text-based extraction
-        items = self.extract_line_items(processed_text)
+        items = self._call_hook('extract_line_items', processed_text, context=context)
 
         # Add manufacturer name to each item if detected
         if manufacturer_name:
@@ -210,7 +293,7 @@ class BaseTemplate(ABC):
                 if 'manufacturer_name' not in item or not item['manufacturer_name']:
                     item['manufacturer_name'] = manufacturer_name
 
-        items = self.post_process_items(items)
+        items = self._call_hook('post_process_items', items, context=context)
 
         return invoice_number, project_number, items
 
@@ -233,6 +316,15 @@ class BaseTemplate(ABC):
         # Default implementation: return empty to use text extraction
         return []
 
+    def uses_tables(self) -> bool:
+        """
+        Check if this template does table-based extraction.
+
+        True when a subclass overrides extract_from_tables. The processor only runs
+        pdfplumber table detection (slow) for templates that use the result.
+        """
+        return type(self).extract_from_tables is not BaseTemplate.extract_from_tables
+
     def detect_table_header_row(self, table: List[List[str]], expected_headers: List[str]) -> int:
         """
         Utility method to find the header row in a table.
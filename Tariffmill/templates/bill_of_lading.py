@@ -26,6 +26,9 @@ class BillOfLadingTemplate(BaseTemplate):
     # BOL doesn't produce line items - it provides metadata
     extra_columns = []
 
+    # Never selected as primary template (see get_confidence_score)
+    max_confidence = 0.0
+
     def can_process(self, text: str) -> bool:
         """
         Check if this document is a Bill of Lading.
@@ -36,6 +36,9 @@ class CoexpoIcatSaTemplate(BaseTemplate):
         "vidales larrañaga"
     ]
 
+    # Template is only scored if one of the supplier keywords appears in the text
+    routing_keywords = SUPPLIER_KEYWORDS
+
     def can_process(self, text: str) -> bool:
         """Check if this is a ICAT S.A. DE C.V. invoice."""
         text_lower = text.lower()
@@ -30,6 +30,9 @@ class HebeiShinyeeTemplate(BaseTemplate):
         "commercial invoice"
     ]
 
+    # Template is only scored if one of the supplier keywords appears in the text
+    routing_keywords = SUPPLIER_KEYWORDS
+
     def can_process(self, text: str) -> bool:
         """Check if this is a Hebei Shinyee Trade Co invoice."""
         text_lower = text.lower()
@@ -22,6 +22,9 @@ class HimcastInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['country']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['himgiri castings', 'gstin : 30aaach7559j1zj']
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the invoice."""
         text_lower = text.lower()
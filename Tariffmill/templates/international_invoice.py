@@ -30,6 +30,10 @@ class InternationalInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description', 'hs_code', 'country_of_origin', 'net_weight']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['commercial invoice', 'export invoice', 'proforma invoice']
+    max_confidence = 0.75
+
     def can_process(self, text: str) -> bool:
         """Check if this is an international commercial invoice."""
         text_lower = text.lower()
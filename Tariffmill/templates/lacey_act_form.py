@@ -24,6 +24,9 @@ class LaceyActFormTemplate(BaseTemplate):
 
     extra_columns = ['htsus_number', 'entered_value', 'article_component', 'scientific_name', 'country_of_harvest', 'unit', 'percent_recycled']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['ppq form 505']
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the given invoice."""
         return 'ppq form 505' in text.lower() and 'plant and plant product declaration form' in text.lower() and 'lacey act amendment' in text.lower() and 'omb approved 0579-0349' in text.lower() and 'paperwork reduction act of 1995' in text.lower()
@@ -236,6 +236,9 @@ class MasonrySupplyAgarwallaTemplate(BaseTemplate):
 
     extra_columns = ['po_date', 'hs_code', 'country_origin', 'unit_price']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['agarwalla']
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the given invoice."""
         text_lower = text.lower()
@@ -30,6 +30,9 @@ class MmciteCzechTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description', 'project', 'czk_price']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['mmcit']  # matches both composed and decomposed 'mmcité'
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the invoice."""
         text_lower = text.lower()
@@ -29,6 +29,10 @@ class ProformaInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description', 'hs_code']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['proforma', 'pro forma', 'pro-forma']
+    max_confidence = 0.8
+
     def can_process(self, text: str) -> bool:
         """Check if this is a proforma invoice."""
         text_lower = text.lower()
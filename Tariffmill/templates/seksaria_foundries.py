@@ -11,7 +11,7 @@ import os
 import sqlite3
 from pathlib import Path
 from typing import List, Dict, Optional
-from .base_template import BaseTemplate
+from .base_template import BaseTemplate, ExtractionContext
 
 
 class SeksariaFoundriesTemplate(BaseTemplate):
@@ -38,6 +38,9 @@ class SeksariaFoundriesTemplate(BaseTemplate):
         'sfl/'
     ]
 
+    # Template is only scored if one of the supplier keywords appears in the text
+    routing_keywords = SUPPLIER_KEYWORDS
+
     def __init__(self):
         super().__init__()
         self.msi_sigma_mappings = {}  # msi_part -> sigma_part
@@ -272,7 +275,6 @@ class SeksariaFoundriesTemplate(BaseTemplate):
         - total_price: Float total price
         - country_origin: 'INDIA'
         """
-        self.last_processed_text = text
         items = []
 
         # Multiple patterns to handle different invoice formats
@@ -390,7 +392,7 @@ class SeksariaFoundriesTemplate(BaseTemplate):
 
         return items
 
-    def post_process_items(self, items: List[Dict]) -> List[Dict]:
+    def post_process_items(self, items: List[Dict], context: ExtractionContext = None) -> List[Dict]:
         """Post-process items - deduplicate and add PO number."""
         if not items:
             return items
@@ -401,8 +403,8 @@ class SeksariaFoundriesTemplate(BaseTemplate):
 
         # Get PO number once
         po_number = "UNKNOWN"
-        if hasattr(self, 'last_processed_text'):
-            po_number = self.extract_project_number(self.last_processed_text)
+        if context is not None and context.text:
+            po_number = self.extract_project_number(context.text)
 
         for item in items:
             key = f"{item['part_number']}_{item['quantity']}_{item['total_price']}"
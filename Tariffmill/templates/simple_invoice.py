@@ -28,6 +28,10 @@ class SimpleInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['description']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['invoice', 'bill']
+    max_confidence = 0.55
+
     def can_process(self, text: str) -> bool:
         """Check if this is a simple invoice format."""
         text_lower = text.lower()
@@ -8,6 +8,7 @@ Generated: 2025-12-24 00:06:18
 """
 
 import re
+import threading
 from typing import List, Dict
 from .base_template import BaseTemplate
 
@@ -46,16 +47,23 @@ class SmartShaanxiTemplateTemplate(BaseTemplate):
         'Invoice No'
     ]
 
+    # Template is only scored if one of the supplier keywords appears in the text
+    routing_keywords = SUPPLIER_KEYWORDS
+
     def __init__(self):
         super().__init__()
         self._extractor = None
-        self._last_result = None
+        # Only guards creating the extractor; SmartExtractor returns a new result
+        # per call, so the shared extractor is used from several threads at once
+        self._extractor_init_lock = threading.Lock()
 
     @property
     def extractor(self):
         """Lazy-load SmartExtractor."""
         if self._extractor is None and SmartExtractor is not None:
-            self._extractor = SmartExtractor()
+            with self._extractor_init_lock:
+                if self._extractor is None:
+                    self._extractor = SmartExtractor()
         return self._extractor
 
     def can_process(self, text: str) -> bool:
@@ -126,21 +134,22 @@ class SmartShaanxiTemplateTemplate(BaseTemplate):
         """
         Extract line items using SmartExtractor.
         """
-        if not self.extractor:
+        extractor = self.extractor
+        if not extractor:
             return []
 
         try:
-            self._last_result = self.extractor.extract_from_text(text)
+            result = extractor.extract_from_text(text)
 
             items = []
-            for item in self._last_result.line_items:
+            for item in result.line_items:
                 items.append({
                     'part_number': item.part_number,
                     'quantity': item.quantity,
                     'total_price': item.total_price,
                     'unit_price': item.unit_price,
                     'description': item.description,
-                    'po_number': self._last_result.po_numbers[0] if self._last_result.po_numbers else '',
+                    'po_number': result.po_numbers[0] if result.po_numbers else '',
                     'country_origin': 'CHINA',
                 })
 
@@ -12,8 +12,9 @@ Key features:
 """
 
 import re
+import threading
 from typing import List, Dict
-from .base_template import BaseTemplate
+from .base_template import BaseTemplate, ExtractionContext
 
 # Import SmartExtractor
 import sys
@@ -59,6 +60,10 @@ class SmartUniversalTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description', 'confidence']
 
+    # get_confidence_score never exceeds this, so routing can skip the costly
+    # SmartExtractor scoring pass once a specific template has scored higher
+    max_confidence = 0.6
+
     # Known company patterns that indicate a commercial invoice
     INVOICE_INDICATORS = [
         r'\binvoice\b',
@@ -80,15 +85,27 @@ class SmartUniversalTemplate(BaseTemplate):
     def __init__(self):
         super().__init__()
         self._extractor = None
-        self._last_result = None
+        # Only guards creating the extractor; SmartExtractor returns a new result
+        # per call, so the shared extractor is used from several threads at once
+        self._extractor_init_lock = threading.Lock()
 
     @property
     def extractor(self):
         """Lazy-load the SmartExtractor."""
         if self._extractor is None and SmartExtractor is not None:
-            self._extractor = SmartExtractor()
+            with self._extractor_init_lock:
+                if self._extractor is None:
+                    self._extractor = SmartExtractor()
         return self._extractor
 
+    def _get_result(self, text: str, context: ExtractionContext = None):
+        """SmartExtractor result for text, computed once per extraction context."""
+        if not self.extractor:
+            return None
+        if context is None or text is not context.text:
+            return self._extractor.extract_from_text(text)
+        return context.memo('smart_result', lambda: self._extractor.extract_from_text(text))
+
     def can_process(self, text: str) -> bool:
         """
         Check if this template can process the invoice.
@@ -142,24 +159,24 @@ class SmartUniversalTemplate(BaseTemplate):
         # Check if SmartExtractor can find items
         if self.extractor:
             try:
-                result = self.extractor.extract_from_text(text)
+                result = self._extractor.extract_from_text(text)
                 if len(result.line_items) > 0:
                     score += 0.1
                 if len(result.line_items) >= 5:
                     score += 0.05
                 # Higher score if database matches found
-                if self.extractor.db_matched_count > 0:
+                if result.db_matched_count > 0:
                     score += 0.1
             except Exception:
                 pass
 
         return min(score, 0.6)  # Cap at 0.6 to let specific templates win
 
-    def extract_invoice_number(self, text: str) -> str:
+    def extract_invoice_number(self, text: str, context: ExtractionContext = None) -> str:
         """Extract invoice number using SmartExtractor patterns."""
-        if self.extractor and self._last_result:
-            if self._last_result.invoice_number:
-                return self._last_result.invoice_number
+        result = self._get_result(text, context)
+        if result and result.invoice_number:
+            return result.invoice_number
 
         # Fallback patterns
         patterns = [
@@ -176,11 +193,11 @@ class SmartUniversalTemplate(BaseTemplate):
 
         return "UNKNOWN"
 
-    def extract_project_number(self, text: str) -> str:
+    def extract_project_number(self, text: str, context: ExtractionContext = None) -> str:
         """Extract PO/project number."""
-        if self.extractor and self._last_result:
-            if self._last_result.po_numbers:
-                return self._last_result.po_numbers[0]
+        result = self._get_result(text, context)
+        if result and result.po_numbers:
+            return result.po_numbers[0]
 
         # Fallback patterns
         patterns = [
@@ -197,11 +214,11 @@ class SmartUniversalTemplate(BaseTemplate):
 
         return "UNKNOWN"
 
-    def extract_manufacturer_name(self, text: str) -> str:
+    def extract_manufacturer_name(self, text: str, context: ExtractionContext = None) -> str:
         """Extract manufacturer/supplier name."""
-        if self.extractor and self._last_result:
-            if self._last_result.supplier_name:
-                return self._last_result.supplier_name
+        result = self._get_result(text, context)
+        if result and result.supplier_name:
+            return result.supplier_name
 
         # Try to find company name in header
         lines = text.split('\n')[:15]
@@ -213,7 +230,7 @@ class SmartUniversalTemplate(BaseTemplate):
 
         return ""
 
-    def extract_line_items(self, text: str) -> List[Dict]:
+    def extract_line_items(self, text: str, context: ExtractionContext = None) -> List[Dict]:
         """
         Extract line items using SmartExtractor.
 
@@ -225,11 +242,11 @@ class SmartUniversalTemplate(BaseTemplate):
 
         try:
             # Use SmartExtractor
-            self._last_result = self.extractor.extract_from_text(text)
+            result = self._get_result(text, context)
 
             # Convert LineItem objects to dicts for template compatibility
             items = []
-            for item in self._last_result.line_items:
+            for item in result.line_items:
                 items.append({
                     'part_number': item.part_number,
                     'quantity': item.quantity,
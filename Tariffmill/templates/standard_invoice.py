@@ -30,6 +30,10 @@ class StandardInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['invoice']
+    max_confidence = 0.7
+
     def can_process(self, text: str) -> bool:
         """Check if this is a standard commercial invoice."""
         text_lower = text.lower()
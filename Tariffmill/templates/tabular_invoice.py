@@ -28,6 +28,10 @@ class TabularInvoiceTemplate(BaseTemplate):
 
     extra_columns = ['unit_price', 'description', 'uom']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['invoice']
+    max_confidence = 0.65
+
     # Expected table headers (case-insensitive matching)
     EXPECTED_HEADERS = [
         'item', 'part', 'code', 'sku', 'product',
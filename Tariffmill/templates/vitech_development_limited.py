@@ -25,6 +25,9 @@ class VitechDevelopmentLimitedTemplate(BaseTemplate):
 
     extra_columns = ['po_number', 'packages', 'hs_code', 'country_origin', 'net_weight', 'gross_weight', 'dimensions', 'unit_price']
 
+    # Cheap routing keywords - template is only scored if one appears in the text
+    routing_keywords = ['vitech development limited', 'hfvt25-']
+
     def can_process(self, text: str) -> bool:
         """Check if this template can process the given invoice."""
         text_lower = text.lower()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+TariffMill CBP Quantity Benchmark
+
+Times calculate_cbp_quantities (Tariffmill/invoice_processor/core/quantities.py)
+on synthetic invoices of increasing size.
+
+Usage:
+    python scripts/benchmark_quantities.py [ROWS ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Tariffmill.invoice_processor.core.quantities import calculate_cbp_quantities
+
+
+def benchmark_quantities(sizes=(1_000, 10_000, 100_000), repeat: int = 3) -> Dict[int, float]:
+    """
+    Time calculate_cbp_quantities on synthetic invoices of increasing size.
+
+    Returns:
+        Dict of row count -> best time per row in microseconds. With column-wise
+        rules the per-row cost stays roughly flat as the row count grows.
+    """
+    units = ['KG', 'NO', 'NO/KG', 'DOZ. KG', 'M2', 'PCS', 'LITERS', '', None, 'CU KG']
+    quantities = ['12', '1,200', '', None, 'x', 3, '2.5', '0']
+    results = {}
+    for size in sizes:
+        df = pd.DataFrame({
+            'qty_unit': [units[i % len(units)] for i in range(size)],
+            'quantity': [quantities[i % len(quantities)] for i in range(size)],
+            'quantity_unit': ['DOZ' if i % 7 == 0 else 'PCS' for i in range(size)],
+            'CalcWtNet': np.linspace(0, 50, size),
+        })
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            calculate_cbp_quantities(df)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[size] = round(best / size * 1_000_000, 3)
+    return results
+
+
+def main():
+    sizes = tuple(int(arg) for arg in sys.argv[1:]) or (1_000, 10_000, 100_000)
+    for size, per_row_us in benchmark_quantities(sizes).items():
+        print(f"{size:>10,} rows: {per_row_us:8.3f} us/row")
+
+
+if __name__ == "__main__":
+    main()
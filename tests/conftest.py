@@ -0,0 +1,52 @@
+"""
+Shared fixtures: sample PDFs drawn with reportlab and a scratch copy of the bundled database.
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+RESOURCES_DB = Path(__file__).parent.parent / "Tariffmill" / "Resources" / "tariffmill.db"
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """
+    Factory writing a PDF to tmp_path.
+
+    Each page is a list of text lines, optionally followed by a table
+    (list of rows) drawn as a ruled grid so pdfplumber detects it.
+    """
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+
+    def make(name: str, pages, tables=None) -> Path:
+        path = tmp_path / name
+        pdf = canvas.Canvas(str(path))
+        for page_idx, lines in enumerate(pages):
+            y = 750
+            for line in lines:
+                pdf.drawString(40, y, line)
+                y -= 14
+            table = tables[page_idx] if tables else None
+            if table:
+                xs = [40 + 120 * col for col in range(len(table[0]) + 1)]
+                ys = [y - 20 * row for row in range(len(table) + 1)]
+                pdf.grid(xs, ys)
+                for row_idx, row in enumerate(table):
+                    for col_idx, cell in enumerate(row):
+                        pdf.drawString(xs[col_idx] + 4, ys[row_idx] - 14, cell)
+            pdf.showPage()
+        pdf.save()
+        return path
+
+    return make
+
+
+@pytest.fixture
+def scratch_db(tmp_path):
+    """OCRMillDatabase on a copy of the bundled TariffMill database."""
+    from Tariffmill.ocrmill_database import OCRMillDatabase
+    db_path = tmp_path / "tariffmill.db"
+    shutil.copy(RESOURCES_DB, db_path)
+    return OCRMillDatabase(db_path)
@@ -0,0 +1,128 @@
+"""
+invoice_processor: columnar material expansion matches the original row-wise loop.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Tariffmill.invoice_processor.core import processor
+from Tariffmill.invoice_processor.core.processor import process_invoice_data
+from Tariffmill.invoice_processor.core.tariff import TariffLookup
+
+
+def expand_material_rows_rowwise(df: pd.DataFrame, lookup_tariff_many) -> pd.DataFrame:
+    """Reference: the iterrows() expansion _expand_material_rows replaced."""
+    def lookup_tariff(hts):
+        return tuple(lookup_tariff_many(pd.Series([hts], dtype=object)).iloc[0])
+
+    expanded_rows = []
+    for _, row in df.iterrows():
+        steel_pct = row['SteelRatio']
+        aluminum_pct = row['AluminumRatio']
+        copper_pct = row['CopperRatio']
+        wood_pct = row['WoodRatio']
+        auto_pct = row['AutoRatio']
+        non_steel_pct = row['NonSteelRatio']
+        original_value = row['value_usd']
+
+        if steel_pct == 0 and aluminum_pct == 0 and copper_pct == 0 and wood_pct == 0 and auto_pct == 0 and non_steel_pct == 0:
+            material, _, _ = lookup_tariff(row.get('hts_code', ''))
+            if material == 'Aluminum':
+                aluminum_pct = 100.0
+            elif material == 'Copper':
+                copper_pct = 100.0
+            elif material == 'Wood':
+                wood_pct = 100.0
+            elif material == 'Auto':
+                auto_pct = 100.0
+            else:
+                steel_pct = 100.0
+
+        material_configs = [
+            ('steel', steel_pct, 'SteelRatio'),
+            ('aluminum', aluminum_pct, 'AluminumRatio'),
+            ('copper', copper_pct, 'CopperRatio'),
+            ('wood', wood_pct, 'WoodRatio'),
+            ('auto', auto_pct, 'AutoRatio'),
+            ('non_232', non_steel_pct, 'NonSteelRatio'),
+        ]
+        for content_type, pct, ratio_col in material_configs:
+            if pct > 0:
+                new_row = row.copy()
+                new_row['value_usd'] = original_value * pct / 100.0
+                for _, _, column in material_configs:
+                    new_row[column] = 0.0
+                new_row[ratio_col] = pct
+                new_row['_content_type'] = content_type
+                expanded_rows.append(new_row)
+
+    return pd.DataFrame(expanded_rows).reset_index(drop=True)
+
+
+TARIFFS = TariffLookup.from_dict({
+    '7208100000': {'material': 'Steel', 'declaration_required': '08 - x'},
+    '76011000': {'material': 'Aluminum', 'declaration_required': '07 - y'},
+    '74081100': {'material': 'Copper', 'declaration_required': '11'},
+    '44219900': {'material': 'Wood', 'declaration_required': ''},
+    '87089900': {'material': 'Auto', 'declaration_required': ''},
+})
+
+LOOKUPS = {
+    'tariff_lookup': {'tariff_lookup': TARIFFS},
+    'tariff_lookup_func': {'tariff_lookup_func': lambda hts: ('Copper', '11', 'Y') if str(hts).startswith('74') else (None, '', '')},
+    'no_lookup': {},
+}
+
+
+def make_invoice(rows: int, seed: int, with_ratios: bool) -> pd.DataFrame:
+    """Random invoice with blank/invalid ratios, missing and unknown HTS codes."""
+    rng = random.Random(seed)
+    hts_codes = ['7208.10.0000', '7601.10.00', '7408.11.00', '8708.99.00', '4421.99.00',
+                 '9999.99.9999', '', None, np.nan]
+    data = {
+        'part_number': [f'P{i % 50}' for i in range(rows)],
+        'value_usd': [round(rng.random() * 1000, 2) if i % 17 else 0 for i in range(rows)],
+        'hts_code': [rng.choice(hts_codes) for _ in range(rows)],
+        'quantity': [rng.choice(['5', '1,200', '', None, 'x', 3]) for _ in range(rows)],
+        'qty_unit': [rng.choice(['KG', 'NO', 'NO/KG', 'M2', '', None, 'liters', 'PCS']) for _ in range(rows)],
+    }
+    if with_ratios:
+        for column in ['steel_ratio', 'aluminum_ratio', 'copper_ratio', 'wood_ratio', 'auto_ratio', 'non_steel_ratio']:
+            data[column] = [rng.choice([0, 0, 0, 25, 50, 100, '', None, 'abc', -5]) for _ in range(rows)]
+        data['country_of_melt'] = [rng.choice(['CN', '', None]) for _ in range(rows)]
+        data['invoice_number'] = [f'I{i % 3}' for i in range(rows)]
+    return pd.DataFrame(data)
+
+
+@pytest.mark.parametrize("lookup", sorted(LOOKUPS))
+@pytest.mark.parametrize("with_ratios", [True, False])
+@pytest.mark.parametrize("seed", range(3))
+def test_expansion_matches_rowwise_reference(monkeypatch, seed, with_ratios, lookup):
+    invoice = make_invoice(150, seed, with_ratios)
+    kwargs = dict(net_weight=1234.5, mid='CNABC', **LOOKUPS[lookup])
+
+    columnar = process_invoice_data(invoice, **kwargs)
+    monkeypatch.setattr(processor, '_expand_material_rows', expand_material_rows_rowwise)
+    reference = process_invoice_data(invoice, **kwargs)
+
+    assert columnar.expanded_row_count == reference.expanded_row_count
+    pd.testing.assert_frame_equal(columnar.data, reference.data)
+
+
+def test_expansion_row_order_and_values():
+    invoice = pd.DataFrame({
+        'part_number': ['A', 'B'],
+        'value_usd': [100.0, 50.0],
+        'hts_code': ['7601.10.00', '7208.10.0000'],
+        'steel_ratio': [60, 0],
+        'non_steel_ratio': [40, 0],
+    })
+    data = process_invoice_data(invoice, net_weight=10.0, tariff_lookup=TARIFFS).data
+
+    assert data['_content_type'].tolist() == ['steel', 'non_232', 'steel']
+    assert data['value_usd'].tolist() == [60.0, 40.0, 50.0]
+    assert data['SteelRatio'].tolist() == [60.0, 0.0, 100.0]
+    assert data['NonSteelRatio'].tolist() == [0.0, 40.0, 0.0]
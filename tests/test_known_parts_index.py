@@ -0,0 +1,38 @@
+"""
+KnownPartsIndex: reloaded when parts_master's part numbers change, not on other writes.
+"""
+
+from smart_extractor import KnownPartsIndex
+
+
+def add_part(db, part_number: str):
+    conn = db._get_connection()
+    conn.execute("INSERT INTO parts_master (part_number, last_updated) VALUES (?, '')", (part_number,))
+    conn.commit()
+    conn.close()
+
+
+def test_other_writes_do_not_reload(scratch_db):
+    add_part(scratch_db, "ZZ-OLD-PART-1")
+    index = KnownPartsIndex(scratch_db.db_path, check_interval=0)
+    version = index.version
+
+    scratch_db.record_template_usage(template_name="smart_universal", pdf_file="invoice.pdf",
+                                     items_extracted=2, stage_timings={'line_items': 1.0})
+    conn = scratch_db._get_connection()
+    conn.execute("UPDATE parts_master SET description = 'CHANGED' WHERE part_number = 'ZZ-OLD-PART-1'")
+    conn.commit()
+    conn.close()
+
+    assert not index.refresh()
+    assert index.version == version
+
+
+def test_new_part_reloads(scratch_db):
+    index = KnownPartsIndex(scratch_db.db_path, check_interval=0)
+    assert "ZZ-NEW-PART-1" not in index
+
+    add_part(scratch_db, "ZZ-NEW-PART-1")
+
+    assert index.refresh()
+    assert "ZZ-NEW-PART-1" in index
@@ -0,0 +1,36 @@
+"""
+Template benchmark: every timed and traced run performs a full extraction.
+"""
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from smart_extractor import SmartExtractor
+from Tariffmill.ocrmill_benchmark import TemplateBenchmark
+
+
+def test_repeated_runs_are_not_memo_hits(make_pdf, tmp_path, monkeypatch):
+    make_pdf("invoice.pdf", [[
+        "COMMERCIAL INVOICE",
+        "Invoice No: 5551",
+        "DMF124  WIDGET  48  $265.81  $12,758.88",
+        "DTK8 BOLT 10 $2.50 $25.00",
+    ]])
+    benchmark = TemplateBenchmark(tmp_path, repeat=3, measure_memory=True, log=lambda message: None)
+    if benchmark.engine.templates['smart_universal'].extractor is None:
+        pytest.skip("SmartExtractor not importable")
+
+    extractions = []
+    original = SmartExtractor._extract_line_items
+
+    def counting(self, text, *args):
+        extractions.append(text)
+        return original(self, text, *args)
+
+    monkeypatch.setattr(SmartExtractor, '_extract_line_items', counting)
+    result = benchmark.run(['smart_universal'])
+
+    assert result['templates']['smart_universal']['files_matched'] == 1
+    # Match check + 3 timed runs + 1 traced run, each a full extraction
+    assert len(extractions) == 1 + 3 + 1
@@ -0,0 +1,127 @@
+"""
+Extraction result cache: entries are keyed by PDF content and selected template.
+"""
+
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from Tariffmill.ocrmill_cache import ExtractionCache
+from Tariffmill.ocrmill_document import ParsedDocument
+from Tariffmill.ocrmill_processor import ProcessorEngine, OCRMillConfig
+from Tariffmill.templates import TemplateRoutingIndex
+from Tariffmill.templates.base_template import BaseTemplate
+
+
+class FixedItemTemplate(BaseTemplate):
+    """Extracts a single item whose part number names the template."""
+
+    name = "Fixed Item"
+    score = 0.5
+    extractions = 0
+
+    def can_process(self, text: str) -> bool:
+        return True
+
+    def get_confidence_score(self, text: str) -> float:
+        return self.score
+
+    def extract_invoice_number(self, text: str) -> str:
+        return "1001"
+
+    def extract_project_number(self, text: str) -> str:
+        return "UNKNOWN"
+
+    def extract_line_items(self, text: str) -> List[Dict]:
+        type(self).extractions += 1
+        return [{'part_number': self.name, 'quantity': '1', 'total_price': '1.00'}]
+
+
+class BetterTemplate(FixedItemTemplate):
+    name = "Better"
+    score = 0.9
+
+
+def use_templates(engine, *template_classes):
+    templates = {cls.name: cls() for cls in template_classes}
+    engine._active_templates = (templates, TemplateRoutingIndex({cls.name: cls for cls in template_classes}))
+
+
+@pytest.fixture
+def cached_engine(scratch_db, tmp_path):
+    config = OCRMillConfig()
+    config.result_cache_path = tmp_path / "results.db"
+    engine = ProcessorEngine(scratch_db, config, log_callback=lambda message: None)
+    FixedItemTemplate.extractions = 0
+    return engine
+
+
+def test_cache_hit_skips_extraction(cached_engine, make_pdf):
+    pdf_path = make_pdf("invoice.pdf", [["COMMERCIAL INVOICE"]])
+    use_templates(cached_engine, FixedItemTemplate)
+
+    first = cached_engine.process_pdf(pdf_path)
+    second = cached_engine.process_pdf(pdf_path)
+
+    assert first == second
+    assert FixedItemTemplate.extractions == 1
+
+
+def test_cache_hit_does_not_open_pdf(cached_engine, make_pdf, monkeypatch):
+    pdf_path = make_pdf("invoice.pdf", [["COMMERCIAL INVOICE"]])
+    use_templates(cached_engine, FixedItemTemplate)
+    first = cached_engine.process_pdf(pdf_path)
+
+    def fail_open(*args, **kwargs):
+        raise AssertionError("PDF opened on a cache hit")
+    monkeypatch.setattr(ParsedDocument, "open", fail_open)
+
+    assert list(cached_engine.process_pdf_iter(pdf_path)) == [first]
+
+    conn = cached_engine.parts_db._get_connection()
+    rows = conn.execute("""
+        SELECT s.template_name, g.stage FROM template_stats s
+        JOIN template_stage_stats g ON g.stats_id = s.id
+        WHERE s.pdf_file = 'invoice.pdf' AND g.stage = 'cache_hit'
+    """).fetchall()
+    conn.close()
+    assert [tuple(row) for row in rows] == [("Fixed Item", "cache_hit")]
+
+
+def test_new_better_template_applies_to_cached_pdf(cached_engine, make_pdf):
+    pdf_path = make_pdf("invoice.pdf", [["COMMERCIAL INVOICE"]])
+    use_templates(cached_engine, FixedItemTemplate)
+    assert cached_engine.process_pdf(pdf_path)[0]['part_number'] == "Fixed Item"
+
+    use_templates(cached_engine, FixedItemTemplate, BetterTemplate)
+    assert cached_engine.process_pdf(pdf_path)[0]['part_number'] == "Better"
+
+
+def test_changed_template_set_rechecks_after_selection(cached_engine, make_pdf):
+    pdf_path = make_pdf("invoice.pdf", [["COMMERCIAL INVOICE"]])
+    BetterTemplate.extractions = 0
+    use_templates(cached_engine, BetterTemplate)
+    first = cached_engine.process_pdf(pdf_path)
+
+    use_templates(cached_engine, FixedItemTemplate, BetterTemplate)
+    assert cached_engine.process_pdf(pdf_path) == first
+    assert cached_engine.process_pdf(pdf_path) == first
+    assert BetterTemplate.extractions == 1
+
+
+def test_fingerprint_covers_shared_template_code(cached_engine):
+    sources = {path.name for path in cached_engine._template_source_files(FixedItemTemplate())}
+    assert {'test_ocrmill_cache.py', 'base_template.py'} <= sources
+
+
+def test_stale_fingerprint_is_a_miss(tmp_path):
+    cache = ExtractionCache(tmp_path / "results.db")
+    template = FixedItemTemplate()
+    cache.put("abc", template, "v1", "set", 0.5, [{'part_number': 'X'}])
+
+    assert cache.get("abc", template, "v1") == [{'part_number': 'X'}]
+    assert cache.get("abc", BetterTemplate(), "v1") is None
+    assert cache.get("abc", template, "v2") is None
+    assert cache.get("abc", template, "v1") is None  # Stale entry was deleted
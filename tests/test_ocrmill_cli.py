@@ -0,0 +1,32 @@
+"""Tests for the OCRMill command-line entry point."""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from Tariffmill.ocrmill_cli import main, EXIT_USAGE
+
+
+def test_uninitialized_database_is_a_usage_error(tmp_path, make_pdf, capsys):
+    db_path = tmp_path / "empty.db"
+    sqlite3.connect(str(db_path)).close()
+    pdf = make_pdf("invoice.pdf", [["Invoice No: 1"]])
+
+    assert main(["--db", str(db_path), "--output", str(tmp_path / "out"), str(pdf)]) == EXIT_USAGE
+    assert "not initialized" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+
+
+def test_non_sqlite_file_is_a_usage_error(tmp_path, make_pdf, capsys):
+    db_path = tmp_path / "notes.db"
+    db_path.write_text("not a database " * 100)
+    pdf = make_pdf("invoice.pdf", [["Invoice No: 1"]])
+
+    assert main(["--db", str(db_path), "--output", str(tmp_path / "out"), str(pdf)]) == EXIT_USAGE
+    assert "Not a TariffMill database" in capsys.readouterr().err
+
+
+def test_initialized_database_has_no_missing_tables(scratch_db):
+    assert scratch_db.get_missing_tables() == []
@@ -0,0 +1,130 @@
+"""
+ProcessorEngine: multi-invoice PDFs.
+"""
+
+from typing import Dict, List
+
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+from Tariffmill import ocrmill_processor
+from Tariffmill.ocrmill_processor import ProcessorEngine, OCRMillConfig
+from Tariffmill.templates import TemplateRoutingIndex
+from Tariffmill.templates.base_template import BaseTemplate
+
+
+class TableRowsTemplate(BaseTemplate):
+    """One line item per table row (first cell = part number)."""
+
+    name = "Table Rows"
+
+    def can_process(self, text: str) -> bool:
+        return 'invoice' in text.lower()
+
+    def get_confidence_score(self, text: str) -> float:
+        return 0.9
+
+    def extract_invoice_number(self, text: str) -> str:
+        return "UNKNOWN"
+
+    def extract_project_number(self, text: str) -> str:
+        return "UNKNOWN"
+
+    def extract_line_items(self, text: str) -> List[Dict]:
+        return []
+
+    def extract_from_tables(self, tables, text: str) -> List[Dict]:
+        return [{'part_number': row[0], 'quantity': row[1], 'total_price': '1.00'}
+                for table in tables for row in table if row and row[0]]
+
+
+@pytest.fixture
+def table_engine(scratch_db):
+    """ProcessorEngine whose only template extracts from tables."""
+    engine = ProcessorEngine(scratch_db, OCRMillConfig(), log_callback=lambda message: None)
+    templates = {'table_rows': TableRowsTemplate()}
+    engine._active_templates = (templates, TemplateRoutingIndex({'table_rows': TableRowsTemplate}))
+    return engine
+
+
+def test_tables_stay_with_their_invoice(table_engine, make_pdf):
+    pdf_path = make_pdf(
+        "two_invoices.pdf",
+        pages=[["COMMERCIAL INVOICE", "Invoice number: 1001"],
+               ["continued"],
+               ["COMMERCIAL INVOICE", "Invoice number: 1002"]],
+        tables=[[["A-1001", "5"]], [["A-1001-2", "6"]], [["B-1002", "7"]]],
+    )
+
+    batches = list(table_engine.process_pdf_iter(pdf_path))
+
+    parts_by_invoice = {}
+    for items in batches:
+        for item in items:
+            parts_by_invoice.setdefault(item['invoice_number'], []).append(item['part_number'])
+    assert parts_by_invoice == {'1001': ['A-1001', 'A-1001-2'], '1002': ['B-1002']}
+
+
+def test_table_template_parses_each_page_once(table_engine, make_pdf, monkeypatch):
+    pdf_path = make_pdf(
+        "invoice.pdf",
+        pages=[["COMMERCIAL INVOICE", "Invoice number: 1001"], ["continued"]],
+        tables=[[["A-1001", "5"]], [["A-1001-2", "6"]]],
+    )
+    parsed_pages = []
+    layout = pdfplumber.page.Page.layout
+
+    def counting_layout(page):
+        if not hasattr(page, '_layout'):
+            parsed_pages.append(page.page_number)
+        return layout.fget(page)
+    monkeypatch.setattr(pdfplumber.page.Page, 'layout', property(counting_layout))
+
+    items = table_engine.process_pdf(pdf_path)
+
+    assert [item['part_number'] for item in items] == ['A-1001', 'A-1001-2']
+    assert sorted(parsed_pages) == [1, 2]
+
+
+def count_occurrences(engine) -> int:
+    conn = engine.parts_db._get_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM part_occurrences").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_stream_failure_leaves_no_parts_or_csv(table_engine, tmp_path):
+    def batches():
+        yield [{'invoice_number': '1001', 'part_number': 'A-1001', 'quantity': '5', 'total_price': '1.00'}]
+        raise RuntimeError("page 2 unreadable")
+
+    before = count_occurrences(table_engine)
+    output_folder = tmp_path / "out"
+    with pytest.raises(RuntimeError):
+        table_engine.save_stream_to_csv(batches(), output_folder, pdf_name="broken.pdf")
+
+    assert count_occurrences(table_engine) == before
+    assert not output_folder.exists() or not list(output_folder.iterdir())
+
+    created = table_engine.save_stream_to_csv(
+        iter([[{'invoice_number': '1001', 'part_number': 'A-1001', 'quantity': '5', 'total_price': '1.00'}]]),
+        output_folder, pdf_name="fixed.pdf")
+    assert len(created) == 1
+    assert count_occurrences(table_engine) == before + 1
+
+
+def test_file_workers_do_not_start_page_pools():
+    config = OCRMillConfig()
+    config.page_parallel_threshold = 10
+    config.max_workers = 4
+
+    ocrmill_processor.init_worker_process(config)
+    worker_engine = ocrmill_processor._worker_engine
+    assert worker_engine._get_page_worker_count(100) == 1
+    assert config.page_parallel_threshold == 10  # Caller's config untouched
+
+    ocrmill_processor.init_worker_process(config, page_parallel=True)
+    assert ocrmill_processor._worker_engine._get_page_worker_count(100) == 4
+    assert ocrmill_processor._worker_engine._get_page_worker_count(100, page_parallel=False) == 1
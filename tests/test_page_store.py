@@ -0,0 +1,42 @@
+"""
+Page store: library code only uses it once the application has configured it.
+"""
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from smart_extractor import SmartExtractor
+from Tariffmill import ocrmill_page_store
+
+
+@pytest.fixture
+def unconfigured_store(monkeypatch, tmp_path):
+    """Page store module state as in a fresh process, with the default file under tmp_path."""
+    default_path = tmp_path / "home" / "ocrmill_pages.db"
+    monkeypatch.setattr(ocrmill_page_store, '_page_store', None)
+    monkeypatch.setattr(ocrmill_page_store, '_page_store_path', default_path)
+    monkeypatch.setattr(ocrmill_page_store, '_page_store_configured', False)
+    return default_path
+
+
+def test_smart_extractor_does_not_create_store_by_default(unconfigured_store, make_pdf):
+    pdf_path = make_pdf("invoice.pdf", [["Invoice No: 5551", "DMF124  WIDGET  48  $265.81  $12,758.88"]])
+
+    result = SmartExtractor().extract_from_pdf(str(pdf_path))
+
+    assert result.invoice_number == "5551"
+    assert ocrmill_page_store.get_configured_page_store() is None
+    assert not unconfigured_store.exists()
+
+
+def test_smart_extractor_uses_configured_store(unconfigured_store, make_pdf, tmp_path):
+    store_path = tmp_path / "app" / "ocrmill_pages.db"
+    ocrmill_page_store.set_page_store_path(store_path)
+    pdf_path = make_pdf("invoice.pdf", [["Invoice No: 5551", "DMF124  WIDGET  48  $265.81  $12,758.88"]])
+
+    result = SmartExtractor().extract_from_pdf(str(pdf_path))
+
+    assert result.invoice_number == "5551"
+    assert store_path.exists()
+    assert ocrmill_page_store.get_configured_page_store().get_page_texts(pdf_path)[0].startswith("Invoice No")
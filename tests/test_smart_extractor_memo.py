@@ -0,0 +1,57 @@
+"""
+SmartExtractor memo: template scoring and extraction of one PDF share a single run.
+"""
+
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from smart_extractor import SmartExtractor
+from Tariffmill.ocrmill_processor import ProcessorEngine, OCRMillConfig
+
+INVOICE_LINES = [
+    "COMMERCIAL INVOICE",
+    "Invoice No: 5551",
+    "ACME TRADING CO. LTD",
+    "DMF124  WIDGET  48  $265.81  $12,758.88",
+    "DTK8 BOLT 10 $2.50 $25.00",
+]
+
+
+@pytest.fixture
+def smart_only_engine(scratch_db):
+    """ProcessorEngine with only smart_universal enabled."""
+    config = OCRMillConfig()
+    engine = ProcessorEngine(scratch_db, config, log_callback=lambda message: None)
+    if 'smart_universal' not in engine.templates or engine.templates['smart_universal'].extractor is None:
+        pytest.skip("SmartExtractor not importable")
+    for name in engine.templates:
+        if name != 'smart_universal':
+            config.set_template_enabled(name, False)
+    return engine
+
+
+@pytest.mark.parametrize("pages", [[INVOICE_LINES], [INVOICE_LINES, INVOICE_LINES[3:]]])
+def test_single_pdf_runs_one_extraction(smart_only_engine, make_pdf, monkeypatch, pages):
+    extracted = []
+    original = SmartExtractor._extract_line_items
+
+    def counting(self, text, *args):
+        extracted.append(text)
+        return original(self, text, *args)
+
+    monkeypatch.setattr(SmartExtractor, '_extract_line_items', counting)
+    smart_only_engine.templates['smart_universal'].extractor.clear_memo()
+
+    items = smart_only_engine.process_pdf(make_pdf("invoice.pdf", pages))
+
+    assert items
+    assert len(extracted) == 1
+
+
+def test_memo_key_ignores_trailing_whitespace():
+    extractor = SmartExtractor()
+    text = "\n".join(INVOICE_LINES)
+    first = extractor.extract_from_text(text + "\n")
+    assert extractor.extract_from_text(text) is first
+    assert extractor.extract_from_text(text + "\nDTK9 NUT 5 $1.00 $5.00") is not first
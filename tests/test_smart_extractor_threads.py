@@ -0,0 +1,40 @@
+"""
+SmartExtractor: one shared extractor returns per-call results across threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from smart_extractor import SmartExtractor
+
+
+def invoice_text(n: int) -> str:
+    lines = ["COMMERCIAL INVOICE", f"Invoice No: {5000 + n}"]
+    lines += [f"PART{n}X{i} WIDGET {i + 1} $2.50 ${2.5 * (i + 1):.2f}" for i in range(n % 7 + 1)]
+    return "\n".join(lines)
+
+
+def summary(result):
+    return (result.invoice_number, [item.part_number for item in result.line_items], result.db_matched_count)
+
+
+def test_concurrent_calls_return_their_own_results():
+    texts = [invoice_text(n) for n in range(40)]
+    expected = [summary(SmartExtractor(memo_entries=0).extract_from_text(text)) for text in texts]
+
+    extractor = SmartExtractor(memo_entries=4)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda text: summary(extractor.extract_from_text(text)), texts * 3))
+
+    assert results == expected * 3
+    assert not hasattr(extractor, 'result')
+
+
+def test_match_count_is_per_call(scratch_db):
+    conn = scratch_db._get_connection()
+    conn.execute("INSERT INTO parts_master (part_number, last_updated) VALUES ('PART1X0', '')")
+    conn.commit()
+    conn.close()
+    extractor = SmartExtractor(db_path=scratch_db.db_path)
+
+    assert extractor.extract_from_text(invoice_text(1)).db_matched_count == 1
+    assert extractor.extract_from_text(invoice_text(2)).db_matched_count == 0